@@ -0,0 +1,15 @@
+"""
+Performance benchmarks for the API.
+
+These are standalone scripts, not part of the test suite. Run them from the
+repository root, e.g. ``python -m benchmarks.query_plans --rows 100000``.
+Set ``POSTGRES_DB`` (see ``config/settings.py``) to run against PostgreSQL.
+"""
+
+import os
+
+import django
+
+# Configure Django before any benchmark module imports DRF or the apps
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
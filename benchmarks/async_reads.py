@@ -0,0 +1,113 @@
+"""
+Compare product read throughput under WSGI, ASGI with the sync views, and
+ASGI with the async read views.
+
+    python -m benchmarks.async_reads --rows 100000 --requests 2000 --concurrency 32
+
+Each mode runs in its own process (the URLconf picks the views at import)
+against a freshly seeded database, and drives Django's real WSGI/ASGI
+handlers in-process: WSGI from a pool of threads, ASGI from concurrent tasks
+on one event loop. The response cache is replaced by a dummy cache unless
+--cache is given, so every request reaches the views and the database.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from django.test import override_settings
+
+from benchmarks.common import WORDS, benchmark_database, seed_products, summarize
+from benchmarks.servers import SERVERS
+from products.models import Product
+
+MODES = {
+    "wsgi": {"PRODUCTS_ASYNC_READS": "0"},
+    "asgi-sync": {"PRODUCTS_ASYNC_READS": "0"},
+    "asgi": {"PRODUCTS_ASYNC_READS": "1"},
+}
+DUMMY_CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+def make_urls(count, ids, seed=0):
+    """A reproducible mix of list, cursor, search and detail reads."""
+    rng = random.Random(seed)
+    urls = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            urls.append(f"/api/products/products/?page={rng.randint(1, 50)}")
+        elif kind < 0.6:
+            urls.append("/api/products/products/?pagination=cursor&page_size=20")
+        elif kind < 0.8:
+            urls.append(f"/api/products/products/search/?q={rng.choice(WORDS)}")
+        else:
+            urls.append(f"/api/products/products/{rng.choice(ids)}/")
+    return urls
+
+
+def run(mode, urls, concurrency):
+    """Latencies of ``urls`` through the mode's handler; all must be 200."""
+    results = SERVERS["wsgi" if mode == "wsgi" else "asgi"](urls, concurrency)
+    statuses = {status for _, status in results}
+    assert statuses == {200}, statuses
+    return [seconds for seconds, _ in results]
+
+
+def child(args):
+    caches = None if args.cache else DUMMY_CACHES
+    with benchmark_database(), override_settings(
+        **({"CACHES": caches} if caches else {})
+    ):
+        seed_products(args.rows)
+        ids = list(Product.objects.values_list("pk", flat=True)[:10_000])
+        urls = make_urls(args.requests, ids)
+        run(args.mode, urls[: max(1, len(urls) // 10)], args.concurrency)  # warm up
+        start = time.perf_counter()
+        samples = run(args.mode, urls, args.concurrency)
+        elapsed = time.perf_counter() - start
+    print(json.dumps({"rps": len(samples) / elapsed, **summarize(samples)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        child(args)
+        return
+
+    print(
+        f"{args.rows} products, {args.requests} requests, "
+        f"concurrency {args.concurrency}, cache {'on' if args.cache else 'off'}"
+    )
+    for mode, env in MODES.items():
+        command = [sys.executable, "-m", "benchmarks.async_reads", "--mode", mode]
+        command += ["--rows", str(args.rows), "--requests", str(args.requests)]
+        command += ["--concurrency", str(args.concurrency)]
+        command += ["--cache"] if args.cache else []
+        output = subprocess.run(
+            command,
+            env={**os.environ, **env},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        stats = json.loads(output.splitlines()[-1])
+        print(
+            f"  {mode:<10} {stats['rps']:>8.0f} req/s   p50 {stats['p50_ms']:>8.2f} ms"
+            f"   p99 {stats['p99_ms']:>8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare login and token verification: rest_framework.authtoken versus AuthToken.
+
+    python -m benchmarks.auth_tokens --users 10000 --repeat 2000
+
+Login is timed as UserLoginView does it: authenticate() and then a token.
+The password hasher dominates that number, so token issuance is also timed
+on its own. Verification is timed uncached (every lookup hits the database, as
+with DRF's TokenAuthentication) and cached.
+"""
+
+import argparse
+import random
+
+from django.contrib.auth import authenticate
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from benchmarks.common import User, benchmark_database, summarize, time_call
+from users.authentication import ExpiringTokenAuthentication, local_tokens
+from users.models import AuthToken
+
+
+def print_row(label, samples):
+    stats = summarize(samples)
+    print(
+        f"  {label:<28} p50 {stats['p50_ms']:>8.3f} ms   p95 {stats['p95_ms']:>8.3f} ms"
+        f"   p99 {stats['p99_ms']:>8.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with benchmark_database() as connection:
+        users = User.objects.bulk_create(
+            User(username=f"bench-{i}", password="!") for i in range(args.users)
+        )
+        legacy_keys = [Token.objects.create(user=user).key for user in users]
+        new_keys = [AuthToken.objects.issue(user)[1] for user in users]
+        print(f"{connection.vendor}, {args.users} users with one token of each kind")
+
+        print("token issuance (per login)")
+        print_row(
+            "authtoken get_or_create",
+            time_call(
+                lambda: Token.objects.get_or_create(user=rng.choice(users)),
+                args.repeat,
+            ),
+        )
+        print_row(
+            "AuthToken.issue",
+            time_call(lambda: AuthToken.objects.issue(rng.choice(users)), args.repeat),
+        )
+
+        print("verification")
+        legacy = TokenAuthentication()
+        print_row(
+            "authtoken",
+            time_call(
+                lambda: legacy.authenticate_credentials(rng.choice(legacy_keys)),
+                args.repeat,
+            ),
+        )
+        expiring = ExpiringTokenAuthentication()
+
+        def uncached():
+            local_tokens.clear()
+            expiring.authenticate_credentials(rng.choice(new_keys))
+
+        print_row("AuthToken, uncached", time_call(uncached, args.repeat))
+        hot_keys = new_keys[:1000]
+        for key in hot_keys:
+            expiring.authenticate_credentials(key)
+        print_row(
+            "AuthToken, cached",
+            time_call(
+                lambda: expiring.authenticate_credentials(rng.choice(hot_keys)),
+                args.repeat,
+            ),
+        )
+
+        print("login: authenticate() plus issuance (includes password hashing)")
+        User.objects.create_user(username="bench-login", password="secret")
+        logins = max(1, args.repeat // 100)
+
+        def login(issue):
+            user = authenticate(username="bench-login", password="secret")
+            issue(user)
+
+        print_row(
+            "authtoken",
+            time_call(
+                lambda: login(lambda user: Token.objects.get_or_create(user=user)),
+                logins,
+            ),
+        )
+        print_row(
+            "AuthToken", time_call(lambda: login(AuthToken.objects.issue), logins)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare product write throughput: one POST per product versus the bulk endpoint.
+
+    python -m benchmarks.bulk_writes --items 5000
+"""
+
+import argparse
+import time
+
+from rest_framework.test import APIClient
+
+from benchmarks.common import User, benchmark_database
+from products.models import Product
+
+
+def make_items(count, prefix):
+    return [
+        {
+            "name": f"{prefix} {i}",
+            "description": "Benchmark product.",
+            "price": "19.99",
+            "category": "Benchmark",
+            "stock_quantity": i % 50,
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000, help="items per bulk POST")
+    args = parser.parse_args()
+
+    with benchmark_database() as connection:
+        staff = User.objects.create_user(
+            username="bench-importer", password="x", is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user=staff)
+        print(f"{connection.vendor}, {args.items} products")
+
+        start = time.perf_counter()
+        for item in make_items(args.items, "Single"):
+            client.post("/api/products/products/", item, format="json")
+        single = time.perf_counter() - start
+
+        items = make_items(args.items, "Bulk")
+        start = time.perf_counter()
+        for i in range(0, len(items), args.batch):
+            response = client.post(
+                "/api/products/products/bulk/", items[i : i + args.batch], format="json"
+            )
+            assert response.status_code == 201, response.data
+        bulk = time.perf_counter() - start
+
+        assert Product.objects.count() == 2 * args.items
+        print(f"  per-item POST   {args.items / single:>10.0f} products/s")
+        print(f"  bulk POST       {args.items / bulk:>10.0f} products/s")
+        print(f"  speed-up        {single / bulk:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Time ``manage.py import_products`` on a generated NDJSON or CSV catalog.
+
+    python -m benchmarks.catalog_import --rows 1000000 --workers 1 4
+
+Each run imports the file into an empty table (all inserts) and then again
+over the loaded rows (all updates by natural key).
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from django.core.management import call_command
+
+from benchmarks.common import CATEGORIES, WORDS, User, benchmark_database
+from products.models import Product
+
+FIELDS = ("name", "description", "price", "category", "stock_quantity")
+
+
+def write_catalog(path, rows, fmt, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=FIELDS) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        for i in range(rows):
+            words = rng.sample(WORDS, 3)
+            row = {
+                "name": f"{' '.join(words).title()} {i}",
+                "description": f"A {words[0]} {words[1]} for every {words[2]} fan.",
+                "price": f"{rng.randint(100, 200000) / 100:.2f}",
+                "category": rng.choice(CATEGORIES),
+                "stock_quantity": rng.randint(0, 500),
+            }
+            if writer:
+                writer.writerow(row)
+            else:
+                handle.write(json.dumps(row) + "\n")
+
+
+def run(path, workers, batch_size):
+    start = time.perf_counter()
+    call_command(
+        "import_products",
+        path,
+        user="bench-importer",
+        workers=workers,
+        batch_size=batch_size,
+        progress_every=3600,
+        stdout=io.StringIO(),
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    args = parser.parse_args()
+
+    # Parallel workers each open a connection, which in-memory SQLite can't share
+    on_disk = max(args.workers) > 1
+    with (
+        tempfile.TemporaryDirectory() as tmpdir,
+        benchmark_database(on_disk=on_disk) as connection,
+    ):
+        path = os.path.join(tmpdir, f"catalog.{args.format}")
+        write_catalog(path, args.rows, args.format)
+        User.objects.create_user(username="bench-importer", password="x")
+        print(f"{connection.vendor}, {args.rows} {args.format} records")
+
+        for workers in args.workers:
+            Product.objects.all().delete()
+            insert = run(path, workers, args.batch_size)
+            update = run(path, workers, args.batch_size)
+            assert Product.objects.count() == args.rows
+            print(
+                f"  workers={workers:<3} insert {args.rows / insert:>9.0f} rows/s "
+                f"({insert:.1f}s)   upsert {args.rows / update:>9.0f} rows/s "
+                f"({update:.1f}s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure catalog sync through the change feed at increasing catalog sizes.
+
+    python -m benchmarks.changes --sizes 10000 100000 1000000 --changed 100
+
+For each size, times the initial sync (every product, through the feed) and
+an incremental one after --changed products were updated and as many
+deleted. The incremental sync should cost the same at every size. The
+feed's query plan is checked against product_updated_id_idx.
+"""
+
+import argparse
+import sys
+import time
+from datetime import timedelta
+
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from benchmarks.common import benchmark_database, seed_products
+from products import changes
+from products.models import Product
+
+URL = "/api/products/products/changes/"
+
+
+def sync(client, since, limit):
+    """Follow the feed to its end: ``(changes, requests, seconds, watermark)``."""
+    count = requests = 0
+    start = time.perf_counter()
+    while True:
+        params = {"limit": limit, **({"since": since} if since else {})}
+        data = client.get(URL, params).json()
+        requests += 1
+        count += len(data["changes"])
+        since = data["next"]
+        if not data["has_more"]:
+            return count, requests, time.perf_counter() - start, since
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--changed", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    failures = 0
+    with benchmark_database() as connection, override_settings(PRODUCT_CHANGES_LAG=0):
+        client = Client()
+        print(f"{connection.vendor}")
+        seeded = 0
+        for rows in sorted(args.sizes):
+            seed_products(rows - seeded, seed=rows)
+            seeded = rows
+            # Age the seeded rows, one shared timestamp as a bulk write leaves
+            past = timezone.now() - timedelta(days=1)
+            Product.objects.filter(updated_at__gt=past).update(updated_at=past)
+
+            count, requests, elapsed, watermark = sync(client, None, args.limit)
+            print(
+                f"{Product.objects.count()} products\n"
+                f"  initial sync      {count:>8} changes {requests:>5} requests"
+                f" {elapsed * 1000:>10.1f} ms"
+            )
+
+            ids = list(
+                Product.objects.order_by("?").values_list("pk", flat=True)[
+                    : args.changed * 2
+                ]
+            )
+            Product.objects.filter(pk__in=ids[: args.changed]).update(
+                updated_at=timezone.now()
+            )
+            for product in Product.objects.filter(pk__in=ids[args.changed :]):
+                product.delete()
+            seeded -= len(ids) - args.changed
+
+            count, requests, elapsed, _ = sync(client, watermark, args.limit)
+            print(
+                f"  incremental sync  {count:>8} changes {requests:>5} requests"
+                f" {elapsed * 1000:>10.1f} ms"
+            )
+
+            timestamp, pk, _ = changes.decode_watermark(watermark)
+            plan = (
+                Product.objects.filter(updated_at=timestamp, id__gt=pk)
+                .order_by("updated_at", "id")[: args.limit]
+                .explain()
+            )
+            if "product_updated_id_idx" not in plan:
+                failures += 1
+                print("  NO INDEX\n    " + plan.replace("\n", "\n    "))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Shared helpers for the benchmark scripts: database setup, seeding, timing."""
+
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import setup_test_environment
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from products.models import Product
+
+User = get_user_model()
+
+CATEGORIES = [
+    "Electronics",
+    "Books",
+    "Clothing",
+    "Home",
+    "Garden",
+    "Toys",
+    "Sports",
+    "Beauty",
+    "Grocery",
+    "Automotive",
+]
+WORDS = [
+    "wireless",
+    "mouse",
+    "keyboard",
+    "laptop",
+    "cable",
+    "novel",
+    "cotton",
+    "shirt",
+    "lamp",
+    "chair",
+    "shovel",
+    "puzzle",
+    "ball",
+    "serum",
+    "coffee",
+    "tyre",
+]
+
+
+@contextmanager
+def benchmark_database(on_disk=False):
+    """
+    Create a fresh, fully migrated test database and drop it afterwards.
+
+    SQLite test databases live in memory, where concurrent writers fail
+    with "database table is locked" instead of waiting. ``on_disk`` puts
+    the database in a temporary file, so they wait on the file lock as
+    they would in production.
+    """
+    database = connection.settings_dict
+    if on_disk and connection.vendor == "sqlite":
+        directory = tempfile.mkdtemp()
+        database.setdefault("TEST", {})["NAME"] = os.path.join(directory, "bench.db")
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_products(count, batch_size=5000, seed=0):
+    """Insert ``count`` pseudo-random products owned by a staff user."""
+    rng = random.Random(seed)
+    user, _ = User.objects.get_or_create(
+        username="bench-staff", defaults={"is_staff": True}
+    )
+    for start in range(0, count, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, count)):
+            words = rng.sample(WORDS, 3)
+            batch.append(
+                Product(
+                    name=f"{' '.join(words).title()} {i}",
+                    description=f"A {words[0]} {words[1]} for every {words[2]} fan.",
+                    price=Decimal(rng.randint(100, 200000)) / 100,
+                    category_id=rng.choice(CATEGORIES),
+                    stock_quantity=rng.choice([0, 0, rng.randint(1, 500)]),
+                    created_by=user,
+                )
+            )
+        Product.objects.bulk_create(batch)
+    analyze()
+    return user
+
+
+def seed_users(count, password, batch_size=5000):
+    """Insert ``count`` users named ``user0``.. sharing one password."""
+    # One hash for all of them: hashing is deliberately slow
+    encoded = make_password(password)
+    for start in range(0, count, batch_size):
+        User.objects.bulk_create(
+            User(username=f"user{i}", password=encoded)
+            for i in range(start, min(start + batch_size, count))
+        )
+    analyze()
+
+
+def analyze():
+    """Refresh planner statistics so EXPLAIN reflects realistic plans."""
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def view_queryset(view_class, path):
+    """Return the queryset ``view_class`` would build for a GET of ``path``."""
+    view = view_class()
+    view.request = Request(APIRequestFactory().get(path))
+    view.format_kwarg = None
+    view.kwargs = {}
+    return view.get_queryset()
+
+
+def time_call(func, repeat=20):
+    """Call ``func`` ``repeat`` times and return the wall times in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
@@ -0,0 +1,55 @@
+"""
+Measure export throughput and peak memory at increasing catalog sizes.
+
+    python -m benchmarks.export --sizes 1000 100000 1000000
+
+Peak memory is the tracemalloc high-water mark while the streamed response
+is consumed; it should stay flat as the catalog grows.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from django.test import Client
+
+from benchmarks.common import benchmark_database, seed_products
+from products.models import Product
+
+
+def consume(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.status_code
+    size = 0
+    for chunk in response.streaming_content:
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    with benchmark_database() as connection:
+        client = Client()
+        print(f"{connection.vendor}")
+        for rows in sorted(args.sizes):
+            Product.objects.all().delete()
+            seed_products(rows)
+            for fmt in ("ndjson", "csv"):
+                url = f"/api/products/products/export/?format={fmt}"
+                tracemalloc.start()
+                start = time.perf_counter()
+                size = consume(client, url)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(
+                    f"  {rows:>8} rows {fmt:<6} {rows / elapsed:>9.0f} rows/s  "
+                    f"{size / 2**20:>8.1f} MiB out  peak {peak / 2**20:>6.2f} MiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
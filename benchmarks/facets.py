@@ -0,0 +1,63 @@
+"""
+Measure facet and category listing latency at increasing catalog sizes,
+cold and cached.
+
+    python -m benchmarks.facets --sizes 10000 100000 1000000
+
+Cold timings clear the response cache before every request, so each one
+runs the GROUP BY query; cached timings are repeat requests for the same
+filter set. Both the whole catalog and a filtered view are measured, plus
+the category listing, which reads the maintained per-category counters.
+"""
+
+import argparse
+
+from django.test import Client
+
+from benchmarks.common import benchmark_database, seed_products, summarize, time_call
+from products.cache import get_cache
+from products.models import Product
+
+URLS = {
+    "all": "/api/products/products/facets/",
+    "filtered": "/api/products/products/facets/?min_price=50&stock_status=in_stock",
+    "categories": "/api/products/categories/",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with benchmark_database() as connection:
+        client = Client()
+        print(f"{connection.vendor}")
+        seeded = 0
+        for rows in sorted(args.sizes):
+            # Grow the catalog instead of reseeding from scratch
+            seed_products(rows - seeded, seed=rows)
+            seeded = rows
+            print(f"{Product.objects.count()} products")
+            for name, url in URLS.items():
+
+                def cold():
+                    get_cache().clear()
+                    assert client.get(url).status_code == 200
+
+                def cached():
+                    assert client.get(url).status_code == 200
+
+                for mode, func in (("cold", cold), ("cached", cached)):
+                    stats = summarize(time_call(func, repeat=args.repeat))
+                    print(
+                        f"  {name:<10} {mode:<7} p50 {stats['p50_ms']:>9.2f} ms"
+                        f"   p95 {stats['p95_ms']:>9.2f} ms"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Measure password hasher cost and login CPU under a credential-stuffing burst.
+
+    python -m benchmarks.login_load --attempts 300
+
+First times one hash with Django's PBKDF2 default and with scrypt profiles,
+to pick PASSWORD_SCRYPT_PARAMS. Then replays a burst of failed logins
+through POST /api/users/login/ with the login throttles on and off, and
+reports the process CPU time it cost. Two attacks are replayed: one address
+spraying many usernames (behind a new forged X-Forwarded-For each time),
+and many addresses hammering a few usernames.
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from django.contrib.auth.hashers import get_hasher
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from benchmarks.common import User, benchmark_database
+from users.views import UserLoginView
+
+SCRYPT_PROFILES = [
+    {"work_factor": 2**13, "block_size": 8, "parallelism": 10},
+    {"work_factor": 2**14, "block_size": 8, "parallelism": 5},
+    {"work_factor": 2**15, "block_size": 8, "parallelism": 3},
+    {"work_factor": 2**16, "block_size": 8, "parallelism": 2},
+]
+
+
+def hash_ms(algorithm, repeat=3):
+    hasher = get_hasher(algorithm)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        hasher.encode("correct horse battery staple", hasher.salt())
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def replay(attempts, throttled, spray, rng):
+    cache.clear()
+    client = APIClient()
+    original = UserLoginView.throttle_classes
+    if not throttled:
+        UserLoginView.throttle_classes = ()
+    try:
+        statuses = {}
+        cpu, wall = time.process_time(), time.perf_counter()
+        for i in range(attempts):
+            # Forged per attempt; the address throttle must ignore it
+            forwarded = f"198.51.100.{i % 256}"
+            if spray:  # one address, a new username every time
+                ip, username = "203.0.113.7", f"user{rng.randrange(1000)}"
+            else:  # a botnet: a new address every time, a handful of targets
+                ip, username = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", (
+                    f"user{rng.randrange(5)}"
+                )
+            response = client.post(
+                "/api/users/login/",
+                {"username": username, "password": "guess"},
+                REMOTE_ADDR=ip,
+                HTTP_X_FORWARDED_FOR=forwarded,
+            )
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return time.process_time() - cpu, time.perf_counter() - wall, statuses
+    finally:
+        UserLoginView.throttle_classes = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--attempts", type=int, default=300)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    # Every failed attempt would log a warning
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+
+    print("one password hash")
+    print(
+        f"  {'pbkdf2_sha256 (Django default)':<40} {hash_ms('pbkdf2_sha256'):>8.1f} ms"
+    )
+    for profile in SCRYPT_PROFILES:
+        with override_settings(PASSWORD_SCRYPT_PARAMS=profile):
+            memory = 128 * profile["block_size"] * profile["work_factor"] >> 20
+            label = (
+                f"scrypt N=2**{profile['work_factor'].bit_length() - 1} "
+                f"r={profile['block_size']} p={profile['parallelism']} ({memory} MiB)"
+            )
+            print(f"  {label:<40} {hash_ms('scrypt'):>8.1f} ms")
+
+    with benchmark_database():
+        User.objects.bulk_create(
+            User(username=f"user{i}", password="!") for i in range(1000)
+        )
+        for name, spray in (("one address", True), ("many addresses", False)):
+            print(f"{args.attempts} failed logins from {name}")
+            for throttled in (False, True):
+                cpu, wall, statuses = replay(args.attempts, throttled, spray, rng)
+                label = "throttled" if throttled else "unthrottled"
+                per_attempt = cpu / args.attempts * 1000
+                print(
+                    f"  {label:<12} CPU {cpu:>7.2f} s ({per_attempt:>6.1f} ms"
+                    f"/attempt, {cpu / wall:>4.0%} of a core)   statuses {statuses}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Compare page-number and keyset pagination latency at increasing depths.
+
+    python -m benchmarks.pagination --rows 200000
+"""
+
+import argparse
+
+from django.test import Client
+
+from benchmarks.common import benchmark_database, seed_products, summarize, time_call
+from products.models import Product
+from products.pagination import ProductKeysetPagination
+
+URL = "/api/products/products/"
+
+
+def keyset_url(offset, page_size):
+    """URL of the keyset page that starts right after row ``offset``."""
+    paginator = ProductKeysetPagination()
+    paginator.base_url = f"{URL}?pagination=cursor&page_size={page_size}"
+    if offset == 0:
+        return paginator.base_url
+    row = Product.objects.order_by("name", "id").values("name", "id")[offset - 1]
+    return paginator.encode_cursor(paginator._position(row, reverse=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    args = parser.parse_args()
+
+    with benchmark_database() as connection:
+        seed_products(args.rows)
+        client = Client()
+        print(f"{connection.vendor}, {args.rows} products, page_size={args.page_size}")
+        last_page = args.rows // args.page_size
+        for depth in sorted({1, last_page // 100, last_page // 2, last_page} - {0}):
+            page_url = f"{URL}?page={depth}&page_size={args.page_size}"
+            cursor_url = keyset_url((depth - 1) * args.page_size, args.page_size)
+            page = summarize(time_call(lambda: client.get(page_url), repeat=10))
+            keyset = summarize(time_call(lambda: client.get(cursor_url), repeat=10))
+            print(f"  page {depth:>7}  page-number {page}")
+            print(f"  {'':>12} keyset      {keyset}")
+
+
+if __name__ == "__main__":
+    main()
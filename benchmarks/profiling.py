@@ -0,0 +1,62 @@
+"""
+Measure the overhead of the profiling middleware on product reads.
+
+    python -m benchmarks.profiling --rows 20000 --repeat 200
+
+Times list, detail and search requests with PROFILING_ENABLED off and on
+(the response cache is cleared before each, so every request queries,
+serializes and renders), then prints the metrics /api/metrics/ would serve.
+"""
+
+import argparse
+import json
+
+from django.test import Client, override_settings
+
+from benchmarks.common import benchmark_database, seed_products, summarize, time_call
+from config.profiling import registry
+from products.cache import get_cache
+from products.models import Product
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with benchmark_database() as connection:
+        seed_products(args.rows)
+        product = Product.objects.order_by("id").first()
+        urls = {
+            "list": "/api/products/products/?page_size=20",
+            "detail": f"/api/products/products/{product.pk}/",
+            "search": "/api/products/products/search/?q=wireless",
+        }
+        print(f"{connection.vendor}, {args.rows} products")
+        for name, url in urls.items():
+            p50 = {}
+            for enabled in (False, True):
+                with override_settings(PROFILING_ENABLED=enabled):
+                    # Middleware is loaded per client handler
+                    client = Client()
+
+                    def request():
+                        get_cache().clear()
+                        assert client.get(url).status_code == 200
+
+                    request()
+                    stats = summarize(time_call(request, repeat=args.repeat))
+                p50[enabled] = stats["p50_ms"]
+            off, on = p50[False], p50[True]
+            print(
+                f"  {name:<7} off p50 {off:>7.2f} ms   on p50 {on:>7.2f} ms"
+                f"   overhead {(on / off - 1):>6.1%}"
+            )
+
+        for route, stats in registry.snapshot()["routes"].items():
+            print(f"{route}\n  {json.dumps(stats)}")
+
+
+if __name__ == "__main__":
+    main()
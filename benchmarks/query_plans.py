@@ -0,0 +1,78 @@
+"""
+Verify that the product list, filter and search paths use the indexes
+declared on ``Product.Meta.indexes`` and report their latency.
+
+    python -m benchmarks.query_plans --rows 200000
+    POSTGRES_DB=bench python -m benchmarks.query_plans --rows 200000
+
+Exits non-zero if any access pattern is planned without its index.
+"""
+
+import argparse
+import sys
+
+from benchmarks.common import (
+    benchmark_database,
+    seed_products,
+    summarize,
+    time_call,
+    view_queryset,
+)
+from products.views import ProductListCreateView, ProductSearchView
+
+# (label, view, path, indexes any of which satisfies the pattern)
+PATTERNS = [
+    ("list ordered by name", ProductListCreateView, "/", ["product_name_id_idx"]),
+    (
+        "price range",
+        ProductListCreateView,
+        "/?min_price=100&max_price=101",
+        ["product_price_idx"],
+    ),
+    (
+        "out of stock",
+        ProductListCreateView,
+        "/?stock_status=out_of_stock",
+        ["product_out_of_stock_name_idx"],
+    ),
+    (
+        "in stock",
+        ProductListCreateView,
+        "/?stock_status=in_stock",
+        ["product_in_stock_name_idx"],
+    ),
+    (
+        "category (case-insensitive)",
+        ProductSearchView,
+        "/?category=books",
+        ["category_name_lower_idx", "product_category_name_idx"],
+    ),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--verbose", action="store_true", help="print full plans")
+    args = parser.parse_args()
+
+    failures = 0
+    with benchmark_database() as connection:
+        seed_products(args.rows)
+        print(f"{connection.vendor}, {args.rows} products")
+        for label, view_class, path, indexes in PATTERNS:
+            queryset = view_queryset(view_class, path)[: args.page_size]
+            plan = queryset.explain()
+            used = [name for name in indexes if name in plan]
+            stats = summarize(time_call(lambda: list(queryset.all())))
+            status = "ok" if used else "NO INDEX"
+            failures += not used
+            print(f"  {label:<30} {status:<9} {used[0] if used else '-':<28} {stats}")
+            if args.verbose or not used:
+                print("    " + plan.replace("\n", "\n    "))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Measure stock reservation throughput on hot products, with request batching
+on and off, and check that nothing was oversold.
+
+    python -m benchmarks.reservations --threads 16 --hot 1 --attempts 50
+
+Every thread reserves one unit at a time of one of the --hot products until
+it has made --attempts attempts. With batching on, concurrent requests for
+the same product are combined into one conditional UPDATE. The run reports
+reservations per second, how many were refused for lack of stock, and any
+database errors, then checks that the stock taken equals the reserved
+quantities. On SQLite the test database is a temporary file, so writers
+wait on the database lock as they would in production.
+"""
+
+import argparse
+import threading
+import time
+
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import override_settings
+
+from benchmarks.common import User, benchmark_database
+from products.models import Product, StockReservation, StockReservationItem
+from products.reservations import InsufficientStock, reserve
+
+
+def run(user, product_ids, threads, attempts):
+    outcomes = {"reserved": 0, "short": 0, "errors": 0}
+    lock = threading.Lock()
+    start = threading.Barrier(threads + 1)
+
+    def worker(index):
+        try:
+            start.wait()
+            for attempt in range(attempts):
+                product_id = product_ids[(index + attempt) % len(product_ids)]
+                try:
+                    reserve(user, {product_id: 1})
+                    outcome = "reserved"
+                except InsufficientStock:
+                    outcome = "short"
+                except OperationalError:
+                    outcome = "errors"
+                with lock:
+                    outcomes[outcome] += 1
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return outcomes, time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--hot", type=int, default=1, help="number of hot products")
+    parser.add_argument("--attempts", type=int, default=50, help="per thread")
+    parser.add_argument(
+        "--stock", type=int, default=None, help="per product (default: 90%% demand)"
+    )
+    args = parser.parse_args()
+    demand = args.threads * args.attempts
+    stock = args.stock or int(demand * 0.9 / args.hot)
+
+    with benchmark_database(on_disk=True) as connection_:
+        user = User.objects.create(username="bench-shopper")
+        print(
+            f"{connection_.vendor}, {args.threads} threads, {args.hot} hot products, "
+            f"{demand} attempts, {stock} in stock each"
+        )
+        for batching in (False, True):
+            StockReservation.objects.all().delete()
+            Product.objects.all().delete()
+            product_ids = [
+                Product.objects.create(
+                    name=f"Hot {i}",
+                    price=1,
+                    category_id="Hot",
+                    stock_quantity=stock,
+                    created_by=user,
+                ).pk
+                for i in range(args.hot)
+            ]
+            with override_settings(STOCK_RESERVATION_BATCHING=batching):
+                outcomes, elapsed = run(user, product_ids, args.threads, args.attempts)
+            remaining = Product.objects.aggregate(total=Sum("stock_quantity"))["total"]
+            held = StockReservationItem.objects.aggregate(total=Sum("quantity"))
+            consistent = (
+                remaining >= 0
+                and remaining + (held["total"] or 0) == stock * args.hot
+                and held["total"] == outcomes["reserved"]
+            )
+            print(
+                f"  batching {'on ' if batching else 'off'}"
+                f"  {outcomes['reserved'] / elapsed:>8.0f} reservations/s"
+                f"  reserved {outcomes['reserved']:>5}  short {outcomes['short']:>5}"
+                f"  errors {outcomes['errors']:>4}"
+                f"  {'consistent' if consistent else 'OVERSOLD OR LOST'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Measure product search latency at catalog scale.
+
+    python -m benchmarks.search --rows 1000000
+    python -m benchmarks.search --rows 1000000 --max-p95-ms 50
+
+Times the ranked first page (10 rows) from the search backend and the full
+``/api/products/products/search/`` response. With ``--max-p95-ms`` the script
+exits non-zero if any backend query exceeds that p95 budget.
+"""
+
+import argparse
+import sys
+import time
+
+from django.test import Client, override_settings
+
+from benchmarks.common import benchmark_database, seed_products, summarize, time_call
+from products.models import Product
+from products.search import get_search_backend
+
+QUERIES = [
+    ("common term", "mouse"),
+    ("prefix", "wire"),
+    ("two terms", "wireless mouse"),
+    ("category", "electronics"),
+    ("rare term", "424242"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--backend", help="dotted path, default: per database")
+    parser.add_argument("--max-p95-ms", type=float)
+    args = parser.parse_args()
+
+    failures = 0
+    with override_settings(PRODUCT_SEARCH_BACKEND=args.backend):
+        with benchmark_database() as connection:
+            start = time.perf_counter()
+            seed_products(args.rows)
+            seeded = time.perf_counter() - start
+            backend = get_search_backend()
+            print(
+                f"{connection.vendor}, {args.rows} products (seeded in {seeded:.0f}s), "
+                f"{type(backend).__name__}"
+            )
+            client = Client()
+            for label, query in QUERIES:
+                page = lambda: list(backend.search(Product.objects.all(), query)[:10])
+                page()  # warm up (builds the in-memory index on first use)
+                ranked = summarize(time_call(page, repeat=args.repeat))
+                url = f"/api/products/products/search/?q={query}"
+                endpoint = summarize(time_call(lambda: client.get(url), repeat=5))
+                over = (
+                    args.max_p95_ms is not None and ranked["p95_ms"] > args.max_p95_ms
+                )
+                failures += over
+                print(f"  {label:<12} {query!r:<18} first page {ranked}")
+                print(
+                    f"  {'':<31} endpoint   {endpoint}{'  OVER BUDGET' if over else ''}"
+                )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
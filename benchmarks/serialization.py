@@ -0,0 +1,73 @@
+"""
+Compare serializing and rendering pages of products with ProductSerializer,
+with the values()-based ProductReadSerializer, and with that plus orjson.
+
+    python -m benchmarks.serialization --rows 20000 --pages 10 100 1000
+    python -m benchmarks.serialization --fields id name price image_url
+
+Each timing covers the query, the serializer and the renderer for one page,
+as the list view runs them. The three paths must produce identical bytes;
+the script checks that before timing anything. --fields times a sparse
+fieldset (?fields=) instead of the full representation.
+"""
+
+import argparse
+
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.common import benchmark_database, seed_products, summarize, time_call
+from products.models import Product
+from products.renderers import FastJSONRenderer, orjson
+from products.serializers import ProductReadSerializer, ProductSerializer
+
+PATHS = {
+    "drf": (ProductSerializer, JSONRenderer),
+    "fast+stdlib": (ProductReadSerializer, JSONRenderer),
+    "fast+orjson": (ProductReadSerializer, FastJSONRenderer),
+}
+
+
+def render_page(serializer_class, renderer_class, size, fields=None):
+    queryset = serializer_class.setup_eager_loading(
+        Product.objects.order_by("id"), fields=fields
+    )
+    data = serializer_class(queryset[:size], many=True, fields=fields).data
+    return renderer_class().render(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--fields", nargs="+", choices=ProductSerializer.Meta.fields)
+    args = parser.parse_args()
+    fields = tuple(args.fields) if args.fields else None
+
+    with benchmark_database() as connection:
+        seed_products(args.rows)
+        print(f"{connection.vendor}, {args.rows} products, fields {fields or 'all'}")
+        if orjson is None:
+            print("  orjson is not installed; fast+orjson uses the stdlib encoder")
+        for size in args.pages:
+            outputs = {
+                name: render_page(*classes, size, fields)
+                for name, classes in PATHS.items()
+            }
+            assert len(set(outputs.values())) == 1, f"outputs differ at {size} rows"
+            baseline = None
+            for name, classes in PATHS.items():
+                samples = time_call(
+                    lambda: render_page(*classes, size, fields), repeat=args.repeat
+                )
+                stats = summarize(samples)
+                rate = size / (sum(samples) / len(samples))
+                baseline = baseline or rate
+                print(
+                    f"  {size:>5} rows  {name:<12} {rate:>10.0f} rows/s"
+                    f"  p50 {stats['p50_ms']:>8.2f} ms  x{rate / baseline:.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
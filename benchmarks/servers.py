@@ -0,0 +1,126 @@
+"""
+Drive Django's WSGI and ASGI handlers in-process, without a server or sockets.
+
+``run_wsgi`` sends requests from a pool of threads, as a threaded WSGI server
+would; ``run_asgi`` from concurrent tasks on one event loop. Both return one
+``(seconds, status)`` per request, in completion order.
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+
+@dataclass(frozen=True)
+class Request:
+    method: str
+    url: str
+    data: object = None  # sent as a JSON body
+    headers: dict = field(default_factory=dict)  # e.g. {"Authorization": ...}
+
+    @property
+    def body(self):
+        return b"" if self.data is None else json.dumps(self.data).encode()
+
+
+def _as_request(item):
+    return item if isinstance(item, Request) else Request("GET", item)
+
+
+def run_wsgi(requests, concurrency, application=None):
+    if application is None:
+        from config.wsgi import application
+
+    def send(item):
+        request = _as_request(item)
+        parts = urlsplit(request.url)
+        body = request.body
+        environ = {
+            "REQUEST_METHOD": request.method,
+            "PATH_INFO": parts.path,
+            "QUERY_STRING": parts.query,
+            "HTTP_HOST": "testserver",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": BytesIO(body),
+        }
+        for name, value in request.headers.items():
+            environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+        setup_testing_defaults(environ)
+        start = time.perf_counter()
+        status = []
+        response = application(environ, lambda s, headers: status.append(s))
+        b"".join(response)
+        response.close()
+        return time.perf_counter() - start, int(status[0].split()[0])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(send, requests))
+
+
+def run_asgi(requests, concurrency, application=None):
+    if application is None:
+        from config.asgi import application
+
+    async def send_request(item):
+        request = _as_request(item)
+        parts = urlsplit(request.url)
+        body = request.body
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "headers": [
+                (b"host", b"testserver"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *(
+                    (name.lower().encode(), value.encode())
+                    for name, value in request.headers.items()
+                ),
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        received = []
+
+        async def receive():
+            if not received:
+                received.append(True)
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()  # the client never disconnects
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        start = time.perf_counter()
+        await application(scope, receive, send)
+        return time.perf_counter() - start, messages[0]["status"]
+
+    async def main():
+        queue = list(reversed(requests))
+        results = []
+
+        async def worker():
+            while queue:
+                results.append(await send_request(queue.pop()))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return results
+
+    return asyncio.run(main())
+
+
+SERVERS = {"wsgi": run_wsgi, "asgi": run_asgi}
@@ -0,0 +1,121 @@
+"""
+Compare Django's default SQLite configuration with the tuned profile
+(SQLITE_TUNING) under concurrent reads and staff writes.
+
+    python -m benchmarks.sqlite_profile --products 20000 --requests 2000 \\
+        --writes 0.2 --concurrency 16
+
+Each profile runs in its own process (the settings are read at import)
+against a freshly seeded temporary-file database, so SQLite's locking is
+real. One reproducible mix of product reads (filtered lists, searches,
+details) and staff writes (creates, price updates) goes through the WSGI
+handler from a pool of threads. Reads and writes are reported separately,
+with their errors: mostly "database is locked" failures under the default
+configuration. The response cache is a dummy cache, so every read queries.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from django.db import connection
+from django.test import override_settings
+
+from benchmarks.common import benchmark_database, seed_products, summarize
+from benchmarks.servers import run_wsgi
+from benchmarks.suite import DUMMY_CACHES, detail, list_filters, search, staff_writes
+from products.models import Product
+from users.models import AuthToken
+
+PROFILES = {"default": {"SQLITE_TUNING": "0"}, "tuned": {"SQLITE_TUNING": "1"}}
+READS = (list_filters, search, detail)
+
+
+def make_requests(count, writes, seed, context):
+    rng = random.Random(seed)
+    return [
+        (staff_writes if rng.random() < writes else rng.choice(READS))(rng, context)
+        for _ in range(count)
+    ]
+
+
+def child(args):
+    with benchmark_database(on_disk=True), override_settings(CACHES=DUMMY_CACHES):
+        staff = seed_products(args.products)
+        _, key = AuthToken.objects.issue(staff)
+        context = {
+            "products": args.products,
+            "ids": list(Product.objects.order_by("id").values_list("pk", flat=True)),
+            "staff_token": key,
+        }
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+        requests = make_requests(args.requests, args.writes, args.seed, context)
+        run_wsgi(requests[: max(1, len(requests) // 10)], args.concurrency)  # warm up
+        start = time.perf_counter()
+        results = run_wsgi(requests, args.concurrency)
+        elapsed = time.perf_counter() - start
+
+    report = {"journal_mode": journal_mode, "elapsed": elapsed}
+    for kind in ("reads", "writes"):
+        samples = [
+            (seconds, status)
+            for request, (seconds, status) in zip(requests, results)
+            if (request.method == "GET") == (kind == "reads")
+        ]
+        report[kind] = {
+            "rps": len(samples) / elapsed,
+            "errors": sum(status >= 400 for _, status in samples),
+            **summarize([seconds for seconds, _ in samples]),
+        }
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--writes", type=float, default=0.2, help="share of writes")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        child(args)
+        return
+
+    print(
+        f"{args.products} products, {args.requests} requests,"
+        f" {args.writes:.0%} writes, concurrency {args.concurrency}"
+    )
+    for profile, env in PROFILES.items():
+        command = [sys.executable, "-m", "benchmarks.sqlite_profile"]
+        command += ["--profile", profile, "--products", str(args.products)]
+        command += ["--requests", str(args.requests), "--writes", str(args.writes)]
+        command += ["--concurrency", str(args.concurrency), "--seed", str(args.seed)]
+        output = subprocess.run(
+            command,
+            env={**os.environ, **env},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        report = json.loads(output.splitlines()[-1])
+        print(f"  {profile} (journal_mode={report['journal_mode']})")
+        for kind in ("reads", "writes"):
+            stats = report[kind]
+            print(
+                f"    {kind:<6} {stats['rps']:>7.0f} req/s"
+                f"   p50 {stats['p50_ms']:>8.2f}   p99 {stats['p99_ms']:>8.2f} ms"
+                f"   errors {stats['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
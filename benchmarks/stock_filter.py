@@ -0,0 +1,67 @@
+"""
+Measure ?stock_status= list latency at increasing catalog sizes.
+
+    python -m benchmarks.stock_filter --sizes 10000 100000 1000000
+
+Times, cold (response and count caches cleared before every request), the
+first page, a page halfway through and the facets of the in-stock and
+out-of-stock product lists. Run it on two checkouts to compare filtering
+strategies; the requests only use the public API.
+"""
+
+import argparse
+
+from django.test import Client
+
+from benchmarks.common import benchmark_database, seed_products, summarize, time_call
+from products.cache import get_cache
+from products.models import Product
+
+URL = "/api/products/products/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with benchmark_database() as connection:
+        client = Client()
+        print(f"{connection.vendor}")
+        seeded = 0
+        for rows in sorted(args.sizes):
+            # Grow the catalog instead of reseeding from scratch
+            seed_products(rows - seeded, seed=rows)
+            seeded = rows
+            in_stock = Product.objects.filter(stock_quantity__gt=0).count()
+            print(f"{rows} products, {in_stock} in stock")
+            for status, matching in (
+                ("in_stock", in_stock),
+                ("out_of_stock", rows - in_stock),
+            ):
+                middle = max(matching // args.page_size // 2, 1)
+                query = f"?stock_status={status}&page_size={args.page_size}"
+                urls = {
+                    "first page": f"{URL}{query}",
+                    "middle page": f"{URL}{query}&page={middle}",
+                    "facets": f"{URL}facets/?stock_status={status}",
+                }
+                for name, url in urls.items():
+
+                    def cold():
+                        get_cache().clear()
+                        assert client.get(url).status_code == 200
+
+                    stats = summarize(time_call(cold, repeat=args.repeat))
+                    print(
+                        f"  {status:<13} {name:<12} p50 {stats['p50_ms']:>9.2f} ms"
+                        f"   p95 {stats['p95_ms']:>9.2f} ms"
+                    )
+
+
+if __name__ == "__main__":
+    main()
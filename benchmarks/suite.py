@@ -0,0 +1,285 @@
+"""
+Load-test the API with a reproducible mix of scenarios, under WSGI and ASGI,
+and write the results as JSON.
+
+    python -m benchmarks.suite --products 100000 --users 1000 --requests 2000 \\
+        --concurrency 16 --output results.json
+    python -m benchmarks.suite ... --compare results.json
+
+Every scenario builds its requests from its own seeded random generator, so
+the same arguments replay the same requests against the same data:
+
+* list_filters: product lists with price, stock and category filters;
+* deep_pagination: page-number pages far into the catalog;
+* search: full-text searches for catalog words;
+* detail: single products;
+* login: password logins of seeded users (throttles off; hashing is slow, so
+  a tenth of --requests);
+* staff_writes: product creates and price updates with a staff token.
+
+Each server runs in its own process (the URLconf picks the views at import)
+against a database seeded from --seed, and drives Django's real WSGI/ASGI
+handlers in-process (see benchmarks/servers.py). On SQLite the database is a
+temporary file, so concurrent writers wait for the lock as in production.
+The response cache is a dummy cache unless --cache is given. Any response
+outside a scenario's expected statuses counts as an error.
+
+--compare prints each scenario's throughput and p95 change against an
+earlier --output file.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import django
+from django.db import connection
+from django.test import override_settings
+
+from benchmarks.common import (
+    CATEGORIES,
+    WORDS,
+    benchmark_database,
+    seed_products,
+    seed_users,
+    summarize,
+)
+from benchmarks.servers import SERVERS, Request
+from products.cache import get_cache
+from products.models import Product
+from users.models import AuthToken
+
+PRODUCTS_URL = "/api/products/products/"
+PASSWORD = "bench-password-1"
+SERVER_ENV = {
+    "wsgi": {"PRODUCTS_ASYNC_READS": "0"},
+    "asgi": {"PRODUCTS_ASYNC_READS": "1"},
+}
+DUMMY_CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+NO_LOGIN_THROTTLES = {"login_ip": None, "login_username": None}
+
+
+def list_filters(rng, context):
+    # First pages only: narrow filters leave few pages, and later ones are 404s
+    params = ["page_size=20"]
+    low = rng.randint(0, 1500)
+    if rng.random() < 0.6:
+        params.append(f"min_price={low}")
+    if rng.random() < 0.6:
+        params.append(f"max_price={low + rng.randint(10, 500)}")
+    if rng.random() < 0.5:
+        params.append(f"stock_status={rng.choice(['in_stock', 'out_of_stock'])}")
+    if rng.random() < 0.5:
+        params.append(f"category={rng.choice(CATEGORIES)}")
+    return Request("GET", f"{PRODUCTS_URL}?{'&'.join(params)}")
+
+
+def deep_pagination(rng, context):
+    pages = max(1, context["products"] // 20)
+    page = rng.randint(max(1, pages // 2), pages)
+    return Request("GET", f"{PRODUCTS_URL}?page_size=20&page={page}")
+
+
+def search(rng, context):
+    return Request("GET", f"{PRODUCTS_URL}search/?q={rng.choice(WORDS)}")
+
+
+def detail(rng, context):
+    return Request("GET", f"{PRODUCTS_URL}{rng.choice(context['ids'])}/")
+
+
+def login(rng, context):
+    username = f"user{rng.randrange(context['users'])}"
+    return Request(
+        "POST", "/api/users/login/", {"username": username, "password": PASSWORD}
+    )
+
+
+def staff_writes(rng, context):
+    headers = {"Authorization": f"Token {context['staff_token']}"}
+    if rng.random() < 0.5:
+        data = {
+            "name": f"{' '.join(rng.sample(WORDS, 3)).title()} new",
+            "description": "Added by the load test.",
+            "price": f"{rng.randint(100, 200000) / 100:.2f}",
+            "category": rng.choice(CATEGORIES),
+            "stock_quantity": rng.randint(0, 500),
+        }
+        return Request("POST", PRODUCTS_URL, data, headers)
+    data = {"price": f"{rng.randint(100, 200000) / 100:.2f}"}
+    return Request(
+        "PATCH", f"{PRODUCTS_URL}{rng.choice(context['ids'])}/", data, headers
+    )
+
+
+# name -> (request builder, share of --requests, expected statuses); the
+# writes run last, so the reads see the seeded catalog
+SCENARIOS = {
+    "list_filters": (list_filters, 1.0, {200}),
+    "deep_pagination": (deep_pagination, 1.0, {200}),
+    "search": (search, 1.0, {200}),
+    "detail": (detail, 1.0, {200}),
+    "login": (login, 0.1, {200}),
+    "staff_writes": (staff_writes, 1.0, {200, 201}),
+}
+
+
+def make_requests(name, count, seed, context):
+    build = SCENARIOS[name][0]
+    rng = random.Random(f"{seed}-{name}")
+    return [build(rng, context) for _ in range(count)]
+
+
+def run_scenario(server, name, requests, concurrency):
+    expected = SCENARIOS[name][2]
+    send = SERVERS[server]
+    get_cache().clear()
+    send(requests[: max(1, len(requests) // 10)], concurrency)  # warm up
+    get_cache().clear()
+    start = time.perf_counter()
+    results = send(requests, concurrency)
+    elapsed = time.perf_counter() - start
+    samples = [seconds for seconds, _ in results]
+    return {
+        "server": server,
+        "scenario": name,
+        "requests": len(results),
+        "errors": sum(status not in expected for _, status in results),
+        "rps": round(len(results) / elapsed, 1),
+        **summarize(samples),
+    }
+
+
+def child(args):
+    overrides = {"LOGIN_THROTTLE_RATES": NO_LOGIN_THROTTLES}
+    if not args.cache:
+        overrides["CACHES"] = DUMMY_CACHES
+    with benchmark_database(on_disk=True), override_settings(**overrides):
+        staff = seed_products(args.products, seed=args.seed)
+        seed_users(args.users, PASSWORD)
+        _, key = AuthToken.objects.issue(staff)
+        context = {
+            "products": args.products,
+            "users": args.users,
+            "ids": list(Product.objects.order_by("id").values_list("pk", flat=True)),
+            "staff_token": key,
+        }
+        results = []
+        for name in args.scenarios:
+            count = max(1, round(args.requests * SCENARIOS[name][1]))
+            requests = make_requests(name, count, args.seed, context)
+            results.append(run_scenario(args.server, name, requests, args.concurrency))
+    print(json.dumps(results))
+
+
+def metadata(args, vendor):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": vendor,
+        "products": args.products,
+        "users": args.users,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "cache": args.cache,
+    }
+
+
+def compare(results, baseline):
+    before = {(r["server"], r["scenario"]): r for r in baseline["results"]}
+    print(
+        f"against {baseline['meta']['git_commit']} ({baseline['meta']['created_at']})"
+    )
+    for result in results:
+        old = before.get((result["server"], result["scenario"]))
+        if old is None:
+            continue
+        print(
+            f"  {result['server']:<5} {result['scenario']:<16}"
+            f" req/s {result['rps'] / old['rps'] - 1:>+7.1%}"
+            f"   p95 {result['p95_ms'] / old['p95_ms'] - 1:>+7.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=2000, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--servers", nargs="+", choices=SERVERS, default=list(SERVERS))
+    parser.add_argument("--cache", action="store_true", help="keep the response cache")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="a JSON file from an earlier --output")
+    parser.add_argument("--server", choices=SERVERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    # Run in the order SCENARIOS lists them, writes last
+    args.scenarios = [name for name in SCENARIOS if name in args.scenarios]
+
+    if args.server:
+        child(args)
+        return
+
+    print(
+        f"{args.products} products, {args.users} users, {args.requests} requests"
+        f" per scenario, concurrency {args.concurrency},"
+        f" cache {'on' if args.cache else 'off'}, seed {args.seed}"
+    )
+    results = []
+    for server in args.servers:
+        command = [sys.executable, "-m", "benchmarks.suite", "--server", server]
+        command += ["--products", str(args.products), "--users", str(args.users)]
+        command += ["--seed", str(args.seed), "--requests", str(args.requests)]
+        command += ["--concurrency", str(args.concurrency)]
+        command += ["--scenarios", *args.scenarios]
+        command += ["--cache"] if args.cache else []
+        output = subprocess.run(
+            command,
+            env={**os.environ, **SERVER_ENV[server]},
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        for stats in json.loads(output.splitlines()[-1]):
+            results.append(stats)
+            print(
+                f"  {server:<5} {stats['scenario']:<16} {stats['rps']:>8.0f} req/s"
+                f"   p50 {stats['p50_ms']:>8.2f}   p95 {stats['p95_ms']:>8.2f}"
+                f"   p99 {stats['p99_ms']:>8.2f} ms   errors {stats['errors']}"
+            )
+
+    report = {"meta": metadata(args, connection.vendor), "results": results}
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+    return 1 if any(stats["errors"] for stats in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
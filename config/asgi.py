@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Serve product reads from the async views (see products/async_views.py)
+os.environ.setdefault("PRODUCTS_ASYNC_READS", "1")
 
 application = get_asgi_application()
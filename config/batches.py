@@ -0,0 +1,36 @@
+"""
+Batched maintenance writes.
+
+Cron jobs that clear out expired rows work through them a batch of primary
+keys at a time, each batch in its own short statement or transaction, so
+no lock is held for long while the API keeps serving.
+"""
+
+import time
+
+
+def in_batches(queryset, batch_size, process, pause=0.0):
+    """
+    Call ``process(ids)`` with up to ``batch_size`` primary keys of
+    ``queryset`` until it matches no rows; returns the sum of the results.
+
+    ``process`` must take its rows out of ``queryset`` (delete or update
+    them), otherwise the same batch comes back forever. ``pause`` seconds
+    are slept between batches.
+    """
+    total = 0
+    while ids := list(queryset.values_list("pk", flat=True)[:batch_size]):
+        total += process(ids)
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def delete_in_batches(queryset, batch_size, pause=0.0):
+    """Delete the rows of ``queryset``, ``batch_size`` per DELETE."""
+    manager = queryset.model._base_manager
+
+    def delete(ids):
+        return manager.filter(pk__in=ids).delete()[0]
+
+    return in_batches(queryset, batch_size, delete, pause)
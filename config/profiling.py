@@ -0,0 +1,327 @@
+"""
+Opt-in request profiling (PROFILING_ENABLED).
+
+``ProfilingMiddleware`` times every request and splits the time into:
+
+* ``db``: every query, counted and timed by an execute wrapper installed on
+  each database connection;
+* ``serialize``: code wrapped in ``section("serialize")`` (the product
+  serializers);
+* ``render``: the response renderer, from ``process_template_response()``
+  to the end of ``render()``.
+
+The profile of the current request lives in a context variable, so queries
+run by the async ORM's worker threads are counted too. Timings are folded
+into per-route histograms (fixed buckets, so percentiles cost no sorting and
+memory stays constant) and a ring buffer of the most recent requests; both
+are served to staff at ``/api/metrics/``. Responses carry a
+``Server-Timing`` header browsers' developer tools display.
+
+A query that runs PROFILING_N_PLUS_ONE_THRESHOLD times or more in one
+request, differing only in its parameters, is flagged as a likely N+1
+pattern: logged, and counted per route in the metrics.
+
+With PROFILING_ENABLED off the middleware removes itself at startup, and
+the execute wrapper and ``section()`` are no-ops.
+"""
+
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from drf_spectacular.utils import extend_schema
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("profile", default=None)
+
+# Histogram bucket upper bounds in ms: 0.1 ms to ~100 s, 19% apart
+BUCKETS_MS = tuple(0.1 * 2 ** (i / 4) for i in range(81))
+
+# Parameter lists of any length are the same query
+_IN_LIST = re.compile(r"\((?:%s, )*%s\)")
+
+
+def profiling_enabled():
+    return getattr(settings, "PROFILING_ENABLED", False)
+
+
+class RequestProfile:
+    """Timings of one request, filled in while it runs."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sections = defaultdict(float)  # name -> seconds
+        self.statements = Counter()
+
+    def add(self, name, seconds):
+        self.sections[name] += seconds
+
+
+@contextmanager
+def section(name):
+    """Time the block as ``name`` in the current request's profile, if any."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add("db", time.perf_counter() - start)
+        profile.queries += 1
+        profile.statements[_IN_LIST.sub("(...)", sql)] += 1
+
+
+def install_execute_wrapper(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+class Histogram:
+    """Counts per bucket of ``BUCKETS_MS``, plus count, sum and max."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(BUCKETS_MS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """The upper bound of the bucket holding the ``fraction`` quantile."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip((*BUCKETS_MS, self.max), self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return 0.0
+
+    def summary(self):
+        return {
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": round(self.percentile(0.50), 3),
+            "p95": round(self.percentile(0.95), 3),
+            "p99": round(self.percentile(0.99), 3),
+            "max": round(self.max, 3),
+        }
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.wall_ms = Histogram()
+        self.db_ms = Histogram()
+        self.serialize_ms = Histogram()
+        self.render_ms = Histogram()
+        self.queries = 0
+        self.max_queries = 0
+        self.response_bytes = 0
+        self.n_plus_one = Counter()  # statement -> requests flagged
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "wall_ms": self.wall_ms.summary(),
+            "db_ms": self.db_ms.summary(),
+            "serialize_ms": self.serialize_ms.summary(),
+            "render_ms": self.render_ms.summary(),
+            "queries": {
+                "mean": round(self.queries / self.requests, 2) if self.requests else 0,
+                "max": self.max_queries,
+            },
+            "mean_response_bytes": (
+                round(self.response_bytes / self.requests) if self.requests else 0
+            ),
+            "n_plus_one": [
+                {"sql": sql, "requests": count}
+                for sql, count in self.n_plus_one.most_common(5)
+            ],
+        }
+
+
+class MetricsRegistry:
+    """Per-route stats and the most recent requests of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.routes = defaultdict(RouteStats)
+            self.recent = deque(
+                maxlen=getattr(settings, "PROFILING_RECENT_REQUESTS", 200)
+            )
+
+    def record(self, route, status_code, profile, wall, size, repeated):
+        ms = {name: seconds * 1000 for name, seconds in profile.sections.items()}
+        with self._lock:
+            stats = self.routes[route]
+            stats.requests += 1
+            stats.errors += status_code >= 500
+            stats.wall_ms.add(wall * 1000)
+            stats.db_ms.add(ms.get("db", 0.0))
+            stats.serialize_ms.add(ms.get("serialize", 0.0))
+            stats.render_ms.add(ms.get("render", 0.0))
+            stats.queries += profile.queries
+            stats.max_queries = max(stats.max_queries, profile.queries)
+            stats.response_bytes += size or 0
+            stats.n_plus_one.update(repeated)
+            self.recent.append(
+                {
+                    "route": route,
+                    "status": status_code,
+                    "wall_ms": round(wall * 1000, 3),
+                    "queries": profile.queries,
+                    **{f"{name}_ms": round(value, 3) for name, value in ms.items()},
+                    "response_bytes": size,
+                }
+            )
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "routes": {
+                    route: stats.summary()
+                    for route, stats in sorted(self.routes.items())
+                },
+                "recent": list(self.recent),
+            }
+
+
+registry = MetricsRegistry()
+
+
+class ProfilingMiddleware:
+    """Profile every request (see the module docstring). Put it first."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not profiling_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        connection_created.connect(install_execute_wrapper)
+        for connection in connections.all(initialized_only=True):
+            install_execute_wrapper(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook
+        profile = _current.get()
+        if profile is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: profile.add("render", time.perf_counter() - start)
+            )
+        return response
+
+    def finish(self, request, response, profile):
+        wall = time.perf_counter() - profile.start
+        match = request.resolver_match
+        route = f"{request.method} /{match.route if match else '<unresolved>'}"
+        size = None if response.streaming else len(response.content)
+        threshold = getattr(settings, "PROFILING_N_PLUS_ONE_THRESHOLD", 5)
+        repeated = [
+            sql for sql, count in profile.statements.items() if count >= threshold
+        ]
+        for sql in repeated:
+            logger.warning(
+                "Possible N+1 queries on %s: ran %d times: %s",
+                route,
+                profile.statements[sql],
+                sql,
+            )
+        registry.record(route, response.status_code, profile, wall, size, repeated)
+
+        if getattr(settings, "PROFILING_SERVER_TIMING", True):
+            timings = [
+                f"total;dur={wall * 1000:.2f}",
+                f'db;dur={profile.sections["db"] * 1000:.2f};'
+                f'desc="{profile.queries} queries"',
+            ]
+            timings.extend(
+                f"{name};dur={profile.sections[name] * 1000:.2f}"
+                for name in ("serialize", "render")
+                if name in profile.sections
+            )
+            response["Server-Timing"] = ", ".join(timings)
+        return response
+
+
+# An operator tool, not part of the public API
+@extend_schema(exclude=True)
+class MetricsView(APIView):
+    """
+    GET    /api/metrics/ -> Per-route request metrics and recent requests (staff only)
+    DELETE /api/metrics/ -> Reset them
+
+    Metrics are kept per process; each worker reports its own.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"enabled": profiling_enabled(), **registry.snapshot()})
+
+    def delete(self, request, *args, **kwargs):
+        registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,187 @@
+"""
+Read replicas (DATABASE_REPLICAS).
+
+``ReplicaRouter`` sends the reads of views that use ``ReplicaReadsMixin``
+(the product list, detail and search views) to a replica, and everything
+else to the primary (``default``):
+
+* Only safe requests (GET, HEAD, OPTIONS) read from a replica, and only from
+  ``initial()`` on, once the user is authenticated; the token lookup before
+  that reads the primary.
+* Read-your-writes: after a user's successful write (an unsafe request
+  answered below 400, on any view), their reads stay on the primary for
+  REPLICA_LAG_SECONDS, the longest a replica is expected to trail. The pin
+  is kept in the default cache, so every worker sharing it honours it.
+* Health: a replica that cannot be connected to is skipped for
+  REPLICA_RETRY_SECONDS; reads fall back to the other replicas, then to the
+  primary.
+
+``ReplicaMiddleware`` scopes the choice to one request (in a context
+variable, so the async ORM's worker threads see it too) and records the
+pins. With no replicas configured the middleware removes itself at startup
+and the router defers to the default alias.
+"""
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_routing = ContextVar("replica_routing", default=None)
+
+# Replica alias -> time.monotonic() at which to try it again
+_down_until = {}
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def replica_lag():
+    return getattr(settings, "REPLICA_LAG_SECONDS", 5)
+
+
+def pin_key(user_id):
+    return f"replicas:pin:{user_id}"
+
+
+def is_pinned(user):
+    """Whether ``user`` wrote recently enough to need the primary."""
+    return user.is_authenticated and cache.get(pin_key(user.pk)) is not None
+
+
+def healthy_replica():
+    """A replica alias that accepts connections, or None for the primary."""
+    now = time.monotonic()
+    candidates = [
+        alias for alias in replica_aliases() if _down_until.get(alias, 0) <= now
+    ]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError as error:
+            retry = getattr(settings, "REPLICA_RETRY_SECONDS", 30)
+            _down_until[alias] = now + retry
+            logger.warning(
+                "Replica %s is unavailable, retrying in %ss: %s", alias, retry, error
+            )
+        else:
+            _down_until.pop(alias, None)
+            return alias
+    return None
+
+
+def reading_from_replica():
+    """Whether the current request has read from a replica."""
+    routing = _routing.get()
+    return routing is not None and routing.alias is not None
+
+
+class RequestRouting:
+    """
+    Where the current request reads from.
+
+    The replica is chosen at the first read rather than in ``initial()``:
+    connecting is blocking, and the async read path calls ``initial()`` on
+    the event loop but queries from a worker thread.
+    """
+
+    def __init__(self):
+        self.replica_reads = False  # set by ReplicaReadsMixin
+        self.alias = None
+        self.chosen = False
+
+    def read_alias(self):
+        if not self.replica_reads:
+            return None
+        if not self.chosen:
+            self.alias = healthy_replica()
+            self.chosen = True
+        return self.alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        return routing.read_alias() if routing is not None else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+class ReplicaReadsMixin:
+    """Read from a replica on safe requests (see the module docstring)."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        routing = _routing.get()
+        if routing is not None:
+            routing.replica_reads = request.method in SAFE_METHODS and not is_pinned(
+                request.user
+            )
+
+
+class ReplicaMiddleware:
+    """Scope replica routing to each request and pin users after writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _routing.set(RequestRouting())
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if self.is_write(request, response):
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        token = _routing.set(RequestRouting())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if self.is_write(request, response):
+            # A session user not yet loaded would be loaded here
+            await sync_to_async(self.pin)(request)
+        return response
+
+    @staticmethod
+    def is_write(request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
+
+    @staticmethod
+    def pin(request):
+        # DRF sets the user it authenticated on the underlying request
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            cache.set(pin_key(user.pk), True, replica_lag())
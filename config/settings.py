@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,6 +26,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover everything below; inert unless
+    # PROFILING_ENABLED
+    "config.profiling.ProfilingMiddleware",
+    # Routes product reads to replicas; inert unless DATABASE_REPLICAS
+    "config.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -62,7 +68,116 @@ DATABASES = {
     }
 }
 
+# Switch to PostgreSQL by exporting POSTGRES_DB (and optionally the other
+# POSTGRES_* variables). psycopg2-binary is already in requirements.txt.
+if os.environ.get("POSTGRES_DB"):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ["POSTGRES_DB"],
+        "USER": os.environ.get("POSTGRES_USER", "postgres"),
+        "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+        "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+    }
+
+# SQLite production profile, applied by Django to every new connection:
+# * journal_mode=WAL: readers and the writer no longer block each other;
+# * synchronous=NORMAL: with WAL, commits skip the fsync (a power cut may
+#   lose the last commits, but never corrupts the database);
+# * mmap_size: pages are read from the OS page cache without copying;
+# * cache_size: 64 MB page cache per connection (negative values are KiB);
+# * timeout: seconds a writer waits for the lock before "database is locked";
+# * transaction_mode=IMMEDIATE: transactions take the write lock when they
+#   begin, so a transaction that reads and then writes waits for its turn
+#   instead of failing at its first write (which the timeout cannot retry);
+# * CONN_MAX_AGE: connections, with their page cache and parsed schema, are
+#   reused across requests instead of reopened for each one.
+# SQLITE_TUNING=0 restores Django's defaults.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64_000,
+    "temp_store": "MEMORY",
+}
+# Replicas are opened read-only and cannot change the journal mode
+SQLITE_READ_PRAGMAS = ("mmap_size", "cache_size", "temp_store")
+SQLITE_TUNING = os.environ.get("SQLITE_TUNING", "1") == "1"
+if SQLITE_TUNING and DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"].update(
+        {
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "timeout": 20,
+                "transaction_mode": "IMMEDIATE",
+                "init_command": ";".join(
+                    f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()
+                ),
+            },
+        }
+    )
+
+# Read replicas (config/replicas.py): safe-method reads of the product list,
+# detail and search views go to these aliases, everything else to `default`.
+# Export DATABASE_REPLICAS as a comma-separated list of SQLite files (opened
+# read-only) or, with POSTGRES_DB set, of PostgreSQL host[:port] entries.
+DATABASE_REPLICAS = []
+for _index, _location in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICAS", "").split(",")), start=1
+):
+    _alias = f"replica{_index}"
+    if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+        DATABASES[_alias] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": f"file:{_location.strip()}?mode=ro",
+            "OPTIONS": {"uri": True},
+        }
+        if SQLITE_TUNING:
+            DATABASES[_alias]["CONN_MAX_AGE"] = 600
+            DATABASES[_alias]["CONN_HEALTH_CHECKS"] = True
+            DATABASES[_alias]["OPTIONS"]["init_command"] = ";".join(
+                f"PRAGMA {name}={SQLITE_PRAGMAS[name]}" for name in SQLITE_READ_PRAGMAS
+            )
+    else:
+        _host, _, _port = _location.strip().partition(":")
+        DATABASES[_alias] = {
+            **DATABASES["default"],
+            "HOST": _host,
+            "PORT": _port or DATABASES["default"]["PORT"],
+        }
+    # Tests read the test database through every alias
+    DATABASES[_alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(_alias)
+DATABASE_ROUTERS = ["config.replicas.ReplicaRouter"]
+# How far a replica may trail the primary: a user's reads stay on the primary
+# this long after their own write, and replica reads are not cached this long
+# after any catalog write. The pins live in the default cache; share it
+# between workers (Redis/Memcached) for read-your-writes across them.
+REPLICA_LAG_SECONDS = 5
+# Seconds a replica that failed to connect is skipped
+REPLICA_RETRY_SECONDS = 30
+
+# Cache (local memory per process by default; point at Redis/Memcached to
+# share cached product reads between workers)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
 # Password validation
+# Hashes made by any listed hasher verify; on login they are rehashed with the
+# first one (and with its current PASSWORD_SCRYPT_PARAMS)
+PASSWORD_HASHERS = [
+    "users.hashers.ProfiledScryptPasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+PASSWORD_SCRYPT_PARAMS = {"work_factor": 2**14, "block_size": 8, "parallelism": 5}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -96,7 +211,7 @@ AUTH_USER_MODEL = "users.User"
 # DRF Settings
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
+        "users.authentication.ExpiringTokenAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
@@ -104,6 +219,68 @@ REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "config.exceptions.custom_exception_handler",
 }
 
+# Verified tokens are cached in-process (LRU) and, if an alias is set, in that
+# shared cache too. Writes to a token or its user evict it right away; other
+# processes may keep serving it for up to the timeout.
+AUTH_TOKEN_CACHE_TIMEOUT = 30
+AUTH_TOKEN_CACHE_MAX_ENTRIES = 10_000
+AUTH_TOKEN_CACHE_ALIAS = None
+# Login tokens expire after AUTH_TOKEN_TTL seconds without use; while in use
+# their expiry slides forward, written at most once per refresh interval.
+# `manage.py purge_expired_tokens` deletes expired rows.
+AUTH_TOKEN_TTL = 7 * 24 * 3600
+AUTH_TOKEN_REFRESH_INTERVAL = 3600
+# Sliding-window limits on POST /api/users/login/, checked before hashing.
+# The per-address limit uses REMOTE_ADDR; behind a reverse proxy, set
+# REST_FRAMEWORK["NUM_PROXIES"] so it reads X-Forwarded-For instead.
+LOGIN_THROTTLE_RATES = {"login_ip": "30/min", "login_username": "5/min"}
+
+# Product catalog performance settings
+# Async product reads (products/async_views.py). config/asgi.py turns them on;
+# under WSGI they would only add an event loop per request.
+PRODUCTS_ASYNC_READS = os.environ.get("PRODUCTS_ASYNC_READS", "0") == "1"
+PRODUCT_CACHE_ALIAS = "default"
+# Paginated totals: cached per filter set, and above this many rows (by the
+# planner's estimate) the estimate is served instead of an exact COUNT(*)
+PRODUCT_COUNT_CACHE_TIMEOUT = 300
+PRODUCT_COUNT_ESTIMATE_THRESHOLD = 100_000
+# Rendered public GET responses (list, detail, search), invalidated by writes
+PRODUCT_RESPONSE_CACHE_TIMEOUT = 300
+# GETs of list, detail and search serialize .values() rows with precomputed
+# converters (products.serializers.ProductReadSerializer); same output
+PRODUCT_FAST_SERIALIZATION = True
+# /api/products/products/facets/: price bucket boundaries (the first bucket
+# is everything below the first bound, the last everything from the last)
+PRODUCT_FACET_PRICE_BUCKETS = (10, 25, 50, 100, 250, 500)
+# /api/products/products/bulk/: items per request, rows per transaction
+PRODUCT_BULK_MAX_ITEMS = 10_000
+PRODUCT_BULK_CHUNK_SIZE = 500
+# Rows fetched per round trip by /api/products/products/export/
+PRODUCT_EXPORT_CHUNK_SIZE = 2000
+# /api/products/reservations/: seconds before an unconfirmed reservation's
+# stock is released, items per reservation, and whether concurrent
+# single-product reservations are combined into one write per batch
+STOCK_RESERVATION_TTL = 900
+STOCK_RESERVATION_MAX_ITEMS = 50
+STOCK_RESERVATION_BATCHING = True
+# /api/products/products/changes/: changes per response (default and cap),
+# seconds the feed stays behind now so slow transactions can commit, and
+# seconds deletions are kept (older watermarks get 410 Gone)
+PRODUCT_CHANGES_PAGE_SIZE = 100
+PRODUCT_CHANGES_MAX_PAGE_SIZE = 1000
+PRODUCT_CHANGES_LAG = 5
+PRODUCT_TOMBSTONE_RETENTION = 30 * 24 * 3600
+
+# Request profiling (config/profiling.py): per-route timings and query
+# counts at /api/metrics/ (staff only) and in Server-Timing headers. Off
+# by default; PROFILING_ENABLED=1 turns it on.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILING_SERVER_TIMING = True
+# Requests kept in the /api/metrics/ ring buffer
+PROFILING_RECENT_REQUESTS = 200
+# A query repeated this many times in one request is flagged as N+1
+PROFILING_N_PLUS_ONE_THRESHOLD = 5
+
 # DRF Spectacular Settings for API Documentation
 SPECTACULAR_SETTINGS = {
     'TITLE': 'E-commerce Product API',
@@ -3,12 +3,16 @@ from django.urls import path, include
 from django.views.generic.base import RedirectView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from config.profiling import MetricsView
+
 urlpatterns = [
     # Redirect root to Swagger Docs
     path("", RedirectView.as_view(url="api/docs/swagger/", permanent=False)),
     path("admin/", admin.site.urls),
     path("api/users/", include("users.urls")),
     path("api/products/", include("products.urls")),
+    # Request profiling metrics (staff only; see config/profiling.py)
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
     # Swagger & Schema Endpoints
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = "products"
+
+    def ready(self):
+        # Connect the signal receivers that keep derived data in sync
+        from . import signals  # noqa: F401
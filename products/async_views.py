@@ -0,0 +1,69 @@
+"""
+ASGI-native product reads.
+
+``async_read_view(view_class)`` wraps one of the product read views (list,
+detail, search) in an async Django view. GET and HEAD requests that get a
+JSON response run on the event loop: the DRF view is set up as usual
+(``initial()``: negotiation, permissions, throttles), then its ``aget()``
+builds the response with the async ORM (``aget``, ``acount``, async
+iteration) and ``finalize_response()`` renders and caches it exactly as the
+synchronous path does.
+
+Everything else is handed to the regular DRF view in a worker thread:
+writes, the browsable API, requests carrying credentials (authentication
+may need the database) and any error response, so status codes and error
+bodies stay identical.
+
+Cache lookups stay synchronous; they are in-process or a single network
+round trip. Note that Django's async ORM still runs each query in a thread;
+what moves onto the loop is everything between the queries.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+
+READ_METHODS = ("GET", "HEAD")
+
+
+async def aread_response(view_class, request, kwargs):
+    """The DRF view's finalized response, or None to use the sync path."""
+    if request.method not in READ_METHODS or "HTTP_AUTHORIZATION" in request.META:
+        return None
+
+    view = view_class()
+    view.setup(request, **kwargs)
+    view.headers = view.default_response_headers
+    drf_request = view.initialize_request(request)
+    view.request = drf_request
+    try:
+        view.initial(drf_request)
+        if not isinstance(drf_request.accepted_renderer, JSONRenderer):
+            return None
+        response = await view.aget(drf_request, **kwargs)
+    except (APIException, Http404, ObjectDoesNotExist):
+        return None
+    view.response = view.finalize_response(drf_request, response)
+    return view.response
+
+
+def async_read_view(view_class):
+    """An async view serving ``view_class`` reads natively (see above)."""
+    sync_view = sync_to_async(view_class.as_view())
+
+    async def view(request, *args, **kwargs):
+        response = await aread_response(view_class, request, kwargs)
+        if response is None:
+            response = await sync_view(request, *args, **kwargs)
+        return response
+
+    # What DRF's as_view() sets: CSRF is DRF's business, and schema
+    # generators find the view class here
+    view.csrf_exempt = True
+    view.cls = view_class
+    view.initkwargs = {}
+    view.__name__ = view_class.__name__
+    view.__doc__ = view_class.__doc__
+    return view
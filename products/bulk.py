@@ -0,0 +1,85 @@
+"""
+Batched product writes, shared by the bulk API endpoint and the catalog import.
+
+Each chunk is written with a single bulk query inside its own transaction, so
+a failure only rolls back that chunk. Bulk queries bypass model signals; call
+``catalog_changed()`` once the writes are done.
+"""
+
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import Product
+from .search import get_search_backend
+
+
+def get_chunk_size():
+    return getattr(settings, "PRODUCT_BULK_CHUNK_SIZE", 500)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def create_products(products, chunk_size=None):
+    """Insert unsaved ``Product`` instances; returns them with their ids."""
+    created = []
+    for chunk in chunked(products, chunk_size or get_chunk_size()):
+        with transaction.atomic():
+            created.extend(Product.objects.bulk_create(chunk))
+    return created
+
+
+def update_products(products, fields, chunk_size=None):
+    """Write ``fields`` of existing ``Product`` instances."""
+    # bulk_update skips auto_now, so stamp updated_at here
+    now = timezone.now()
+    for product in products:
+        product.updated_at = now
+    fields = sorted(set(fields) | {"updated_at"})
+    for chunk in chunked(products, chunk_size or get_chunk_size()):
+        with transaction.atomic():
+            Product.objects.bulk_update(chunk, fields)
+
+
+def upsert_products(products, fields, chunk_size=None):
+    """
+    Write ``fields`` of loaded ``Product`` instances with INSERT ... ON CONFLICT
+    on the primary key. Much cheaper than ``update_products`` for large batches
+    (bulk_update builds a CASE per field and row), but a row deleted since it
+    was loaded is written back.
+    """
+    now = timezone.now()
+    for product in products:
+        product.updated_at = now
+    fields = sorted(set(fields) | {"updated_at"})
+    for chunk in chunked(products, chunk_size or get_chunk_size()):
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                chunk, update_conflicts=True, unique_fields=["id"], update_fields=fields
+            )
+
+
+def delete_products(ids, chunk_size=None):
+    """Delete products by id; returns how many were removed."""
+    deleted = 0
+    for chunk in chunked(ids, chunk_size or get_chunk_size()):
+        with transaction.atomic():
+            deleted += (
+                Product.objects.filter(pk__in=chunk)
+                .delete()[1]
+                .get(Product._meta.label, 0)
+            )
+    return deleted
+
+
+def catalog_changed():
+    """Invalidate caches and in-process indexes after bulk writes."""
+    bump_catalog_version()
+    get_search_backend().reset()
@@ -0,0 +1,197 @@
+"""
+Caching of product reads.
+
+Cached values embed the current catalog version in their keys. Any product
+write bumps the version (see products/signals.py), which orphans all earlier
+entries at once; the cache backend expires them in its own time. Reads from
+a replica are not cached while it may still trail the last write.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from config.profiling import section
+from config.replicas import reading_from_replica, replica_aliases, replica_lag
+
+CATALOG_VERSION_KEY = "products:catalog-version"
+RECENT_WRITE_KEY = "products:recent-write"
+
+
+def get_cache():
+    return caches[getattr(settings, "PRODUCT_CACHE_ALIAS", "default")]
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted version never restarts at a value
+        # that older entries were stored under.
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _bump():
+    cache = get_cache()
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+    if replica_aliases():
+        cache.set(RECENT_WRITE_KEY, True, timeout=replica_lag())
+
+
+def replica_may_be_stale():
+    """
+    Whether this request read from a replica that may not have the latest
+    catalog write yet. Such responses are not cached: stored under the new
+    catalog version, they would outlive the replica's lag.
+    """
+    return reading_from_replica() and get_cache().get(RECENT_WRITE_KEY) is not None
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog read."""
+    _bump()
+    # Bump again once the write is visible, so a read that raced the open
+    # transaction cannot leave stale data cached under the new version.
+    transaction.on_commit(_bump)
+
+
+def normalized_params(request, ignore=()):
+    """Query params as a canonical, order-independent string."""
+    items = []
+    for key in sorted(request.query_params):
+        if key in ignore:
+            continue
+        for value in sorted(request.query_params.getlist(key)):
+            items.append(f"{key}={value}")
+    return "&".join(items)
+
+
+def make_key(prefix, *parts):
+    digest = hashlib.sha1("\0".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return f"products:{prefix}:{catalog_version()}:{digest}"
+
+
+class CachedResponseMixin:
+    """
+    Conditional GET and response caching for public product reads.
+
+    Views provide ``get_validators()``, a cheap ``(last_modified, version)``
+    pair derived from ``Product.updated_at``. It yields a strong ETag and a
+    Last-Modified header, and a matching If-None-Match / If-Modified-Since is
+    answered with a bodiless 304 before anything is serialized.
+
+    Rendered JSON responses are also cached under host, path, normalized query
+    params and the catalog version, so repeat reads skip the database entirely
+    and any product write invalidates them.
+    """
+
+    def get_validators(self):
+        """Return ``(last_modified, version)`` for this GET, or None."""
+        return None
+
+    async def aget_validators(self):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        response = self.cached_response(request)
+        if response is None and self.response_cache_key is not None:
+            response = self.not_modified(request, self.get_validators())
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return response
+
+    async def aget(self, request, *args, **kwargs):
+        """``get()`` for the async read path (see products/async_views.py)."""
+        response = self.cached_response(request)
+        if response is None and self.response_cache_key is not None:
+            response = self.not_modified(request, await self.aget_validators())
+        if response is None:
+            response = await self.aread(request, *args, **kwargs)
+        return response
+
+    def cached_response(self, request):
+        """The cached response for this GET, if any; else prepares to store it."""
+        self.response_cache_key = None
+        self.validators = None
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return None
+
+        self.response_scope = "|".join(
+            (
+                request.get_host(),
+                request.path,
+                request.accepted_media_type,
+                normalized_params(request),
+            )
+        )
+        key = make_key("response", self.response_scope)
+        entry = get_cache().get(key)
+        if entry is None:
+            self.response_cache_key = key
+            return None
+        content, content_type, etag, last_modified = entry
+        response = HttpResponse(content, content_type=content_type)
+        return self._conditional(request, response, etag, last_modified)
+
+    def not_modified(self, request, validators):
+        """A 304 if the client's copy matches ``validators``, else None."""
+        if validators is None:
+            return None
+        last_modified, version = validators
+        # Depends only on this URL's data, not on the catalog version. The
+        # version alone may be a row count, which an edit leaves unchanged.
+        stamp = last_modified.isoformat() if last_modified is not None else ""
+        scope = f"{self.response_scope}|{version}|{stamp}"
+        etag = quote_etag(hashlib.md5(scope.encode()).hexdigest())
+        self.validators = (etag, last_modified)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=self._timestamp(last_modified)
+        )
+        if not_modified is not None:
+            self.response_cache_key = None
+        return not_modified
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, "response_cache_key", None)
+        if key is None or response.status_code != 200 or replica_may_be_stale():
+            return response
+        with section("render"):
+            response.render()
+        if self.validators is not None:
+            etag, last_modified = self.validators
+        else:
+            etag = quote_etag(hashlib.md5(response.content).hexdigest())
+            last_modified = None
+        get_cache().set(
+            key,
+            (response.content, response["Content-Type"], etag, last_modified),
+            getattr(settings, "PRODUCT_RESPONSE_CACHE_TIMEOUT", 300),
+        )
+        return self._conditional(request, response, etag, last_modified)
+
+    @staticmethod
+    def _timestamp(last_modified):
+        # HTTP dates have whole-second precision
+        return int(last_modified.timestamp()) if last_modified is not None else None
+
+    def _conditional(self, request, response, etag, last_modified):
+        response["ETag"] = etag
+        timestamp = self._timestamp(last_modified)
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return get_conditional_response(
+            request, etag=etag, last_modified=timestamp, response=response
+        )
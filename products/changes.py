@@ -0,0 +1,156 @@
+"""
+Incremental change feed for catalog mirrors.
+
+Every product write stamps ``updated_at`` (auto_now, and explicitly on the
+bulk and reservation paths that bypass ``save()``), and every delete leaves
+a ``ProductTombstone``. The feed walks both in (timestamp, id) order, an
+upsert before a delete on ties, from an opaque watermark:
+
+    WHERE (updated_at, id) > watermark ORDER BY updated_at, id LIMIT n
+
+(as two seeks, see ``_read()``) served by product_updated_id_idx and
+tombstone_deleted_idx, so a sync reads only the rows changed since the last
+one, however large the catalog.
+
+Timestamps are taken before commit, so a slow transaction can commit a
+change stamped earlier than one a client has already read past. The feed
+therefore stops PRODUCT_CHANGES_LAG seconds short of now; transactions
+that take longer than that can still be missed.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from config.batches import delete_in_batches
+
+from .models import ProductTombstone
+
+UPSERT, DELETE = 0, 1
+
+
+class InvalidWatermark(ValueError):
+    pass
+
+
+class WatermarkExpired(Exception):
+    """The watermark predates the oldest tombstone still kept."""
+
+
+def changes_lag():
+    return timedelta(seconds=getattr(settings, "PRODUCT_CHANGES_LAG", 5))
+
+
+def tombstone_retention():
+    return timedelta(
+        seconds=getattr(settings, "PRODUCT_TOMBSTONE_RETENTION", 30 * 24 * 3600)
+    )
+
+
+def encode_watermark(position):
+    timestamp, pk, kind = position
+    token = json.dumps([timestamp.isoformat(), pk, kind]).encode("utf-8")
+    return urlsafe_b64encode(token).decode("ascii")
+
+
+def decode_watermark(token):
+    """``(timestamp, id, kind)`` from ``encode_watermark()``."""
+    try:
+        timestamp, pk, kind = json.loads(urlsafe_b64decode(token.encode("ascii")))
+        timestamp = datetime.fromisoformat(timestamp)
+        if timezone.is_naive(timestamp) or kind not in (UPSERT, DELETE):
+            raise ValueError(kind)
+        return timestamp, int(pk), kind
+    except (TypeError, ValueError, UnicodeError, BinasciiError):
+        raise InvalidWatermark(token)
+
+
+def _read(queryset, time_field, id_field, kind, position, size):
+    """
+    Up to ``size`` rows of ``kind`` that sort after ``position`` in (time,
+    id, kind) order. Rows sharing the position's timestamp (a bulk write
+    stamps a whole batch with one) and later rows are read separately: each
+    query is then a plain seek into the (time, id) index, where an OR of the
+    two would scan every row with that timestamp.
+    """
+    order = (time_field, id_field)
+    if position is None:
+        return list(queryset.order_by(*order)[:size])
+    timestamp, pk, position_kind = position
+    id_lookup = "gte" if kind > position_kind else "gt"
+    rows = list(
+        queryset.filter(
+            **{time_field: timestamp, f"{id_field}__{id_lookup}": pk}
+        ).order_by(*order)[:size]
+    )
+    if len(rows) < size:
+        later = queryset.filter(**{f"{time_field}__gt": timestamp})
+        rows.extend(later.order_by(*order)[: size - len(rows)])
+    return rows
+
+
+def changes_since(products, watermark=None, limit=100):
+    """
+    The next ``limit`` changes after ``watermark`` (a token, or None for
+    the beginning), as ``(changes, next_watermark, has_more)``.
+
+    ``products`` is the queryset upserts are read from; its rows (model
+    instances or ``.values()`` dicts) must carry ``id`` and ``updated_at``.
+    Each change is ``(UPSERT, row)`` or ``(DELETE, tombstone)``.
+    ``next_watermark`` resumes after the last change returned; when there
+    were none it moves up to the settled point, so an idle mirror's
+    watermark does not age past the tombstone retention.
+    """
+    now = timezone.now()
+    position = decode_watermark(watermark) if watermark else None
+    if position is not None and position[0] < now - tombstone_retention():
+        raise WatermarkExpired(watermark)
+
+    settled = now - changes_lag()
+    upserts = _read(
+        products.filter(updated_at__lte=settled),
+        "updated_at",
+        "id",
+        UPSERT,
+        position,
+        limit + 1,
+    )
+    deletes = _read(
+        ProductTombstone.objects.filter(deleted_at__lte=settled),
+        "deleted_at",
+        "product_id",
+        DELETE,
+        position,
+        limit + 1,
+    )
+
+    changes = sorted(
+        [(_position(UPSERT, row), UPSERT, row) for row in upserts]
+        + [
+            ((tombstone.deleted_at, tombstone.product_id, DELETE), DELETE, tombstone)
+            for tombstone in deletes
+        ],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    last = changes[-1][0] if changes else (settled, 0, UPSERT)
+    return [(kind, item) for _, kind, item in changes], encode_watermark(last), has_more
+
+
+def _position(kind, row):
+    if isinstance(row, dict):
+        return row["updated_at"], row["id"], kind
+    return row.updated_at, row.pk, kind
+
+
+def prune_tombstones(batch_size=1000):
+    """Delete tombstones past the retention period; returns how many."""
+    expired = ProductTombstone.objects.filter(
+        deleted_at__lt=timezone.now() - tombstone_retention()
+    ).order_by("deleted_at")
+    return delete_in_batches(expired, batch_size)
@@ -0,0 +1,103 @@
+"""
+Counting strategy for paginated product responses.
+
+Exact ``COUNT(*)`` over a filtered catalog often costs more than the page it
+belongs to. ``ProductCounter`` caches counts per normalized filter set (the
+cache is invalidated by any product write, see products/cache.py), and when
+the planner estimates more than ``PRODUCT_COUNT_ESTIMATE_THRESHOLD`` rows it
+serves that estimate instead of counting.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .cache import get_cache, make_key, normalized_params, replica_may_be_stale
+
+# Params that change which page is shown, or how, but not what is counted
+PAGING_PARAMS = (
+    "page",
+    "page_size",
+    "cursor",
+    "pagination",
+    "format",
+    "fields",
+    "exclude",
+)
+
+
+def estimate_count(queryset):
+    """The planner's row estimate for ``queryset``, or None if unavailable."""
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    if connection.vendor == "sqlite" and not queryset.query.where:
+        # SQLite only estimates whole tables, from ANALYZE statistics
+        table = queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            # sqlite_stat1 only exists once ANALYZE has run
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master"
+                " WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table])
+            rows = cursor.fetchall()
+        # One row per index, each led by the number of rows it covers; partial
+        # indexes cover fewer, so the largest is the table's row count.
+        return max(int(stat.split()[0]) for (stat,) in rows) if rows else None
+    return None
+
+
+class ProductCounter:
+    """Counts a request's filtered queryset; returns ``(count, is_exact)``."""
+
+    def __init__(self, request):
+        self.key_parts = (request.path, normalized_params(request, PAGING_PARAMS))
+
+    def _timeout(self):
+        return getattr(settings, "PRODUCT_COUNT_CACHE_TIMEOUT", 300)
+
+    def prime(self, count):
+        """Record an exact count the caller already computed."""
+        self._store(make_key("count", *self.key_parts), (count, True))
+
+    def _store(self, key, result):
+        # Like rendered responses, what a trailing replica counted would
+        # outlive its lag under the new catalog version
+        if not replica_may_be_stale():
+            get_cache().set(key, result, self._timeout())
+
+    def estimate(self, queryset):
+        """The planner's estimate if it is over the threshold, otherwise None."""
+        threshold = getattr(settings, "PRODUCT_COUNT_ESTIMATE_THRESHOLD", 100_000)
+        estimate = estimate_count(queryset)
+        return estimate if estimate is not None and estimate >= threshold else None
+
+    def __call__(self, queryset):
+        cache = get_cache()
+        key = make_key("count", *self.key_parts)
+        cached = cache.get(key)
+        if cached is not None:
+            return tuple(cached)
+
+        estimate = self.estimate(queryset)
+        if estimate is not None:
+            result = (estimate, False)
+        else:
+            result = (queryset.count(), True)
+        self._store(key, result)
+        return result
+
+    async def acount(self, queryset):
+        """``__call__`` for the async read path, in a worker thread."""
+        return await sync_to_async(self)(queryset)
@@ -0,0 +1,81 @@
+"""
+Facet counts for a filtered product queryset, in a single query.
+
+The query groups by category and computes, per category, the row count, the
+in-stock count, the price range and one conditional count per price bucket.
+Catalog-wide totals are then summed from those few rows in Python, so the
+table is scanned once no matter how many facets are shown.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Q
+
+DEFAULT_PRICE_BUCKETS = (10, 25, 50, 100, 250, 500)
+
+
+def price_buckets():
+    """``[(low, high), ...]`` covering every price; None is unbounded."""
+    bounds = [
+        Decimal(str(bound))
+        for bound in getattr(
+            settings, "PRODUCT_FACET_PRICE_BUCKETS", DEFAULT_PRICE_BUCKETS
+        )
+    ]
+    return list(zip([None, *bounds], [*bounds, None]))
+
+
+def _bucket_filter(low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+def compute_facets(queryset, format_price=str):
+    """
+    Category counts, price buckets and stock counts over ``queryset``.
+    ``format_price`` renders Decimal prices and bucket bounds.
+    """
+    buckets = price_buckets()
+    aggregates = {
+        "count": Count("pk"),
+        "in_stock": Count("pk", filter=Q(stock_quantity__gt=0)),
+        "min_price": Min("price"),
+        "max_price": Max("price"),
+    }
+    for index, (low, high) in enumerate(buckets):
+        aggregates[f"bucket_{index}"] = Count("pk", filter=_bucket_filter(low, high))
+    rows = list(
+        queryset.order_by().values("category").annotate(**aggregates).order_by()
+    )
+
+    def total(name):
+        return sum(row[name] for row in rows)
+
+    def price(value):
+        return None if value is None else format_price(value)
+
+    count = total("count")
+    in_stock = total("in_stock")
+    prices = [row["min_price"] for row in rows if row["min_price"] is not None]
+    top_prices = [row["max_price"] for row in rows if row["max_price"] is not None]
+    categories = sorted(rows, key=lambda row: (-row["count"], row["category"]))
+    return {
+        "count": count,
+        "categories": [
+            {"value": row["category"], "count": row["count"]} for row in categories
+        ],
+        "price": {
+            "min": price(min(prices, default=None)),
+            "max": price(max(top_prices, default=None)),
+            "buckets": [
+                {"min": price(low), "max": price(high), "count": total(f"bucket_{i}")}
+                for i, (low, high) in enumerate(buckets)
+            ],
+        },
+        "stock": {"in_stock": in_stock, "out_of_stock": count - in_stock},
+    }
@@ -0,0 +1,139 @@
+"""
+Streaming catalog import, used by ``manage.py import_products``.
+
+Records are read lazily from CSV or NDJSON, validated with ProductSerializer's
+rules and upserted by a natural key, one transaction per batch.
+"""
+
+import csv
+import json
+import threading
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import bulk
+from .models import Product
+from .serializers import ProductSerializer
+
+FORMATS = ("csv", "ndjson")
+
+
+def read_records(path, fmt):
+    """Yield one dict per record without loading the file into memory."""
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "csv":
+            yield from csv.DictReader(handle)
+            return
+        for line in handle:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as exc:
+                    yield {"__error__": f"Invalid JSON: {exc}"}
+
+
+def batches(records, size, skip=0):
+    """Yield ``(first_record_number, rows)``; record numbers start at 1."""
+    records = iter(records)
+    for _ in islice(records, skip):
+        pass
+    number = skip + 1
+    while rows := list(islice(records, size)):
+        yield number, rows
+        number += len(rows)
+
+
+@dataclass
+class BatchResult:
+    records: int = 0
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)  # [(record_number, detail)]
+
+
+class KeyClaims:
+    """
+    Natural keys being written by in-flight batches.
+
+    Parallel batches claim their keys before looking up existing products and
+    release them once committed, so two batches holding the same key are
+    written one after the other instead of both missing it and both inserting.
+    A batch claims all of its keys at once, so claims cannot deadlock.
+    """
+
+    def __init__(self):
+        self.held = set()
+        self.released = threading.Condition()
+
+    @contextmanager
+    def claim(self, keys):
+        keys = set(keys)
+        with self.released:
+            self.released.wait_for(lambda: self.held.isdisjoint(keys))
+            self.held |= keys
+        try:
+            yield
+        finally:
+            with self.released:
+                self.held -= keys
+                self.released.notify_all()
+
+
+def import_batch(rows, first_record, user, key_fields, claims=None):
+    """
+    Validate ``rows`` and upsert them by ``key_fields`` in one transaction.
+
+    Batches written concurrently must share one ``KeyClaims``.
+    """
+    result = BatchResult(records=len(rows))
+    child = ProductSerializer(many=True).child
+    # Keys compare model attributes: "category" is validated into category_id,
+    # while Product.category is a Category instance
+    sources = [child.fields[name].source for name in key_fields]
+    valid = {}
+    for number, row in enumerate(rows, start=first_record):
+        if not isinstance(row, dict) or "__error__" in row:
+            detail = (
+                row.get("__error__") if isinstance(row, dict) else "Expected an object."
+            )
+            result.errors.append((number, detail))
+            continue
+        try:
+            data = child.run_validation(row)
+        except ValidationError as exc:
+            result.errors.append((number, exc.detail))
+            continue
+        # Later records win when a key repeats inside the batch
+        valid[tuple(data.get(source) for source in sources)] = data
+
+    claim = claims.claim(valid) if claims is not None else nullcontext()
+    with claim:
+        existing = {}
+        if valid:
+            lookup = {f"{sources[0]}__in": {key[0] for key in valid}}
+            for product in Product.objects.filter(**lookup).order_by("id"):
+                key = tuple(getattr(product, source) for source in sources)
+                existing.setdefault(key, product)
+
+        to_create, to_update, fields = [], [], set()
+        for key, data in valid.items():
+            product = existing.get(key)
+            if product is None:
+                to_create.append(Product(created_by=user, **data))
+                continue
+            for name, value in data.items():
+                setattr(product, name, value)
+            fields.update(data)
+            to_update.append(product)
+
+        # One transaction per batch, so a checkpoint never covers half a batch
+        with transaction.atomic():
+            bulk.create_products(to_create, chunk_size=len(rows))
+            if to_update:
+                bulk.upsert_products(to_update, fields, chunk_size=len(rows))
+    result.created, result.updated = len(to_create), len(to_update)
+    return result
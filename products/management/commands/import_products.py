@@ -0,0 +1,189 @@
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from products import bulk
+from products.importing import (
+    FORMATS,
+    BatchResult,
+    KeyClaims,
+    batches,
+    import_batch,
+    read_records,
+)
+from products.serializers import ProductSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV or NDJSON product catalog into the database, validating "
+        "each record like the API does and upserting by a natural key."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import")
+        parser.add_argument(
+            "--format", choices=FORMATS, help="Default: taken from the file extension"
+        )
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Username recorded as created_by for new products",
+        )
+        parser.add_argument(
+            "--key",
+            default="name",
+            help="Comma-separated natural key fields used to match existing products",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Batches written in parallel (each worker has its own connection)",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording committed progress; an existing one is resumed",
+        )
+        parser.add_argument(
+            "--progress-every",
+            type=float,
+            default=5.0,
+            help="Seconds between progress reports",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or os.path.splitext(path)[1].lstrip(".").lower()
+        if fmt not in FORMATS:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format.")
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}.")
+        key_fields = [
+            name.strip() for name in options["key"].split(",") if name.strip()
+        ]
+        writable = (
+            set(ProductSerializer.Meta.fields)
+            - set(ProductSerializer.Meta.read_only_fields)
+            - {"id"}
+        )
+        if not key_fields or not set(key_fields) <= writable:
+            raise CommandError(
+                f"--key must name writable product fields: {sorted(writable)}"
+            )
+
+        self.checkpoint_path = options["checkpoint"]
+        self.source_path = path
+        skip = self.load_checkpoint(path)
+        if skip:
+            self.stdout.write(f"Resuming after record {skip}")
+
+        self.totals = BatchResult()
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.committed = skip
+        self.finished = {}  # first record number -> record count, out of order
+        self.errors_shown = 0
+
+        records = read_records(path, fmt)
+        workers = max(1, options["workers"])
+        if workers == 1:
+            for first, rows in batches(records, options["batch_size"], skip):
+                self.record(first, import_batch(rows, first, user, key_fields))
+                self.report(options["progress_every"])
+        else:
+            self.run_parallel(records, skip, user, key_fields, workers, options)
+
+        bulk.catalog_changed()
+        self.report(0, final=True)
+
+    def run_parallel(self, records, skip, user, key_fields, workers, options):
+        claims = KeyClaims()
+
+        def work(first, rows):
+            try:
+                return first, import_batch(rows, first, user, key_fields, claims)
+            finally:
+                connection.close()  # connections are per thread
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for first, rows in batches(records, options["batch_size"], skip):
+                pending.add(executor.submit(work, first, rows))
+                # Bound read-ahead so memory stays flat on huge files
+                while len(pending) >= workers * 2:
+                    pending = self.collect(pending, options["progress_every"])
+            while pending:
+                pending = self.collect(pending, options["progress_every"])
+
+    def collect(self, pending, every):
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            self.record(*future.result())
+        self.report(every)
+        return pending
+
+    def record(self, first, result):
+        totals = self.totals
+        totals.records += result.records
+        totals.created += result.created
+        totals.updated += result.updated
+        totals.errors.extend(result.errors)
+        for number, detail in result.errors:
+            if self.errors_shown < 20:
+                self.stderr.write(f"Record {number}: {json.dumps(detail, default=str)}")
+                self.errors_shown += 1
+
+        # Only a contiguous run of finished batches is safe to checkpoint
+        self.finished[first] = result.records
+        while self.committed + 1 in self.finished:
+            self.committed += self.finished.pop(self.committed + 1)
+        self.save_checkpoint()
+
+    def report(self, every, final=False):
+        now = time.monotonic()
+        if not final and now - self.last_report < every:
+            return
+        self.last_report = now
+        elapsed = max(now - self.started, 1e-9)
+        totals = self.totals
+        line = (
+            f"{totals.records} records ({totals.records / elapsed:.0f}/s): "
+            f"{totals.created} created, {totals.updated} updated, "
+            f"{len(totals.errors)} invalid"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done. {line}") if final else line)
+
+    def load_checkpoint(self, path):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path) as handle:
+            state = json.load(handle)
+        if state.get("path") != os.path.abspath(path):
+            raise CommandError(
+                f"{self.checkpoint_path} belongs to {state.get('path')}, not {path}."
+            )
+        return int(state["records"])
+
+    def save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        state = {"path": os.path.abspath(self.source_path), "records": self.committed}
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, "w") as handle:
+            json.dump(state, handle)
+        os.replace(temporary, self.checkpoint_path)
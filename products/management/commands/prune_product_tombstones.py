@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from products.changes import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete product tombstones older than PRODUCT_TOMBSTONE_RETENTION. "
+        "The change feed already refuses watermarks that old, so no mirror "
+        "can still need them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from products.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Put the stock held by expired, unconfirmed reservations back on "
+        "their products. Reservations confirmed or released meanwhile are "
+        "left alone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        released = release_expired(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released} expired reservations.")
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 12:03
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_product_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="product",
+            options={"ordering": ["name", "id"], "verbose_name_plural": "Products"},
+        ),
+    ]
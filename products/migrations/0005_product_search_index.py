@@ -0,0 +1,121 @@
+# Generated by Django 6.0 on 2026-10-18 12:06
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models, transaction
+
+SQLITE_FORWARD = [
+    # Name, description and category as FTS5 columns, in that order (the bm25
+    # weights below follow it). Prefix indexes speed up "term*" queries.
+    """
+    CREATE VIRTUAL TABLE products_product_fts USING fts5(
+        name, description, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+    "INSERT INTO products_product_fts(products_product_fts, rank) "
+    "VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+    "INSERT INTO products_product_fts(rowid, name, description, category) "
+    "SELECT id, name, description, category FROM products_product",
+    # Triggers keep the index in step with every write path, bulk ones included
+    """
+    CREATE TRIGGER products_product_fts_insert AFTER INSERT ON products_product
+    BEGIN
+        INSERT INTO products_product_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER products_product_fts_update
+    AFTER UPDATE OF name, description, category ON products_product
+    BEGIN
+        UPDATE products_product_fts
+        SET name = new.name, description = new.description, category = new.category
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER products_product_fts_delete AFTER DELETE ON products_product
+    BEGIN
+        DELETE FROM products_product_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS products_product_fts_insert",
+    "DROP TRIGGER IF EXISTS products_product_fts_update",
+    "DROP TRIGGER IF EXISTS products_product_fts_delete",
+    "DROP TABLE IF EXISTS products_product_fts",
+]
+
+# Must match PG_SEARCH_VECTOR in products/search.py
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX products_product_search_idx ON products_product USING GIN ((
+        setweight(to_tsvector('simple', coalesce("products_product"."name", '')), 'A')
+        || setweight(to_tsvector('simple', coalesce("products_product"."category", '')), 'B')
+        || setweight(to_tsvector('simple', coalesce("products_product"."description", '')), 'C')
+    ))
+    """,
+]
+
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS products_product_search_idx"]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                schema_editor.execute(SQLITE_FORWARD[0])
+        except OperationalError:
+            # SQLite built without FTS5: products.search falls back to the
+            # in-process index.
+            return
+        for sql in SQLITE_FORWARD[1:]:
+            schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        for sql in POSTGRES_FORWARD:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}
+    for sql in statements.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_ordering_tiebreaker"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSearchEntry",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_entry",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("document", models.TextField(db_column="products_product_fts")),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "products_product_fts",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,247 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+# Counters follow every write path, bulk ones included. The first product
+# written with a new category name creates its row (the foreign key is
+# deferred, so the check at commit sees it).
+SQLITE_COUNTER_TRIGGERS = [
+    """
+    CREATE TRIGGER products_category_count_insert AFTER INSERT ON products_product
+    BEGIN
+        INSERT INTO products_category (name, product_count, in_stock_count)
+        VALUES (new.category, 1, new.stock_quantity > 0)
+        ON CONFLICT (name) DO UPDATE SET
+            product_count = product_count + 1,
+            in_stock_count = in_stock_count + excluded.in_stock_count;
+    END
+    """,
+    """
+    CREATE TRIGGER products_category_count_update
+    AFTER UPDATE OF category, stock_quantity ON products_product
+    WHEN old.category IS NOT new.category
+        OR (old.stock_quantity > 0) != (new.stock_quantity > 0)
+    BEGIN
+        UPDATE products_category SET
+            product_count = product_count - 1,
+            in_stock_count = in_stock_count - (old.stock_quantity > 0)
+        WHERE name = old.category;
+        INSERT INTO products_category (name, product_count, in_stock_count)
+        VALUES (new.category, 1, new.stock_quantity > 0)
+        ON CONFLICT (name) DO UPDATE SET
+            product_count = product_count + 1,
+            in_stock_count = in_stock_count + excluded.in_stock_count;
+    END
+    """,
+    """
+    CREATE TRIGGER products_category_count_delete AFTER DELETE ON products_product
+    BEGIN
+        UPDATE products_category SET
+            product_count = product_count - 1,
+            in_stock_count = in_stock_count - (old.stock_quantity > 0)
+        WHERE name = old.category;
+    END
+    """,
+]
+
+SQLITE_COUNTER_TRIGGERS_BACKWARD = [
+    "DROP TRIGGER IF EXISTS products_category_count_insert",
+    "DROP TRIGGER IF EXISTS products_category_count_update",
+    "DROP TRIGGER IF EXISTS products_category_count_delete",
+]
+
+# Rebuilding products_product on SQLite (the AlterField below) drops its
+# triggers, including the full-text ones from migration 0005
+SQLITE_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_insert
+    AFTER INSERT ON products_product
+    BEGIN
+        INSERT INTO products_product_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_update
+    AFTER UPDATE OF name, description, category ON products_product
+    BEGIN
+        UPDATE products_product_fts
+        SET name = new.name, description = new.description, category = new.category
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_delete
+    AFTER DELETE ON products_product
+    BEGIN
+        DELETE FROM products_product_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+POSTGRES_COUNTER_TRIGGERS = [
+    """
+    CREATE FUNCTION products_category_count() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE'
+            AND OLD.category IS NOT DISTINCT FROM NEW.category
+            AND (OLD.stock_quantity > 0) = (NEW.stock_quantity > 0) THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE products_category SET
+                product_count = product_count - 1,
+                in_stock_count = in_stock_count - (OLD.stock_quantity > 0)::int
+            WHERE name = OLD.category;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO products_category (name, product_count, in_stock_count)
+            VALUES (NEW.category, 1, (NEW.stock_quantity > 0)::int)
+            ON CONFLICT (name) DO UPDATE SET
+                product_count = products_category.product_count + 1,
+                in_stock_count = products_category.in_stock_count
+                    + EXCLUDED.in_stock_count;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER products_category_count
+    AFTER INSERT OR DELETE OR UPDATE OF category, stock_quantity
+    ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_category_count()
+    """,
+]
+
+POSTGRES_COUNTER_TRIGGERS_BACKWARD = [
+    "DROP TRIGGER IF EXISTS products_category_count ON products_product",
+    "DROP FUNCTION IF EXISTS products_category_count()",
+]
+
+
+def has_search_table(schema_editor):
+    connection = schema_editor.connection
+    return "products_product_fts" in connection.introspection.table_names()
+
+
+def create_categories(apps, schema_editor):
+    """One Category per distinct product category string, counted."""
+    Category = apps.get_model("products", "Category")
+    Product = apps.get_model("products", "Product")
+    rows = (
+        Product.objects.order_by()
+        .values("category")
+        .annotate(
+            total=Count("pk"), in_stock=Count("pk", filter=Q(stock_quantity__gt=0))
+        )
+    )
+    Category.objects.bulk_create(
+        Category(
+            name=row["category"],
+            product_count=row["total"],
+            in_stock_count=row["in_stock"],
+        )
+        for row in rows
+    )
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sql in SQLITE_COUNTER_TRIGGERS:
+            schema_editor.execute(sql)
+        restore_search_triggers(apps, schema_editor)
+    elif vendor == "postgresql":
+        for sql in POSTGRES_COUNTER_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {
+        "sqlite": SQLITE_COUNTER_TRIGGERS_BACKWARD,
+        "postgresql": POSTGRES_COUNTER_TRIGGERS_BACKWARD,
+    }
+    for sql in statements.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite" and has_search_table(schema_editor):
+        for sql in SQLITE_SEARCH_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_search_index"),
+    ]
+
+    operations = [
+        # Backwards, the table rebuild undoing the AlterField below drops the
+        # full-text triggers; this runs last and puts them back
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.CreateModel(
+            name="Category",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                (
+                    "product_count",
+                    models.PositiveIntegerField(default=0, editable=False),
+                ),
+                (
+                    "in_stock_count",
+                    models.PositiveIntegerField(default=0, editable=False),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Categories",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.RunPython(create_categories, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_category_lower_idx",
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="category_name_lower_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="category",
+            field=models.ForeignKey(
+                db_column="category",
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="products",
+                to="products.category",
+                to_field="name",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "name"], name="product_category_name_idx"
+            ),
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 6.0 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+# Adding a stored generated column rebuilds products_product on SQLite,
+# which drops every trigger on it: the full-text ones (migration 0005) and
+# the category counters (migration 0006)
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_insert
+    AFTER INSERT ON products_product
+    BEGIN
+        INSERT INTO products_product_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_update
+    AFTER UPDATE OF name, description, category ON products_product
+    BEGIN
+        UPDATE products_product_fts
+        SET name = new.name, description = new.description, category = new.category
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_product_fts_delete
+    AFTER DELETE ON products_product
+    BEGIN
+        DELETE FROM products_product_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_category_count_insert
+    AFTER INSERT ON products_product
+    BEGIN
+        INSERT INTO products_category (name, product_count, in_stock_count)
+        VALUES (new.category, 1, new.stock_quantity > 0)
+        ON CONFLICT (name) DO UPDATE SET
+            product_count = product_count + 1,
+            in_stock_count = in_stock_count + excluded.in_stock_count;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_category_count_update
+    AFTER UPDATE OF category, stock_quantity ON products_product
+    WHEN old.category IS NOT new.category
+        OR (old.stock_quantity > 0) != (new.stock_quantity > 0)
+    BEGIN
+        UPDATE products_category SET
+            product_count = product_count - 1,
+            in_stock_count = in_stock_count - (old.stock_quantity > 0)
+        WHERE name = old.category;
+        INSERT INTO products_category (name, product_count, in_stock_count)
+        VALUES (new.category, 1, new.stock_quantity > 0)
+        ON CONFLICT (name) DO UPDATE SET
+            product_count = product_count + 1,
+            in_stock_count = in_stock_count + excluded.in_stock_count;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_category_count_delete
+    AFTER DELETE ON products_product
+    BEGIN
+        UPDATE products_category SET
+            product_count = product_count - 1,
+            in_stock_count = in_stock_count - (old.stock_quantity > 0)
+        WHERE name = old.category;
+    END
+    """,
+]
+
+
+def restore_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    has_search_table = "products_product_fts" in connection.introspection.table_names()
+    for sql in SQLITE_TRIGGERS:
+        if has_search_table or "products_product_fts" not in sql:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_stock_reservations"),
+    ]
+
+    operations = [
+        # Backwards, the rebuild undoing the AddField below runs before this
+        migrations.RunPython(migrations.RunPython.noop, restore_triggers),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_stock_name_idx",
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="in_stock",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Q(("stock_quantity__gt", 0)),
+                output_field=models.BooleanField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("in_stock", True)),
+                fields=["name", "id"],
+                name="product_in_stock_name_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("in_stock", False)),
+                fields=["name", "id"],
+                name="product_out_of_stock_name_idx",
+            ),
+        ),
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,64 @@
+import uuid
+
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings  # Import settings to reference AUTH_USER_MODEL
 
+# Enables `field__lower=...` lookups, which match the functional LOWER() indexes
+# below (iexact compiles to LIKE/UPPER() and cannot use them).
+models.CharField.register_lookup(Lower)
+
+
+class Category(models.Model):
+    """
+    A product category, referenced by name from ``Product.category``.
+
+    Rows are created and counted by database triggers (migration 0006): the
+    first product written with a new category name creates it, and every
+    insert, delete, move between categories or stock change keeps
+    ``product_count`` and ``in_stock_count`` current, bulk writes included.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    in_stock_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name_plural = "Categories"
+        indexes = [
+            # Case-insensitive category filters resolve names here, not
+            # against every product row
+            models.Index(Lower("name"), name="category_name_lower_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
 
 class Product(models.Model):
     # Product attributes
     name = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    category = models.CharField(max_length=100)
+    # Keyed by name, so the column still holds the category string (the
+    # full-text index reads it) and writes can pass ``category_id="Books"``
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.PROTECT,
+        to_field="name",
+        db_column="category",
+        db_index=False,  # product_category_name_idx leads with it
+        related_name="products",
+    )
     stock_quantity = models.IntegerField(default=0)
+    # Computed and stored by the database on every write, bulk ones
+    # included, so stock_status filters can use the partial indexes below
+    in_stock = models.GeneratedField(
+        expression=models.Q(stock_quantity__gt=0),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
     image_url = models.URLField(max_length=500, blank=True, null=True)
 
     # Relationship (Foreign Key - One-to-Many)
@@ -24,8 +74,147 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ["name"]
+        # id breaks ties between equal names so pages are stable
+        ordering = ["name", "id"]
         verbose_name_plural = "Products"
+        indexes = [
+            # Default ordering (and its tiebreaker) for every product list
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+            # min_price / max_price range filters
+            models.Index(fields=["price"], name="product_price_idx"),
+            # stock_status filters, already in list order. Each index only
+            # holds the rows its filter matches (backends without partial
+            # indexes skip them)
+            models.Index(
+                fields=["name", "id"],
+                condition=models.Q(in_stock=True),
+                name="product_in_stock_name_idx",
+            ),
+            models.Index(
+                fields=["name", "id"],
+                condition=models.Q(in_stock=False),
+                name="product_out_of_stock_name_idx",
+            ),
+            # Category filters (names resolved through Category), then sorted
+            # by name
+            models.Index(fields=["category", "name"], name="product_category_name_idx"),
+            # The change feed walks products in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"], name="product_updated_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ProductTombstone(models.Model):
+    """
+    Records a deleted product for the change feed (see products/changes.py).
+
+    Written by a ``post_delete`` receiver, so every ORM delete path records
+    one: the detail view, the bulk endpoint and cascades from a deleted
+    user. ``manage.py prune_product_tombstones`` drops those older than
+    PRODUCT_TOMBSTONE_RETENTION.
+    """
+
+    product_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["deleted_at", "product_id"], name="tombstone_deleted_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} deleted at {self.deleted_at}"
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for a user's checkout (see products/reservations.py).
+
+    Reserving decrements ``Product.stock_quantity`` right away. Confirming
+    keeps the decrement; releasing the reservation, or letting it expire
+    unconfirmed, puts the stock back.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="stock_reservations",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    confirmed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The expiry sweep only ever looks at unconfirmed reservations
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(confirmed_at__isnull=True),
+                name="reservation_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return str(self.pk)
+
+
+class StockReservationItem(models.Model):
+    reservation = models.ForeignKey(
+        StockReservation, on_delete=models.CASCADE, related_name="items"
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="reservation_items"
+    )
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["reservation", "product"], name="reservation_product_unique"
+            ),
+        ]
+
+
+class Match(models.Lookup):
+    """``field__match=...`` compiles to SQLite's full-text ``MATCH`` operator."""
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class ProductSearchEntry(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over products (migration 0005).
+
+    The table is kept in sync with products_product by database triggers, so
+    bulk writes are indexed too. It only exists on SQLite; see products/search.py.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_entry",
+    )
+    # FTS5 exposes a hidden column named after the table for MATCH queries,
+    # and a hidden `rank` column holding the bm25 score of the current match.
+    document = models.TextField(db_column="products_product_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "products_product_fts"
+
+
+ProductSearchEntry._meta.get_field("document").register_lookup(Match)
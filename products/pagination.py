@@ -0,0 +1,243 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from functools import partial
+
+from django.core.paginator import (
+    EmptyPage,
+    InvalidPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .counting import ProductCounter
+
+# Clients may ask for smaller or larger pages with ?page_size=, up to this cap
+MAX_PAGE_SIZE = 100
+
+
+class CountingPage(Page):
+    """A page that knows from one look-ahead row whether another one follows."""
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+
+class CountingPaginator(Paginator):
+    """
+    Django paginator that takes its count from a ``ProductCounter``.
+
+    The count may be a planner estimate, so it is only shown to clients: pages
+    are fetched with one extra row to tell whether another page follows, and
+    page numbers are only checked against the count when it is exact.
+    """
+
+    def __init__(self, object_list, per_page, counter, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.counter = counter
+        self.count_exact = True
+
+    @cached_property
+    def count(self):
+        count, self.count_exact = self.counter(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        self.count  # Sets count_exact
+        if self.count_exact:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom, top = self.page_bounds(number)
+        return self.page_from_rows(list(self.object_list[bottom:top]), number)
+
+    def page_bounds(self, number):
+        """The slice for page ``number`` plus the look-ahead row."""
+        bottom = (number - 1) * self.per_page
+        return bottom, bottom + self.per_page + 1
+
+    def page_from_rows(self, rows, number):
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        has_more = len(rows) > self.per_page
+        return CountingPage(rows[: self.per_page], number, self, has_more)
+
+
+class ProductPageNumberPagination(PageNumberPagination):
+    """
+    Default page-number pagination with a client-selectable page size.
+
+    Totals come from ``ProductCounter`` (cached, or estimated for very large
+    result sets); ``count_exact`` in the response says which one was served.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CountingPaginator, counter=ProductCounter(request)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset()`` for the async read path, on the async ORM."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        counter = ProductCounter(request)
+        paginator = CountingPaginator(queryset, page_size, counter=counter)
+        paginator.count, paginator.count_exact = await counter.acount(queryset)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+            bottom, top = paginator.page_bounds(number)
+            rows = [row async for row in queryset[bottom:top]]
+            self.page = paginator.page_from_rows(rows, number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_exact": self.page.paginator.count_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_exact"] = {
+            "type": "boolean",
+            "description": "False when count is a planner estimate.",
+        }
+        return response_schema
+
+
+class ProductKeysetPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination over the (name, id) ordering.
+
+    The cursor stores the (name, id) of the row at the edge of the current page
+    and the next page is fetched with ``WHERE (name, id) > cursor``, which walks
+    product_name_id_idx directly. Unlike page numbers there is no OFFSET and no
+    COUNT(*), so every page costs the same no matter how deep it is.
+    """
+
+    ordering = ("name", "id")
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset()`` for the async read path, on the async ORM."""
+        queryset = self._page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self._set_page([row async for row in queryset])
+
+    def _page_queryset(self, queryset, request):
+        """The query for one page plus one row, to tell if there are more."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor["reverse"]
+        if self.cursor is not None:
+            queryset = queryset.filter(self._keyset_filter(self.cursor, self.reverse))
+        order = ("-name", "-id") if self.reverse else self.ordering
+        return queryset.order_by(*order)[: self.page_size + 1]
+
+    def _set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    @staticmethod
+    def _keyset_filter(cursor, reverse):
+        name, pk = cursor["name"], cursor["id"]
+        # The leading name__gte/lte bound lets the database seek straight into
+        # the (name, id) index; the OR only resolves ties on the same name.
+        if reverse:
+            return Q(name__lte=name) & (Q(name__lt=name) | Q(id__lt=pk))
+        return Q(name__gte=name) & (Q(name__gt=name) | Q(id__gt=pk))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0], reverse=True))
+
+    @staticmethod
+    def _position(item, reverse):
+        if isinstance(item, dict):
+            name, pk = item["name"], item["id"]
+        else:
+            name, pk = item.name, item.pk
+        return {"name": name, "id": pk, "reverse": reverse}
+
+    def encode_cursor(self, cursor):
+        token = [cursor["name"], cursor["id"], int(cursor["reverse"])]
+        encoded = b64encode(json.dumps(token).encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            name, pk, reverse = json.loads(b64decode(encoded.encode("ascii")))
+            return {"name": str(name), "id": int(pk), "reverse": bool(reverse)}
+        except (TypeError, ValueError, UnicodeError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
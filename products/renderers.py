@@ -0,0 +1,80 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional; FastJSONRenderer falls back to the stdlib
+    orjson = None
+
+
+def ndjson_line(row):
+    """One row as a compact JSON line, encoded like DRF's JSONRenderer."""
+    return (
+        json.dumps(row, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+        + "\n"
+    )
+
+
+class Echo:
+    """File-like object whose write() hands the value back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON: one object per line."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return "".join(ndjson_line(row) for row in rows).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """Comma-separated values with a header row taken from the first row."""
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        if not rows:
+            return b""
+        writer = csv.writer(Echo())
+        lines = [writer.writerow(list(rows[0]))]
+        lines.extend(writer.writerow(list(row.values())) for row in rows)
+        return "".join(lines).encode(self.charset)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` that encodes with orjson when it is installed.
+
+    For compact, non-ASCII-escaped output of dicts, lists, strings, ints,
+    bools and None (every product payload), orjson produces the same bytes as
+    the stdlib encoder. Floats can be formatted differently, so this is only
+    used where payloads carry none. Anything orjson rejects, and indented
+    output, goes through ``JSONRenderer``.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these to stay a strict subset of JavaScript
+        return content.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
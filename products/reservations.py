@@ -0,0 +1,281 @@
+"""
+Stock reservations without lost updates or row locks held across requests.
+
+Every change to ``Product.stock_quantity`` here is a single conditional
+UPDATE:
+
+    UPDATE products_product SET stock_quantity = stock_quantity - n
+    WHERE id = ... AND stock_quantity >= n
+
+The database applies it atomically, so concurrent checkouts can never take
+the count below zero, and no lock outlives the statement's transaction. A
+reservation of several products runs its decrements in one transaction, in
+product id order (so two reservations cannot deadlock), and is rolled back
+whole if any product is short.
+
+Single-product reservations go through ``ReservationBatcher``: requests for
+the same product that arrive while one is being written are combined into
+the next batch, which takes their total with one UPDATE. A hot SKU then
+costs one write per batch instead of one per request.
+
+Reservations expire after ``STOCK_RESERVATION_TTL`` seconds unless confirmed.
+Expired ones are released by ``manage.py release_expired_reservations``, and
+on demand when a reservation finds a product short.
+"""
+
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from config.batches import in_batches
+
+from .cache import bump_catalog_version
+from .models import Product, StockReservation, StockReservationItem
+
+
+class InsufficientStock(Exception):
+    """Raised with the ids of the products that could not be reserved."""
+
+    def __init__(self, product_ids):
+        super().__init__(f"Insufficient stock for products {sorted(product_ids)}")
+        self.product_ids = sorted(product_ids)
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, "STOCK_RESERVATION_TTL", 900))
+
+
+def _take(product_id, quantity, now):
+    """Decrement one product's stock if it has ``quantity``; True on success."""
+    return bool(
+        Product.objects.filter(pk=product_id, stock_quantity__gte=quantity).update(
+            stock_quantity=F("stock_quantity") - quantity, updated_at=now
+        )
+    )
+
+
+def _restock(quantities, now):
+    """Put ``{product_id: quantity}`` back, one UPDATE per product."""
+    for product_id in sorted(quantities):
+        Product.objects.filter(pk=product_id).update(
+            stock_quantity=F("stock_quantity") + quantities[product_id],
+            updated_at=now,
+        )
+
+
+def _create_reservations(orders, now):
+    """
+    Save a reservation per ``(user, {product_id: quantity})`` order, with
+    its items, in two bulk INSERTs.
+    """
+    expires_at = now + reservation_ttl()
+    reservations = [
+        StockReservation(user=user, created_at=now, expires_at=expires_at)
+        for user, _ in orders
+    ]
+    StockReservation.objects.bulk_create(reservations)
+    StockReservationItem.objects.bulk_create(
+        StockReservationItem(
+            reservation=reservation, product_id=product_id, quantity=quantity
+        )
+        for reservation, (_, items) in zip(reservations, orders)
+        for product_id, quantity in items.items()
+    )
+    return reservations
+
+
+def _reserve(user, items):
+    now = timezone.now()
+    with transaction.atomic():
+        short = [pid for pid in sorted(items) if not _take(pid, items[pid], now)]
+        if short:
+            # Leaving the block rolls back the decrements already made
+            raise InsufficientStock(short)
+        (reservation,) = _create_reservations([(user, items)], now)
+        transaction.on_commit(bump_catalog_version)
+    return reservation
+
+
+def reserve(user, items):
+    """
+    Reserve ``{product_id: quantity}`` for ``user``, all or nothing. Raises
+    InsufficientStock; expired reservations holding a short product are
+    released first and the reservation retried once.
+    """
+    items = {pid: quantity for pid, quantity in items.items() if quantity > 0}
+    if len(items) == 1 and getattr(settings, "STOCK_RESERVATION_BATCHING", True):
+        ((product_id, quantity),) = items.items()
+        attempt = lambda: batcher.reserve(user, product_id, quantity)  # noqa: E731
+    else:
+        attempt = lambda: _reserve(user, items)  # noqa: E731
+    try:
+        return attempt()
+    except InsufficientStock as exc:
+        if not release_expired(product_ids=exc.product_ids):
+            raise
+    return attempt()
+
+
+class PendingReservation:
+    """One request waiting in a ReservationBatcher queue."""
+
+    def __init__(self, user, quantity):
+        self.user = user
+        self.quantity = quantity
+        self.done = threading.Event()
+        self.leads = False
+        self.reservation = None
+        self.error = None
+
+
+class ReservationBatcher:
+    """
+    Flat combining of single-product reservations, per product.
+
+    The first request for a product becomes the leader and writes its own
+    batch. Requests arriving meanwhile queue up; when the leader finishes it
+    hands the queue to the oldest of them, which writes them all as one
+    batch: one conditional UPDATE for the total, then one INSERT each for
+    the reservations and their items. If the total is not available, the
+    batch falls back to taking each request in arrival order.
+
+    Batches only form between threads of one process; other processes and
+    multi-product reservations contend through the database as usual.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = defaultdict(list)  # product id -> waiting requests
+        self._active = set()  # product ids with a batch being written
+
+    def reserve(self, user, product_id, quantity):
+        pending = PendingReservation(user, quantity)
+        with self._lock:
+            self._queues[product_id].append(pending)
+            pending.leads = product_id not in self._active
+            self._active.add(product_id)
+        if not pending.leads:
+            pending.done.wait()
+        if pending.leads:
+            self._lead(product_id)
+        if pending.error is not None:
+            raise pending.error
+        return pending.reservation
+
+    def _lead(self, product_id):
+        with self._lock:
+            batch = self._queues.pop(product_id)
+        try:
+            self._write(product_id, batch)
+        except Exception as exc:
+            for pending in batch:
+                pending.error = exc
+        finally:
+            with self._lock:
+                waiting = self._queues.get(product_id)
+                if waiting:
+                    waiting[0].leads = True
+                    waiting[0].done.set()
+                else:
+                    self._active.discard(product_id)
+            for pending in batch:
+                pending.done.set()
+
+    def _write(self, product_id, batch):
+        now = timezone.now()
+        with transaction.atomic():
+            total = sum(pending.quantity for pending in batch)
+            if _take(product_id, total, now):
+                granted = batch
+            else:
+                granted = [p for p in batch if _take(product_id, p.quantity, now)]
+            orders = [(p.user, {product_id: p.quantity}) for p in granted]
+            reservations = _create_reservations(orders, now)
+            if granted:
+                transaction.on_commit(bump_catalog_version)
+        for pending, reservation in zip(granted, reservations):
+            pending.reservation = reservation
+        for pending in batch:
+            if pending.reservation is None:
+                pending.error = InsufficientStock([product_id])
+
+
+batcher = ReservationBatcher()
+
+
+def confirm(reservation_id, user):
+    """
+    Mark a live reservation confirmed, making its decrements permanent.
+    Returns False if it is unknown, expired or already confirmed.
+    """
+    now = timezone.now()
+    return bool(
+        StockReservation.objects.filter(
+            pk=reservation_id,
+            user=user,
+            confirmed_at__isnull=True,
+            expires_at__gt=now,
+        ).update(confirmed_at=now)
+    )
+
+
+def _release(reservation_ids):
+    """
+    Delete the given unconfirmed reservations and restock their items.
+    Each one is claimed by its DELETE, so concurrent releases of the same
+    reservation (a user and the expiry sweep) restock it only once.
+    """
+    now = timezone.now()
+    released = 0
+    with transaction.atomic():
+        items = defaultdict(list)
+        for item in StockReservationItem.objects.filter(
+            reservation__in=reservation_ids
+        ).values("reservation_id", "product_id", "quantity"):
+            items[item["reservation_id"]].append(item)
+        quantities = Counter()
+        for reservation_id in reservation_ids:
+            claimed, _ = StockReservation.objects.filter(
+                pk=reservation_id, confirmed_at__isnull=True
+            ).delete()
+            if claimed:
+                released += 1
+                for item in items[reservation_id]:
+                    quantities[item["product_id"]] += item["quantity"]
+        _restock(quantities, now)
+        if quantities:
+            transaction.on_commit(bump_catalog_version)
+    return released
+
+
+def release(reservation_id, user):
+    """Give back an unconfirmed reservation's stock; False if there is none."""
+    reservations = StockReservation.objects.filter(
+        pk=reservation_id, user=user, confirmed_at__isnull=True
+    )
+    return _release(list(reservations.values_list("pk", flat=True))) > 0
+
+
+def release_user_reservations(user):
+    """Give back every unconfirmed reservation ``user`` holds."""
+    reservations = StockReservation.objects.filter(user=user, confirmed_at__isnull=True)
+    return _release(list(reservations.values_list("pk", flat=True)))
+
+
+def release_expired(product_ids=None, batch_size=500):
+    """
+    Release expired, unconfirmed reservations (only those holding one of
+    ``product_ids``, if given), ``batch_size`` per transaction. Returns how
+    many were released.
+    """
+    expired = StockReservation.objects.filter(
+        confirmed_at__isnull=True, expires_at__lte=timezone.now()
+    )
+    if product_ids is not None:
+        expired = expired.filter(items__product__in=product_ids).distinct()
+    return in_batches(expired, batch_size, _release)
@@ -0,0 +1,255 @@
+"""
+Full-text search backends for ProductSearchView.
+
+A backend takes a product queryset and a free-text query and returns the
+matching products ordered by relevance, with every query term treated as a
+prefix ("wire mou" matches "Wireless Mouse"). Name matches rank above category
+matches, which rank above description matches.
+
+The default backend follows the database: an FTS5 table on SQLite, a weighted
+tsvector with a GIN index on PostgreSQL, and an in-process inverted index
+everywhere else. Set ``PRODUCT_SEARCH_BACKEND`` to a dotted path to override.
+"""
+
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Case, F, FloatField, IntegerField, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Product, ProductSearchEntry
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Relative weight of a hit in each field (used by every backend)
+FIELD_WEIGHTS = {"name": 10.0, "category": 5.0, "description": 1.0}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class BaseSearchBackend:
+    """Interface every search backend implements."""
+
+    def search(self, queryset, query):
+        """Filter ``queryset`` to products matching ``query``, best match first."""
+        raise NotImplementedError
+
+    def index(self, product):
+        """Called after a product is saved. Database-backed indexes ignore it."""
+
+    def remove(self, product_id):
+        """Called after a product is deleted. Database-backed indexes ignore it."""
+
+    def reset(self):
+        """Called after bulk writes that bypass model signals."""
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """SQLite FTS5 index maintained by triggers (see migration 0005)."""
+
+    def search(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        # Quoted prefix queries; terms are \w+ so they cannot break the syntax
+        match = " ".join(f'"{term}"*' for term in terms)
+        return (
+            queryset.filter(search_entry__document__match=match)
+            .alias(search_rank=F("search_entry__rank"))
+            .order_by("search_rank", "name", "id")
+        )
+
+
+# Must stay identical to the expression of products_product_search_idx in
+# migration 0005, or PostgreSQL will not use the GIN index.
+PG_SEARCH_VECTOR = (
+    "(setweight(to_tsvector('simple',"
+    " coalesce(\"products_product\".\"name\", '')), 'A')"
+    " || setweight(to_tsvector('simple',"
+    " coalesce(\"products_product\".\"category\", '')), 'B')"
+    " || setweight(to_tsvector('simple',"
+    " coalesce(\"products_product\".\"description\", '')), 'C'))"
+)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL tsvector search over a GIN expression index."""
+
+    def search(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        matches = RawSQL(
+            f"{PG_SEARCH_VECTOR} @@ to_tsquery('simple', %s)",
+            (tsquery,),
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({PG_SEARCH_VECTOR}, to_tsquery('simple', %s))",
+            (tsquery,),
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(matches)
+            .alias(search_rank=rank)
+            .order_by("-search_rank", "name", "id")
+        )
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """
+    Inverted index held in process memory, built lazily from the database and
+    kept current through the product save/delete signals.
+
+    Suitable for development and single-process deployments; each process has
+    its own copy, so writes made by other processes are not seen.
+    """
+
+    # Upper bound on ranked ids pushed back into SQL as an ORDER BY CASE
+    max_results = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._built = False
+        self._postings = defaultdict(dict)  # term -> {product_id: score}
+        self._terms = []  # sorted vocabulary, for prefix lookups
+        self._documents = {}  # product_id -> terms, for removal
+
+    def _add(self, product_id, fields):
+        scores = defaultdict(float)
+        for field, text in fields.items():
+            for term in tokenize(text):
+                scores[term] += FIELD_WEIGHTS[field]
+        self._documents[product_id] = list(scores)
+        for term, score in scores.items():
+            if term not in self._postings:
+                bisect.insort(self._terms, term)
+            self._postings[term][product_id] = score
+
+    def _discard(self, product_id):
+        for term in self._documents.pop(product_id, ()):
+            postings = self._postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        rows = Product.objects.values_list(
+            "id", "name", "category", "description"
+        ).iterator(chunk_size=2000)
+        for pk, name, category, description in rows:
+            self._add(
+                pk, {"name": name, "category": category, "description": description}
+            )
+        self._built = True
+
+    def _expand(self, prefix):
+        start = bisect.bisect_left(self._terms, prefix)
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def rank(self, query):
+        """Return ``(product_id, score)`` pairs for ``query``, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            self._ensure_built()
+            totals = None
+            for prefix in terms:
+                scores = defaultdict(float)
+                for term in self._expand(prefix):
+                    for pk, score in self._postings[term].items():
+                        scores[pk] = max(scores[pk], score)
+                # Every query term must match (AND), like the SQL backends
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {
+                        pk: totals[pk] + s for pk, s in scores.items() if pk in totals
+                    }
+                if not totals:
+                    return []
+        return sorted(totals.items(), key=lambda item: -item[1])
+
+    def search(self, queryset, query):
+        ranked = self.rank(query)[: self.max_results]
+        if not ranked:
+            return queryset.none()
+        ids = [pk for pk, _ in ranked]
+        position = Case(
+            *[When(pk=pk, then=i) for i, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+        return (
+            queryset.filter(pk__in=ids)
+            .alias(search_rank=position)
+            .order_by("search_rank", "name", "id")
+        )
+
+    def index(self, product):
+        with self._lock:
+            if self._built:
+                self._discard(product.pk)
+                self._add(
+                    product.pk,
+                    {
+                        "name": product.name,
+                        "category": product.category_id,
+                        "description": product.description,
+                    },
+                )
+
+    def remove(self, product_id):
+        with self._lock:
+            self._discard(product_id)
+
+    def reset(self):
+        # Rebuilt from the database on the next search
+        with self._lock:
+            self._clear()
+
+
+_backends = {}
+_default_paths = {}
+
+
+def _default_backend_path():
+    if connection.vendor not in _default_paths:
+        if connection.vendor == "postgresql":
+            path = "products.search.PostgresSearchBackend"
+        elif (
+            connection.vendor == "sqlite"
+            # Missing if this SQLite build lacks FTS5 (see migration 0005)
+            and ProductSearchEntry._meta.db_table
+            in connection.introspection.table_names()
+        ):
+            path = "products.search.SQLiteFTSBackend"
+        else:
+            path = "products.search.InMemorySearchBackend"
+        _default_paths[connection.vendor] = path
+    return _default_paths[connection.vendor]
+
+
+def get_search_backend():
+    """Return the configured search backend (one shared instance per class)."""
+    path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None) or _default_backend_path()
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
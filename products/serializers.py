@@ -1,10 +1,40 @@
-from rest_framework import serializers
-from .models import Product
+from datetime import datetime
+from decimal import Decimal
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from config.profiling import section
+
+from .models import Category, Product, StockReservation, StockReservationItem
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ("name", "product_count", "in_stock_count")
+        read_only_fields = fields
+
+
+class ProfiledListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with section("serialize"):
+            return super().data
 
 
 class ProductSerializer(serializers.ModelSerializer):
     # This field ensures the username of the creator is returned, not just the user ID
     created_by_username = serializers.ReadOnlyField(source="created_by.username")
+    # The category's name, which is also the foreign key's value: reading it
+    # needs no join, and writing an unknown name creates the category (see
+    # Category)
+    category = serializers.CharField(source="category_id", max_length=100)
 
     class Meta:
         model = Product
@@ -21,3 +51,219 @@ class ProductSerializer(serializers.ModelSerializer):
             "created_by_username",  # Read-only field
         )
         read_only_fields = ("created_at", "updated_at", "created_by_username")
+        list_serializer_class = ProfiledListSerializer
+
+    # Relations read by the fields above. Views join these up front so that
+    # serializing a page of products never triggers one query per row.
+    select_related_fields = ("created_by",)
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @property
+    def data(self):
+        with section("serialize"):
+            return super().data
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """
+        Join every relation this serializer reads onto ``queryset``. With a
+        sparse fieldset, load only the columns and joins those fields need.
+        """
+        if fields is None:
+            return queryset.select_related(*cls.select_related_fields)
+        columns = read_columns(cls, fields)
+        relations = {column.rsplit("__", 1)[0] for column in columns if "__" in column}
+        if relations:  # select_related() with no arguments follows every FK
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*columns)
+
+
+def _field_converter(field):
+    """
+    A plain function doing ``field.to_representation`` for a non-null value,
+    or None when the value needs no conversion. Common field types get
+    shortcuts that return exactly what DRF would; anything else calls DRF.
+    """
+    if isinstance(field, serializers.ReadOnlyField):
+        return None
+    if isinstance(field, serializers.CharField):
+        return str
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.DecimalField):
+        coerce = getattr(
+            field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+        )
+        if coerce and not field.localize and not field.normalize_output:
+            exponent = -field.decimal_places
+            slow = field.to_representation
+
+            def decimal_to_string(value):
+                # The database already returns values at the field's scale
+                if isinstance(value, Decimal) and value.as_tuple().exponent == exponent:
+                    return f"{value:f}"
+                return slow(value)
+
+            return decimal_to_string
+    if isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        field_timezone = getattr(field, "timezone", field.default_timezone())
+        if output_format and output_format.lower() == ISO_8601 and field_timezone:
+            slow = field.to_representation
+
+            def datetime_to_iso(value):
+                if not isinstance(value, datetime) or timezone.is_naive(value):
+                    return slow(value)
+                value = value.astimezone(field_timezone).isoformat()
+                if value.endswith("+00:00"):
+                    value = value[:-6] + "Z"
+                return value
+
+            return datetime_to_iso
+    return field.to_representation
+
+
+@lru_cache(maxsize=None)
+def _read_plan(serializer_class, fields):
+    """``(name, column, converter)`` for each field, in output order."""
+    plan = []
+    for field in serializer_class()._readable_fields:
+        if fields is not None and field.field_name not in fields:
+            continue
+        column = "__".join(field.source_attrs)
+        plan.append((field.field_name, column, _field_converter(field)))
+    return tuple(plan)
+
+
+# Columns every product read needs besides the serialized ones: the keyset
+# cursor and the conditional GET validators
+REQUIRED_COLUMNS = ("id", "name", "updated_at")
+
+
+def read_columns(serializer_class, fields):
+    """The columns (``__``-joined paths) to load for ``fields``."""
+    columns = dict.fromkeys(REQUIRED_COLUMNS)
+    columns.update(
+        dict.fromkeys(column for _, column, _ in _read_plan(serializer_class, fields))
+    )
+    return tuple(columns)
+
+
+class ProductReadSerializer:
+    """
+    Read-only stand-in for ``ProductSerializer`` on GET requests.
+
+    Rows come from ``.values()`` instead of model instances, and each field is
+    converted by a function precomputed from ProductSerializer's own fields,
+    so no field objects are built or walked per row. The output is the same,
+    key for key and byte for byte once rendered.
+    """
+
+    serializer_class = ProductSerializer
+
+    def __init__(self, instance=None, many=False, context=None, fields=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.plan = _read_plan(self.serializer_class, fields)
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        """Select just the columns the representation needs, joins included."""
+        return queryset.values(*read_columns(cls.serializer_class, fields))
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, convert in self.plan:
+            value = row[column]
+            if value is not None and convert is not None:
+                value = convert(value)
+            data[name] = value
+        return data
+
+    @property
+    def data(self):
+        with section("serialize"):
+            return self._data()
+
+    def _data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+
+class FacetPriceField(serializers.DecimalField):
+    def __init__(self, **kwargs):
+        super().__init__(max_digits=10, decimal_places=2, allow_null=True, **kwargs)
+
+
+class CategoryFacetSerializer(serializers.Serializer):
+    value = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class PriceBucketSerializer(serializers.Serializer):
+    # None is unbounded
+    min = FacetPriceField()
+    max = FacetPriceField()
+    count = serializers.IntegerField()
+
+
+class PriceFacetSerializer(serializers.Serializer):
+    min = FacetPriceField()
+    max = FacetPriceField()
+    buckets = PriceBucketSerializer(many=True)
+
+
+class StockFacetSerializer(serializers.Serializer):
+    in_stock = serializers.IntegerField()
+    out_of_stock = serializers.IntegerField()
+
+
+class ProductFacetsSerializer(serializers.Serializer):
+    """
+    The shape of ``compute_facets()``. Only describes the facets response
+    for the schema: the view returns the dict as it is.
+    """
+
+    count = serializers.IntegerField()
+    categories = CategoryFacetSerializer(many=True)
+    price = PriceFacetSerializer()
+    stock = StockFacetSerializer()
+
+
+class StockReservationItemSerializer(serializers.ModelSerializer):
+    # Plain ids: the reservation's conditional UPDATE finds out whether the
+    # product exists, so the write path does not look products up first
+    product = serializers.IntegerField(source="product_id")
+    quantity = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = StockReservationItem
+        fields = ("product", "quantity")
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    items = StockReservationItemSerializer(many=True)
+
+    class Meta:
+        model = StockReservation
+        fields = ("id", "items", "created_at", "expires_at", "confirmed_at")
+        read_only_fields = ("id", "created_at", "expires_at", "confirmed_at")
+
+    def validate_items(self, items):
+        """Validated items as ``{product_id: quantity}``, repeats summed."""
+        if not items:
+            raise serializers.ValidationError("At least one item is required.")
+        max_items = getattr(settings, "STOCK_RESERVATION_MAX_ITEMS", 50)
+        if len(items) > max_items:
+            raise serializers.ValidationError(f"At most {max_items} items.")
+        quantities = Counter()
+        for item in items:
+            quantities[item["product_id"]] += item["quantity"]
+        return dict(quantities)
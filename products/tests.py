@@ -1,8 +1,52 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import skipUnless
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.utils.encoders import JSONEncoder
 from django.contrib.auth import get_user_model
-from .models import Product
+from drf_spectacular.generators import SchemaGenerator
+from config import replicas
+from config.profiling import ProfilingMiddleware, registry
+from config.replicas import ReplicaMiddleware
+from .async_views import aread_response, async_read_view
+from .importing import KeyClaims
+from .models import (
+    Category,
+    Product,
+    ProductTombstone,
+    StockReservation,
+    StockReservationItem,
+)
+from .reservations import InsufficientStock, reserve
+from .search import InMemorySearchBackend, get_search_backend
+from .serializers import ProductSerializer
+from .views import ProductDetailView, ProductListCreateView, ProductSearchView
 
 User = get_user_model()
 
@@ -22,7 +66,7 @@ class ProductAPITests(APITestCase):
         self.product = Product.objects.create(
             name="UniqueTestMouse",
             price=50.00,
-            category="Electronics",
+            category_id="Electronics",
             stock_quantity=10,
             created_by=self.staff_user,
         )
@@ -60,7 +104,7 @@ class ProductAPITests(APITestCase):
         Product.objects.create(
             name="Expensive Laptop",
             price=1500.00,
-            category="Electronics",
+            category_id="Electronics",
             stock_quantity=5,
             created_by=self.staff_user
         )
@@ -68,7 +112,7 @@ class ProductAPITests(APITestCase):
         Product.objects.create(
             name="Cheap Cable",
             price=10.00,
-            category="Electronics",
+            category_id="Electronics",
             stock_quantity=50,
             created_by=self.staff_user
         )
@@ -124,3 +168,1634 @@ class ProductAPITests(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Product.objects.count(), 0)
+
+
+class QueryBudgetMixin:
+    """Assert an upper bound on the number of queries a block may issue."""
+
+    def assertMaxQueries(self, budget, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            result = func(*args, **kwargs)
+        executed = len(ctx.captured_queries)
+        if executed > budget:
+            queries = "\n".join(q["sql"] for q in ctx.captured_queries)
+            self.fail(f"{executed} queries executed, budget is {budget}:\n{queries}")
+        return result
+
+
+class ProductQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Query counts must not grow with the number of products on a page."""
+
+    # Paginated lists: one COUNT plus one page fetch. Detail: one fetch.
+    LIST_BUDGET = 2
+    DETAIL_BUDGET = 1
+
+    def setUp(self):
+        # Spread products across several creators so a missing join would show up
+        self.products = []
+        for i in range(10):
+            creator = User.objects.create_user(
+                username=f"creator{i}", password="password123", is_staff=True
+            )
+            self.products.append(
+                Product.objects.create(
+                    name=f"Budget Product {i}",
+                    description="Counted queries.",
+                    price=10 + i,
+                    category_id="Budget",
+                    stock_quantity=i,
+                    created_by=creator,
+                )
+            )
+
+    def test_list_query_budget(self):
+        url = reverse("product-list-create") + "?min_price=1&stock_status=in_stock"
+        response = self.assertMaxQueries(self.LIST_BUDGET, self.client.get, url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["created_by_username"], "creator1")
+
+    def test_search_query_budget(self):
+        url = reverse("product-search") + "?category=budget"
+        response = self.assertMaxQueries(self.LIST_BUDGET, self.client.get, url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_detail_query_budget(self):
+        url = reverse("product-detail", kwargs={"id": self.products[3].id})
+        response = self.assertMaxQueries(self.DETAIL_BUDGET, self.client.get, url)
+        self.assertEqual(response.data["created_by_username"], "creator3")
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN output checked for SQLite")
+class ProductIndexTests(APITestCase):
+    """The filter and sort paths must be planned against Product.Meta.indexes."""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def plan_for(self, view_class, path):
+        view = view_class()
+        view.request = Request(self.factory.get(path))
+        view.format_kwarg = None
+        return view.get_queryset()[:10].explain()
+
+    def test_category_search_resolves_names_through_categories(self):
+        plan = self.plan_for(ProductSearchView, "/?category=Electronics")
+        self.assertIn("category_name_lower_idx", plan)
+        self.assertIn("product_category_name_idx", plan)
+
+    def test_price_range_uses_index(self):
+        plan = self.plan_for(ProductListCreateView, "/?min_price=10&max_price=20")
+        self.assertIn("product_price_idx", plan)
+
+    def test_stock_status_uses_partial_indexes(self):
+        for stock_status in ("in_stock", "out_of_stock"):
+            plan = self.plan_for(
+                ProductListCreateView, f"/?stock_status={stock_status}"
+            )
+            self.assertIn(f"product_{stock_status}_name_idx", plan)
+
+    def test_category_search_is_case_insensitive(self):
+        user = User.objects.create_user(username="indexer", password="password123")
+        Product.objects.create(
+            name="Lamp", price=5, category_id="Home", stock_quantity=1, created_by=user
+        )
+        response = self.client.get(reverse("product-search") + "?category=hOmE")
+        self.assertEqual(response.data["results"][0]["name"], "Lamp")
+
+
+class ProductKeysetPaginationTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="pager", password="password123")
+        # Duplicate names exercise the id tiebreaker
+        for i in range(12):
+            Product.objects.create(
+                name=f"Item {i % 4}",
+                price=1,
+                category_id="Paging",
+                stock_quantity=1,
+                created_by=user,
+            )
+        self.expected = list(
+            Product.objects.order_by("name", "id").values_list("id", flat=True)
+        )
+
+    def walk(self, url, link="next"):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            page = [item["id"] for item in response.data["results"]]
+            seen = seen + page if link == "next" else page + seen
+            url = response.data[link]
+        return seen
+
+    def test_cursor_walk_covers_catalog_once(self):
+        url = reverse("product-list-create") + "?pagination=cursor&page_size=5"
+        self.assertEqual(self.walk(url), self.expected)
+
+    def test_previous_links_walk_back(self):
+        url = (
+            reverse("product-search") + "?category=paging&pagination=cursor&page_size=5"
+        )
+        while True:
+            response = self.client.get(url)
+            if not response.data["next"]:
+                break
+            url = response.data["next"]
+        last_page = [item["id"] for item in response.data["results"]]
+        walked = self.walk(response.data["previous"], link="previous")
+        self.assertEqual(walked + last_page, self.expected)
+
+    def test_cursor_page_skips_count(self):
+        url = reverse("product-list-create") + "?pagination=cursor"
+        first = self.client.get(url)
+        self.assertMaxQueries(1, self.client.get, first.data["next"])
+
+    def test_page_size_is_capped(self):
+        user = User.objects.get(username="pager")
+        Product.objects.bulk_create(
+            Product(name=f"Bulk {i}", price=1, category_id="Paging", created_by=user)
+            for i in range(100)
+        )
+        response = self.client.get(reverse("product-list-create") + "?page_size=500")
+        self.assertEqual(len(response.data["results"]), 100)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("product-list-create") + "?cursor=bogus")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProductFullTextSearchTests(APITestCase):
+    """Run against the default backend; the subclass repeats them in-process."""
+
+    def setUp(self):
+        user = User.objects.create_user(username="searcher", password="password123")
+        make = lambda **kw: Product.objects.create(created_by=user, price=1, **kw)
+        self.mouse = make(
+            name="Wireless Mouse", description="Ergonomic.", category_id="Electronics"
+        )
+        self.pad = make(
+            name="Mouse Pad",
+            description="Works with any wireless mouse.",
+            category_id="Office",
+        )
+        self.lamp = make(name="Desk Lamp", description="Bright.", category_id="Home")
+
+    def search(self, query):
+        response = self.client.get(reverse("product-search") + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_ranks_name_above_description(self):
+        self.assertEqual(self.search("?q=wireless"), ["Wireless Mouse", "Mouse Pad"])
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self.search("?q=wire mou"), ["Wireless Mouse", "Mouse Pad"])
+        self.assertEqual(self.search("?q=desk mouse"), [])
+
+    def test_matches_category_and_narrows_by_category(self):
+        self.assertEqual(self.search("?q=electro"), ["Wireless Mouse"])
+        self.assertEqual(self.search("?q=mouse&category=office"), ["Mouse Pad"])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.lamp.name = "Floor Lamp"
+        self.lamp.save()
+        self.assertEqual(self.search("?q=floor"), ["Floor Lamp"])
+        self.assertEqual(self.search("?q=desk"), [])
+        self.mouse.delete()
+        self.assertEqual(self.search("?q=wireless"), ["Mouse Pad"])
+
+
+@override_settings(PRODUCT_SEARCH_BACKEND="products.search.InMemorySearchBackend")
+class InMemoryFullTextSearchTests(ProductFullTextSearchTests):
+    def setUp(self):
+        get_search_backend().reset()
+        super().setUp()
+
+    def test_backend_is_in_memory(self):
+        self.assertIsInstance(get_search_backend(), InMemorySearchBackend)
+
+
+class ProductCountTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="counter", password="password123")
+        for i in range(3):
+            Product.objects.create(
+                name=f"Counted {i}", price=5, category_id="Count", created_by=self.user
+            )
+        self.url = reverse("product-list-create") + "?max_price=10"
+
+    def test_count_is_cached_per_filter_set(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.data["count"], 3)
+        self.assertTrue(first.data["count_exact"])
+        # Only the page itself is fetched; param order and page are irrelevant
+        response = self.assertMaxQueries(
+            1, self.client.get, reverse("product-list-create") + "?page=1&max_price=10"
+        )
+        self.assertEqual(response.data["count"], 3)
+
+    def test_product_writes_invalidate_counts(self):
+        self.client.get(self.url)
+        Product.objects.create(
+            name="Counted 3", price=5, category_id="Count", created_by=self.user
+        )
+        self.assertEqual(self.client.get(self.url).data["count"], 4)
+        Product.objects.filter(name="Counted 0").get().delete()
+        self.assertEqual(self.client.get(self.url).data["count"], 3)
+
+    @skipUnless(connection.vendor == "sqlite", "uses SQLite's ANALYZE statistics")
+    @override_settings(PRODUCT_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_large_counts_are_estimated(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        response = self.client.get(reverse("product-list-create"))
+        self.assertFalse(response.data["count_exact"])
+        self.assertEqual(response.data["count"], 3)
+        # Filtered sets have no SQLite estimate and are counted exactly
+        self.assertTrue(self.client.get(self.url).data["count_exact"])
+
+    @skipUnless(connection.vendor == "sqlite", "uses SQLite's ANALYZE statistics")
+    @override_settings(PRODUCT_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_stale_estimates_do_not_limit_pages(self):
+        # The partial stock indexes cover fewer rows than the table
+        Product.objects.filter(name="Counted 0").update(stock_quantity=4)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        for i in range(3, 8):
+            Product.objects.create(
+                name=f"Counted {i}", price=5, category_id="Count", created_by=self.user
+            )
+        url = reverse("product-list-create") + "?page_size=2&page="
+        response = self.client.get(url + "1")
+        self.assertFalse(response.data["count_exact"])
+        self.assertEqual(response.data["count"], 3)
+
+        response = self.client.get(url + "3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+        response = self.client.get(url + "4")
+        self.assertEqual(
+            [p["name"] for p in response.data["results"]], ["Counted 6", "Counted 7"]
+        )
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(self.client.get(url + "5").status_code, 404)
+
+
+class ProductResponseCacheTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username="cachestaff", password="password123", is_staff=True
+        )
+        self.product = Product.objects.create(
+            name="Cached Chair",
+            price=20,
+            category_id="Home",
+            created_by=self.staff_user,
+        )
+        self.detail_url = reverse("product-detail", kwargs={"id": self.product.id})
+
+    def test_repeat_reads_skip_the_database(self):
+        for url in (
+            reverse("product-list-create"),
+            reverse("product-search") + "?q=chair",
+            self.detail_url,
+        ):
+            first = self.client.get(url)
+            second = self.assertMaxQueries(0, self.client.get, url)
+            self.assertEqual(first.content, second.content)
+            self.assertEqual(first["ETag"], second["ETag"])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_writes_invalidate_cached_reads(self):
+        list_url = reverse("product-list-create")
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.client.get(list_url)
+
+        self.client.force_authenticate(user=self.staff_user)
+        self.client.patch(self.detail_url, {"price": "25.00"})
+        self.client.post(
+            list_url,
+            {
+                "name": "Cached Table",
+                "price": "90.00",
+                "category": "Home",
+                "description": "New.",
+            },
+        )
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["price"], "25.00")
+        self.assertEqual(self.client.get(list_url).data["count"], 2)
+
+
+class ProductConditionalGetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="poller", password="password123")
+        self.product = Product.objects.create(
+            name="Polled Pen", price=2, category_id="Office", created_by=self.user
+        )
+        self.detail_url = reverse("product-detail", kwargs={"id": self.product.id})
+        self.list_url = reverse("product-list-create") + "?max_price=5"
+
+    def test_validators_come_from_updated_at(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(
+            response["Last-Modified"], http_date(self.product.updated_at.timestamp())
+        )
+        response = self.client.get(
+            self.detail_url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_304_is_decided_before_serialization(self):
+        for url, budget in ((self.list_url, 1), (self.detail_url, 1)):
+            etag = self.client.get(url)["ETag"]
+            cache.clear()  # force the validator path rather than the response cache
+            response = self.assertMaxQueries(
+                budget, self.client.get, url, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unrelated_writes_keep_detail_etag(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        Product.objects.create(
+            name="Other Pen", price=3, category_id="Office", created_by=self.user
+        )
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # ...but the filtered list it joined has changed
+        etag = self.client.get(self.list_url)["ETag"]
+        Product.objects.create(
+            name="Third Pen", price=4, category_id="Office", created_by=self.user
+        )
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+
+    def test_edits_change_list_etag(self):
+        staff = User.objects.create_user(
+            username="pollstaff", password="password123", is_staff=True
+        )
+        etag = self.client.get(self.list_url)["ETag"]
+        self.client.force_authenticate(user=staff)
+        self.client.patch(self.detail_url, {"price": "3.00"})
+        self.client.force_authenticate(user=None)
+        # Same row count, newer updated_at
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["price"], "3.00")
+
+
+class ProductBulkTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create_user(
+            username="importer", password="password123", is_staff=True
+        )
+        self.url = reverse("product-bulk")
+        self.client.force_authenticate(user=self.staff_user)
+
+    def item(self, name, **extra):
+        data = {
+            "name": name,
+            "description": "Bulk.",
+            "price": "3.50",
+            "category": "Bulk",
+        }
+        data.update(extra)
+        return data
+
+    @override_settings(PRODUCT_BULK_CHUNK_SIZE=2)
+    def test_bulk_create_reports_per_item_errors(self):
+        items = [self.item(f"Bulk {i}") for i in range(5)]
+        items.insert(2, self.item("Bad price", price="free"))
+        response = self.client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(len(response.data["created"]), 5)
+        self.assertEqual(response.data["errors"][0]["index"], 2)
+        self.assertIn("price", response.data["errors"][0]["errors"])
+        self.assertEqual(Product.objects.filter(created_by=self.staff_user).count(), 5)
+
+    def test_bulk_create_invalidates_cached_reads(self):
+        list_url = reverse("product-list-create")
+        self.assertEqual(self.client.get(list_url).data["count"], 0)
+        response = self.client.post(self.url, [self.item("Fresh")], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get(list_url).data["count"], 1)
+        self.assertEqual(
+            self.client.get(reverse("product-search") + "?q=fresh").data["count"], 1
+        )
+
+    def test_bulk_update_and_delete(self):
+        created = self.client.post(
+            self.url, [self.item("One"), self.item("Two")], format="json"
+        ).data["created"]
+        before = Product.objects.get(pk=created[0]).updated_at
+        response = self.client.patch(
+            self.url,
+            [{"id": created[0], "price": "9.99"}, {"id": 0, "price": "1.00"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        product = Product.objects.get(pk=created[0])
+        self.assertEqual(str(product.price), "9.99")
+        self.assertGreater(product.updated_at, before)
+
+        response = self.client.delete(self.url, created, format="json")
+        self.assertEqual(response.data["deleted"], 2)
+        self.assertFalse(Product.objects.exists())
+
+    def test_boolean_ids_are_rejected(self):
+        created = self.client.post(self.url, [self.item("Kept")], format="json")
+        pk = created.data["created"][0]
+        response = self.client.patch(
+            self.url, [{"id": True, "name": "Renamed"}], format="json"
+        )
+        self.assertEqual(response.data["errors"][0]["errors"], {"id": ["Not found."]})
+        response = self.client.delete(self.url, [True], format="json")
+        self.assertEqual(response.data["deleted"], 0)
+        self.assertEqual(Product.objects.get(pk=pk).name, "Kept")
+
+    def test_bulk_requires_staff(self):
+        regular = User.objects.create_user(username="shopper", password="password123")
+        self.client.force_authenticate(user=regular)
+        response = self.client.post(self.url, [self.item("Nope")], format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_rejects_non_arrays(self):
+        response = self.client.post(self.url, self.item("Single"), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductExportTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="exporter", password="password123")
+        for i, stock in enumerate([0, 4, 9]):
+            Product.objects.create(
+                name=f"Export {i}",
+                description='Has "quotes", commas\nand newlines.',
+                price=10 + i,
+                category_id="Export",
+                stock_quantity=stock,
+                created_by=user,
+            )
+        self.url = reverse("product-export")
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    @override_settings(PRODUCT_EXPORT_CHUNK_SIZE=2)
+    def test_ndjson_export_matches_serializer(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        expected = ProductSerializer(
+            Product.objects.order_by("name", "id"), many=True
+        ).data
+        self.assertEqual(rows, json.loads(json.dumps(expected, cls=JSONEncoder)))
+
+    def test_csv_export_with_filters(self):
+        response = self.client.get(self.url + "?format=csv&stock_status=in_stock")
+        rows = list(csv.reader(io.StringIO(self.read(response))))
+        self.assertEqual(rows[0], list(ProductSerializer.Meta.fields))
+        self.assertEqual([row[1] for row in rows[1:]], ["Export 1", "Export 2"])
+        self.assertEqual(rows[1][2], 'Has "quotes", commas\nand newlines.')
+
+
+class ProductImportCommandTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="importer", password="x")
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, rows):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            if name.endswith(".csv"):
+                writer = csv.DictWriter(handle, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                handle.writelines(
+                    row if isinstance(row, str) else json.dumps(row) + "\n"
+                    for row in rows
+                )
+        return path
+
+    def run_import(self, path, **options):
+        out, err = io.StringIO(), io.StringIO()
+        call_command(
+            "import_products", path, user="importer", stdout=out, stderr=err, **options
+        )
+        return out.getvalue(), err.getvalue()
+
+    def rows(self, count, price="10.00"):
+        return [
+            {
+                "name": f"Imported {i}",
+                "description": "From a file.",
+                "price": price,
+                "category": "Import",
+                "stock_quantity": str(i),
+                "image_url": "",
+            }
+            for i in range(count)
+        ]
+
+    def test_csv_import_creates_then_upserts(self):
+        path = self.write("catalog.csv", self.rows(5))
+        out, _ = self.run_import(path, batch_size=2)
+        self.assertIn("5 created, 0 updated, 0 invalid", out)
+        self.assertEqual(Product.objects.filter(created_by=self.user).count(), 5)
+
+        path = self.write("catalog.csv", self.rows(6, price="12.50"))
+        out, _ = self.run_import(path, batch_size=4)
+        self.assertIn("1 created, 5 updated, 0 invalid", out)
+        self.assertEqual(Product.objects.count(), 6)
+        self.assertEqual(set(Product.objects.values_list("price", flat=True)), {12.5})
+
+    def test_batch_size_must_be_positive(self):
+        path = self.write("catalog.ndjson", self.rows(1))
+        for size in (0, -1):
+            with self.assertRaisesMessage(CommandError, "--batch-size"):
+                self.run_import(path, batch_size=size)
+        self.assertFalse(Product.objects.exists())
+
+    def test_invalid_records_are_reported_and_skipped(self):
+        rows = self.rows(3)
+        rows[1]["price"] = "not a price"
+        path = self.write("catalog.ndjson", rows[:2] + ["{broken\n"] + rows[2:])
+        out, err = self.run_import(path)
+        self.assertIn("2 created, 0 updated, 2 invalid", out)
+        self.assertIn("Record 2:", err)
+        self.assertIn('Record 3: "Invalid JSON', err)
+
+    def test_checkpoint_resumes_after_committed_records(self):
+        path = self.write("catalog.ndjson", self.rows(5))
+        checkpoint = os.path.join(self.tmpdir.name, "import.checkpoint")
+        with open(checkpoint, "w") as handle:
+            json.dump({"path": os.path.abspath(path), "records": 3}, handle)
+
+        out, _ = self.run_import(path, checkpoint=checkpoint, batch_size=1)
+        self.assertIn("Resuming after record 3", out)
+        self.assertEqual(
+            sorted(Product.objects.values_list("name", flat=True)),
+            ["Imported 3", "Imported 4"],
+        )
+        with open(checkpoint) as handle:
+            self.assertEqual(json.load(handle)["records"], 5)
+
+    def test_category_in_the_natural_key(self):
+        rows = self.rows(2)
+        rows.append(dict(rows[0], category="Other", price="3.00"))
+        path = self.write("catalog.ndjson", rows)
+        out, _ = self.run_import(path, key="name,category")
+        self.assertIn("3 created, 0 updated, 0 invalid", out)
+
+        rows[2]["price"] = "4.00"
+        path = self.write("catalog.ndjson", rows)
+        out, _ = self.run_import(path, key="name,category")
+        self.assertIn("0 created, 3 updated, 0 invalid", out)
+        self.assertEqual(Product.objects.count(), 3)
+        other = Product.objects.get(name="Imported 0", category_id="Other")
+        self.assertEqual(other.price, 4)
+
+
+class KeyClaimsTests(SimpleTestCase):
+    def test_batches_sharing_a_key_are_written_in_turn(self):
+        claims = KeyClaims()
+        order = []
+
+        def write(keys, label):
+            with claims.claim(keys):
+                order.append(label)
+
+        with claims.claim({("Lamp",), ("Desk",)}):
+            # Disjoint keys go ahead; a shared key waits for the release
+            other = threading.Thread(target=write, args=({("Chair",)}, "other"))
+            other.start()
+            other.join(timeout=5)
+            shared = threading.Thread(target=write, args=({("Lamp",)}, "shared"))
+            shared.start()
+            shared.join(timeout=0.2)
+            self.assertTrue(shared.is_alive())
+            order.append("first")
+        shared.join(timeout=5)
+        self.assertEqual(order, ["other", "first", "shared"])
+
+
+class ProductAsyncReadTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="asyncreader", password="x")
+        for i in range(7):
+            Product.objects.create(
+                name=f"Async Lamp {i}",
+                price=10 + i,
+                category_id="Home" if i % 2 else "Garden",
+                stock_quantity=i,
+                created_by=self.user,
+            )
+        self.factory = AsyncRequestFactory()
+
+    async def read_async(self, view_class, path, **kwargs):
+        cache.clear()
+        response = await aread_response(view_class, self.factory.get(path), kwargs)
+        self.assertIsNotNone(response, f"{path} fell back to the sync view")
+        return response
+
+    def read_sync(self, path):
+        cache.clear()
+        return self.client.get(path)
+
+    async def assertSameResponse(self, view_class, path, **kwargs):
+        response = await self.read_async(view_class, path, **kwargs)
+        expected = await sync_to_async(self.read_sync)(path)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        for header in ("Content-Type", "ETag", "Last-Modified", "Allow", "Vary"):
+            self.assertEqual(response.get(header), expected.get(header), header)
+        return response
+
+    async def test_list_pages_match_the_sync_view(self):
+        url = reverse("product-list-create")
+        await self.assertSameResponse(ProductListCreateView, url)
+        await self.assertSameResponse(
+            ProductListCreateView, url + "?page=2&page_size=3&min_price=11"
+        )
+        response = await self.assertSameResponse(
+            ProductListCreateView, url + "?pagination=cursor&page_size=2"
+        )
+        next_link = json.loads(response.content)["next"]
+        await self.assertSameResponse(ProductListCreateView, next_link)
+
+    async def test_search_and_detail_match_the_sync_view(self):
+        await self.assertSameResponse(
+            ProductSearchView, reverse("product-search") + "?q=lamp&category=home"
+        )
+        product = await Product.objects.afirst()
+        await self.assertSameResponse(
+            ProductDetailView,
+            reverse("product-detail", kwargs={"id": product.pk}),
+            id=product.pk,
+        )
+
+    async def test_errors_and_credentials_use_the_sync_view(self):
+        view = async_read_view(ProductListCreateView)
+        url = reverse("product-list-create")
+        for request in (
+            self.factory.get(url + "?page=99"),
+            self.factory.get(url, headers={"Authorization": "Token bogus"}),
+            self.factory.get(url, headers={"Accept": "text/html"}),
+        ):
+            self.assertIsNone(await aread_response(ProductListCreateView, request, {}))
+        response = await view(self.factory.get(url + "?page=99"))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        request = self.factory.get(url, headers={"Authorization": "Token bogus"})
+        response = await view(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        detail = async_read_view(ProductDetailView)
+        response = await detail(self.factory.get("/api/products/products/0/"), id=0)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProductFastSerializationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username="fastwriter", password="x")
+        texts = [
+            "Plain lamp",
+            "Café crème ☕",
+            "Line\u2028break",
+            'Quote " \\ </script>',
+        ]
+        for i, text in enumerate(texts * 2):
+            Product.objects.create(
+                name=f"{text} {i}",
+                description=text if i % 2 else "",
+                price=f"{i}.{i}5",
+                category_id="Home",
+                stock_quantity=i,
+                image_url="https://example.com/x.png" if i % 3 else None,
+                created_by=user,
+            )
+
+    def assertSameContent(self, path):
+        cache.clear()
+        fast = self.client.get(path)
+        cache.clear()
+        with override_settings(PRODUCT_FAST_SERIALIZATION=False):
+            slow = self.client.get(path)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(fast["ETag"], slow["ETag"])
+        return fast
+
+    def test_reads_match_the_model_serializer(self):
+        url = reverse("product-list-create")
+        self.assertSameContent(url)
+        self.assertSameContent(url + "?page=2&page_size=3&ordering=-price")
+        response = self.assertSameContent(url + "?pagination=cursor&page_size=3")
+        self.assertSameContent(json.loads(response.content)["next"])
+        self.assertSameContent(reverse("product-search") + "?q=lamp")
+        product = Product.objects.filter(name__startswith="Line").first()
+        response = self.assertSameContent(
+            reverse("product-detail", kwargs={"id": product.pk})
+        )
+        self.assertIn(b"\\u2028", response.content)
+
+    def test_reads_select_only_serialized_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("product-list-create"))
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn('"users_user"."password"', sql)
+
+    def test_writes_use_the_model_serializer(self):
+        staff = User.objects.create_user(
+            username="faststaff", password="x", is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        product = Product.objects.first()
+        response = self.client.patch(
+            reverse("product-detail", kwargs={"id": product.pk}),
+            {"stock_quantity": 99},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["stock_quantity"], 99)
+
+    def test_renderer_matches_json_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+
+        from .renderers import FastJSONRenderer
+
+        data = {
+            "results": [{"name": "Ünïcode \u2028\u2029 ☃", "n": 1, "ok": True}],
+            "next": None,
+            "nested": {"list": [1, "two", None]},
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        context = {"indent": 2}
+        self.assertEqual(
+            FastJSONRenderer().render(data, renderer_context=context),
+            JSONRenderer().render(data, renderer_context=context),
+        )
+
+
+class ProductSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username="sparse", password="x")
+        for i in range(5):
+            Product.objects.create(
+                name=f"Grid Lamp {i}",
+                description="Long text " * 50,
+                price=5 + i,
+                category_id="Home",
+                created_by=user,
+            )
+
+    def get_with_queries(self, path):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response, "\n".join(query["sql"] for query in queries)
+
+    def test_fields_trim_the_response_and_the_query(self):
+        url = reverse("product-list-create") + "?fields=id,name,price,image_url"
+        for fast in (True, False):
+            with override_settings(PRODUCT_FAST_SERIALIZATION=fast):
+                response, sql = self.get_with_queries(url)
+            row = response.data["results"][0]
+            self.assertEqual(list(row), ["id", "name", "price", "image_url"])
+            self.assertNotIn('"description"', sql)
+            self.assertNotIn("users_user", sql)
+
+    def test_exclude_and_fast_path_match(self):
+        url = reverse("product-search") + "?q=lamp&exclude=description"
+        response, sql = self.get_with_queries(url)
+        self.assertNotIn('"description"', sql)
+        self.assertIn("created_by_username", response.data["results"][0])
+        with override_settings(PRODUCT_FAST_SERIALIZATION=False):
+            slow, _ = self.get_with_queries(url)
+        self.assertEqual(response.content, slow.content)
+
+    def test_cursor_pages_and_detail_with_fields(self):
+        url = reverse("product-list-create")
+        response, _ = self.get_with_queries(
+            url + "?pagination=cursor&page_size=2&fields=price"
+        )
+        self.assertEqual(
+            response.data["results"], [{"price": "5.00"}, {"price": "6.00"}]
+        )
+        next_page, _ = self.get_with_queries(response.data["next"])
+        self.assertEqual(next_page.data["results"][0], {"price": "7.00"})
+
+        product = Product.objects.first()
+        detail = reverse("product-detail", kwargs={"id": product.pk})
+        response, sql = self.get_with_queries(detail + "?fields=name")
+        self.assertEqual(response.data, {"name": product.name})
+        self.assertIn("ETag", response)
+        self.assertNotIn("users_user", sql)
+
+    def test_unknown_fields_are_rejected(self):
+        url = reverse("product-list-create")
+        response = self.client.get(url + "?fields=name,secret")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("secret", str(response.data["fields"]))
+        everything = ",".join(ProductSerializer.Meta.fields)
+        response = self.client.get(url + "?exclude=" + everything)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductFacetsTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="facets", password="x")
+        for price, category, stock in [
+            ("5.00", "Books", 0),
+            ("9.99", "Books", 3),
+            ("10.00", "Home", 1),
+            ("120.00", "Home", 0),
+            ("800.00", "Garden", 2),
+        ]:
+            Product.objects.create(
+                name=f"{category} {price}",
+                price=price,
+                category_id=category,
+                stock_quantity=stock,
+                created_by=self.user,
+            )
+        self.url = reverse("product-facets")
+
+    @override_settings(PRODUCT_FACET_PRICE_BUCKETS=(10, 100))
+    def test_facets_for_the_whole_catalog(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "count": 5,
+                "categories": [
+                    {"value": "Books", "count": 2},
+                    {"value": "Home", "count": 2},
+                    {"value": "Garden", "count": 1},
+                ],
+                "price": {
+                    "min": "5.00",
+                    "max": "800.00",
+                    "buckets": [
+                        {"min": None, "max": "10.00", "count": 2},
+                        {"min": "10.00", "max": "100.00", "count": 1},
+                        {"min": "100.00", "max": None, "count": 2},
+                    ],
+                },
+                "stock": {"in_stock": 3, "out_of_stock": 2},
+            },
+        )
+
+    def test_filters_apply_and_use_one_query(self):
+        url = self.url + "?min_price=9&stock_status=in_stock"
+        response = self.assertMaxQueries(1, self.client.get, url)
+        data = response.json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(data["stock"], {"in_stock": 3, "out_of_stock": 0})
+        self.assertEqual(data["price"]["min"], "9.99")
+
+    def test_empty_result(self):
+        data = self.client.get(self.url + "?min_price=10000").json()
+        self.assertEqual(data["count"], 0)
+        self.assertEqual(data["categories"], [])
+        self.assertIsNone(data["price"]["min"])
+        self.assertTrue(all(b["count"] == 0 for b in data["price"]["buckets"]))
+
+    def test_cached_until_a_product_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Product.objects.create(
+            name="New", price=1, category_id="Toys", created_by=self.user
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 6)
+
+    def test_schema_documents_the_response(self):
+        schema = SchemaGenerator().get_schema(public=True)
+        operation = schema["paths"]["/api/products/products/facets/"]["get"]
+        self.assertIn("content", operation["responses"]["200"])
+
+
+class CategoryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="shelver", password="x")
+
+    def make(self, name, category, stock=0):
+        return Product.objects.create(
+            name=name,
+            price=1,
+            category_id=category,
+            stock_quantity=stock,
+            created_by=self.user,
+        )
+
+    def counts(self):
+        return {
+            category.name: (category.product_count, category.in_stock_count)
+            for category in Category.objects.all()
+        }
+
+    def test_counters_follow_every_write(self):
+        lamp = self.make("Lamp", "Home", stock=2)
+        self.make("Rake", "Garden")
+        self.assertEqual(self.counts(), {"Home": (1, 1), "Garden": (1, 0)})
+
+        lamp.stock_quantity = 0
+        lamp.save()
+        Product.objects.filter(name="Rake").update(stock_quantity=5)
+        self.assertEqual(self.counts(), {"Home": (1, 0), "Garden": (1, 1)})
+
+        lamp.category_id = "Garden"
+        lamp.save()
+        self.assertEqual(self.counts(), {"Home": (0, 0), "Garden": (2, 1)})
+
+        lamp.delete()
+        self.assertEqual(self.counts(), {"Home": (0, 0), "Garden": (1, 1)})
+
+    def test_bulk_writes_are_counted(self):
+        staff = User.objects.create_user(
+            username="bulkshelf", password="x", is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        url = reverse("product-bulk")
+        items = [
+            {
+                "name": f"Box {i}",
+                "description": "Box.",
+                "price": "1.00",
+                "category": "Storage",
+                "stock_quantity": i,
+            }
+            for i in range(3)
+        ]
+        self.client.post(url, items, format="json")
+        self.assertEqual(self.counts(), {"Storage": (3, 2)})
+
+        ids = list(Product.objects.values_list("pk", flat=True))
+        changes = [
+            {"id": pk, "category": "Attic", "stock_quantity": 0} for pk in ids[:2]
+        ]
+        response = self.client.patch(url, changes, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(self.counts(), {"Storage": (1, 1), "Attic": (2, 0)})
+
+        self.client.delete(url, ids, format="json")
+        self.assertEqual(self.counts(), {"Storage": (0, 0), "Attic": (0, 0)})
+
+    def test_listing_and_filters_accept_names(self):
+        self.make("Lamp", "Home", stock=1)
+        self.make("Rug", "Home")
+        self.make("Spade", "Garden", stock=1)
+        response = self.client.get(reverse("category-list"))
+        self.assertEqual(
+            response.json(),
+            [
+                {"name": "Garden", "product_count": 1, "in_stock_count": 1},
+                {"name": "Home", "product_count": 2, "in_stock_count": 1},
+            ],
+        )
+        response = self.client.get(reverse("product-list-create") + "?category=hOmE")
+        self.assertEqual([p["name"] for p in response.data["results"]], ["Lamp", "Rug"])
+        self.assertEqual(response.data["results"][0]["category"], "Home")
+
+        # Full-text search still sees category names
+        response = self.client.get(reverse("product-search") + "?q=garden")
+        self.assertEqual([p["name"] for p in response.data["results"]], ["Spade"])
+
+
+class StockReservationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="shopper", password="x")
+        self.client.force_authenticate(self.user)
+        self.lamp, self.rug = (
+            Product.objects.create(
+                name=name,
+                price=5,
+                category_id="Home",
+                stock_quantity=stock,
+                created_by=self.user,
+            )
+            for name, stock in (("Lamp", 5), ("Rug", 1))
+        )
+        self.url = reverse("reservation-create")
+
+    def stock(self):
+        return dict(Product.objects.values_list("name", "stock_quantity"))
+
+    def post(self, *items):
+        data = {"items": [{"product": pk, "quantity": q} for pk, q in items]}
+        return self.client.post(self.url, data, format="json")
+
+    def test_reservations_are_all_or_nothing(self):
+        response = self.post((self.lamp.pk, 2), (self.rug.pk, 1), (self.lamp.pk, 1))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        quantities = {i["product"]: i["quantity"] for i in response.data["items"]}
+        self.assertEqual(quantities, {self.lamp.pk: 3, self.rug.pk: 1})
+        self.assertEqual(self.stock(), {"Lamp": 2, "Rug": 0})
+
+        response = self.post((self.lamp.pk, 1), (self.rug.pk, 1))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["products"], [self.rug.pk])
+        self.assertEqual(self.stock(), {"Lamp": 2, "Rug": 0})
+        self.assertEqual(Category.objects.get(name="Home").in_stock_count, 1)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.post().status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post((self.lamp.pk, 0))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post((self.lamp.pk, 1), (999_999, 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("999999", str(response.data["items"]))
+        self.assertEqual(self.stock(), {"Lamp": 5, "Rug": 1})
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.post((self.lamp.pk, 1)).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_confirm_and_release(self):
+        first = self.post((self.lamp.pk, 2)).data["id"]
+        second = self.post((self.lamp.pk, 3)).data["id"]
+        self.assertEqual(self.stock()["Lamp"], 0)
+
+        confirm = reverse("reservation-confirm", kwargs={"pk": first})
+        response = self.client.post(confirm)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data["confirmed_at"])
+        self.assertEqual(self.client.post(confirm).status_code, 409)
+        detail = reverse("reservation-detail", kwargs={"pk": first})
+        self.assertEqual(self.client.delete(detail).status_code, 409)
+
+        detail = reverse("reservation-detail", kwargs={"pk": second})
+        self.assertEqual(self.client.get(detail).data["items"][0]["quantity"], 3)
+        self.assertEqual(self.client.delete(detail).status_code, 204)
+        self.assertEqual(self.client.delete(detail).status_code, 404)
+        self.assertEqual(self.stock()["Lamp"], 3)
+
+        other = User.objects.create_user(username="other", password="x")
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse("reservation-detail", kwargs={"pk": first}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_expired_reservations_are_released(self):
+        expired = self.post((self.lamp.pk, 4)).data["id"]
+        live = self.post((self.lamp.pk, 1)).data["id"]
+        StockReservation.objects.filter(pk=expired).update(
+            expires_at=StockReservation.objects.get(pk=expired).created_at
+        )
+        confirm = reverse("reservation-confirm", kwargs={"pk": expired})
+        self.assertEqual(self.client.post(confirm).status_code, 409)
+
+        # A short product frees its expired reservations and retries
+        response = self.post((self.lamp.pk, 3))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(StockReservation.objects.filter(pk=expired).exists())
+        self.assertEqual(self.stock()["Lamp"], 1)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(1))
+        out = io.StringIO()
+        call_command("release_expired_reservations", stdout=out)
+        self.assertIn("Released 2 expired reservations.", out.getvalue())
+        self.assertEqual(self.stock()["Lamp"], 5)
+        self.assertFalse(StockReservation.objects.filter(pk=live).exists())
+
+    def test_deleting_a_shopper_restocks(self):
+        shopper = User.objects.create_user(username="leaving", password="x")
+        reserve(shopper, {self.lamp.pk: 2})
+        self.assertEqual(self.stock()["Lamp"], 3)
+        shopper.delete()
+        self.assertEqual(self.stock()["Lamp"], 5)
+
+    def test_schema_documents_confirm(self):
+        schema = SchemaGenerator().get_schema(public=True)
+        operation = schema["paths"]["/api/products/reservations/{id}/confirm/"]["post"]
+        self.assertNotIn("requestBody", operation)
+        self.assertIn("content", operation["responses"]["200"])
+
+
+class StockReservationConcurrencyTests(TransactionTestCase):
+    """
+    Many threads reserving the same products at once must never oversell:
+    the stock taken equals the reservations recorded and never exceeds what
+    there was. Runs against whichever database is configured (SQLite here,
+    PostgreSQL with POSTGRES_DB set).
+    """
+
+    THREADS = 16
+    ATTEMPTS = 15
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="stress", password="x")
+
+    def stress(self, stock, make_items):
+        products = [
+            Product.objects.create(
+                name=f"Hot {i}",
+                price=1,
+                category_id="Hot",
+                stock_quantity=stock,
+                created_by=self.user,
+            )
+            for i in range(2)
+        ]
+        ids = [product.pk for product in products]
+        outcomes = {"reserved": 0, "short": 0, "locked": 0}
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def worker(seed):
+            try:
+                start.wait()
+                for attempt in range(self.ATTEMPTS):
+                    try:
+                        reserve(self.user, make_items(ids, seed + attempt))
+                        outcome = "reserved"
+                    except InsufficientStock:
+                        outcome = "short"
+                    except OperationalError:
+                        # SQLite's in-memory test database reports write
+                        # contention instead of waiting; nothing was written
+                        outcome = "locked"
+                    with lock:
+                        outcomes[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(i * 1000,))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for product in products:
+            product.refresh_from_db()
+            held = sum(
+                StockReservationItem.objects.filter(product=product).values_list(
+                    "quantity", flat=True
+                )
+            )
+            self.assertGreaterEqual(product.stock_quantity, 0)
+            self.assertEqual(product.stock_quantity + held, stock)
+        self.assertGreater(outcomes["reserved"], 0)
+        self.assertEqual(sum(outcomes.values()), self.THREADS * self.ATTEMPTS)
+        return outcomes
+
+    def test_single_product_reservations(self):
+        items = lambda ids, seed: {ids[seed % 2]: 1 + seed % 3}  # noqa: E731
+        for batching in (True, False):
+            with self.subTest(batching=batching), override_settings(
+                STOCK_RESERVATION_BATCHING=batching
+            ):
+                Product.objects.all().delete()
+                self.stress(stock=100, make_items=items)
+
+    def test_multi_product_reservations(self):
+        items = lambda ids, seed: {ids[0]: 1 + seed % 2, ids[1]: 1}  # noqa: E731
+        self.stress(stock=60, make_items=items)
+
+
+class ProductStockStatusTests(APITestCase):
+    """``Product.in_stock`` is derived by the database on every write path."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="stocker", password="x", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(
+            name="Kettle", price=20, category_id="Home", created_by=self.user
+        )
+
+    def names(self, stock_status):
+        url = reverse("product-list-create") + f"?stock_status={stock_status}"
+        return [item["name"] for item in self.client.get(url).json()["results"]]
+
+    def assertInStock(self, in_stock):
+        self.product.refresh_from_db()
+        self.assertIs(self.product.in_stock, in_stock)
+        self.assertEqual(self.names("in_stock"), ["Kettle"] if in_stock else [])
+        self.assertEqual(self.names("out_of_stock"), [] if in_stock else ["Kettle"])
+
+    def test_flag_follows_every_write_path(self):
+        self.assertInStock(False)
+        url = reverse("product-detail", kwargs={"id": self.product.pk})
+        self.client.patch(url, {"stock_quantity": 3}, format="json")
+        self.assertInStock(True)
+
+        self.client.patch(
+            reverse("product-bulk"),
+            [{"id": self.product.pk, "stock_quantity": 0}],
+            format="json",
+        )
+        self.assertInStock(False)
+
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=2)
+        cache.clear()
+        self.assertInStock(True)
+
+        # Reservations bump the catalog version on commit, which TestCase
+        # never reaches
+        reserve(self.user, {self.product.pk: 2})
+        cache.clear()
+        self.assertInStock(False)
+
+    def test_negative_stock_is_out_of_stock(self):
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=-1)
+        cache.clear()
+        self.assertInStock(False)
+
+
+@override_settings(PRODUCT_CHANGES_LAG=0)
+class ProductChangesTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            username="mirror", password="x", is_staff=True
+        )
+        self.url = reverse("product-changes")
+        self.start = timezone.now() - timedelta(hours=1)
+        self.products = []
+        for i in range(3):
+            product = Product.objects.create(
+                name=f"Synced {i}", price=5, category_id="Sync", created_by=self.staff
+            )
+            # Distinct, known timestamps; the last two tie
+            stamp = self.start + timedelta(minutes=min(i, 1))
+            Product.objects.filter(pk=product.pk).update(updated_at=stamp)
+            self.products.append(product)
+
+    def sync(self, since=None, **params):
+        """Follow the feed to its end; returns the changes and the watermark."""
+        seen = []
+        while True:
+            if since:
+                params["since"] = since
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            seen.extend(data["changes"])
+            since = data["next"]
+            if not data["has_more"]:
+                return seen, since
+
+    def summary(self, changes):
+        return [
+            (change["op"], change.get("product", change).get("id"))
+            for change in changes
+        ]
+
+    def test_feed_walks_every_change_in_order(self):
+        first, second, third = (product.pk for product in self.products)
+        # Two index seeks each for products and tombstones
+        response = self.assertMaxQueries(4, self.client.get, self.url, {"limit": 2})
+        data = response.json()
+        self.assertTrue(data["has_more"])
+        self.assertEqual(
+            self.summary(data["changes"]), [("upsert", first), ("upsert", second)]
+        )
+        self.assertEqual(data["changes"][0]["product"]["name"], "Synced 0")
+
+        changes, watermark = self.sync(data["next"], limit=2)
+        self.assertEqual(self.summary(changes), [("upsert", third)])
+        self.assertEqual(self.sync(watermark)[0], [])
+
+        self.client.force_authenticate(self.staff)
+        detail = reverse("product-detail", kwargs={"id": second})
+        self.client.patch(detail, {"price": "6.00"}, format="json")
+        self.client.delete(reverse("product-detail", kwargs={"id": first}))
+        self.client.delete(reverse("product-bulk"), [third], format="json")
+        changes, watermark = self.sync(watermark)
+        self.assertEqual(
+            self.summary(changes),
+            [("upsert", second), ("delete", first), ("delete", third)],
+        )
+        self.assertEqual(changes[0]["product"]["price"], "6.00")
+        self.assertEqual(self.sync(watermark)[0], [])
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(self.url, {"fields": "id,price"})
+        product = response.json()["changes"][0]["product"]
+        self.assertEqual(product.keys(), {"id", "price"})
+
+    def test_recent_changes_wait_for_the_lag(self):
+        Product.objects.filter(pk=self.products[0].pk).update(updated_at=timezone.now())
+        with override_settings(PRODUCT_CHANGES_LAG=60):
+            changes, watermark = self.sync()
+        self.assertEqual(len(changes), 2)
+        changes, _ = self.sync(watermark)
+        self.assertEqual(self.summary(changes), [("upsert", self.products[0].pk)])
+
+    def test_invalid_requests(self):
+        for params in ({"since": "nope"}, {"limit": "0"}, {"limit": "x"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tombstones_expire(self):
+        _, watermark = self.sync()
+        self.products[0].delete()
+        with override_settings(PRODUCT_TOMBSTONE_RETENTION=0):
+            response = self.client.get(self.url, {"since": watermark})
+            self.assertEqual(response.status_code, status.HTTP_410_GONE)
+            out = io.StringIO()
+            call_command("prune_product_tombstones", stdout=out)
+        self.assertIn("Deleted 1 tombstones.", out.getvalue())
+        self.assertFalse(ProductTombstone.objects.exists())
+
+
+@override_settings(PROFILING_ENABLED=True)
+class ProfilingMiddlewareTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.staff = User.objects.create_user(
+            username="profiler", password="x", is_staff=True
+        )
+        Product.objects.create(
+            name="Timed", price=5, category_id="Home", created_by=self.staff
+        )
+
+    def test_timings_are_reported_and_aggregated(self):
+        response = self.client.get(reverse("product-search") + "?q=timed")
+        timing = response["Server-Timing"]
+        for name in ("total;dur=", "db;dur=", "serialize;dur=", "render;dur="):
+            self.assertIn(name, timing)
+        self.assertIn('queries"', timing)
+
+        self.client.force_authenticate(self.staff)
+        data = self.client.get(reverse("metrics")).data
+        self.assertTrue(data["enabled"])
+        route = "GET /api/products/products/search/"
+        stats = data["routes"][route]
+        self.assertEqual(stats["requests"], 1)
+        self.assertGreater(stats["queries"]["max"], 0)
+        self.assertGreater(stats["serialize_ms"]["max"], 0)
+        self.assertGreater(stats["mean_response_bytes"], 0)
+        self.assertEqual(data["recent"][0]["route"], route)
+
+        self.assertEqual(self.client.delete(reverse("metrics")).status_code, 204)
+        # Only the reset itself remains
+        routes = list(registry.snapshot()["routes"])
+        self.assertEqual(routes, ["DELETE /api/metrics/"])
+
+    def test_metrics_are_staff_only(self):
+        self.assertIn(self.client.get(reverse("metrics")).status_code, (401, 403))
+        shopper = User.objects.create_user(username="peeker", password="x")
+        self.client.force_authenticate(shopper)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+    def test_metrics_are_left_out_of_the_schema(self):
+        schema = SchemaGenerator().get_schema(public=True)
+        self.assertNotIn(reverse("metrics"), schema["paths"])
+
+    def test_repeated_queries_are_flagged(self):
+        def view(request):
+            for pk in range(5):
+                list(Product.objects.filter(pk__in=[pk] * (pk + 1)))
+            return HttpResponse("ok")
+
+        middleware = ProfilingMiddleware(view)
+        with self.assertLogs("config.profiling", "WARNING") as logs:
+            response = middleware(RequestFactory().get("/"))
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("ran 5 times", logs.output[0])
+        (flagged,) = registry.snapshot()["routes"]["GET /<unresolved>"]["n_plus_one"]
+        self.assertIn("IN (...)", flagged["sql"])
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse("product-list-create"))
+        self.assertNotIn("Server-Timing", response)
+
+
+def add_database(alias, **overrides):
+    """Configure another database alias like the default one."""
+    default = connections.settings[DEFAULT_DB_ALIAS]
+    test_name = None
+    if connection.vendor != "sqlite":
+        test_name = f"{connection.settings_dict['NAME']}_{alias}"
+    connections.settings[alias] = {
+        **default,
+        "TEST": {**default["TEST"], "NAME": test_name, "MIRROR": None},
+        **overrides,
+    }
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(APITestCase):
+    # "replica" is a second test database, set up here rather than by the
+    # test runner. Its rows differ from the primary's, so each response shows
+    # where it was read.
+
+    @classmethod
+    def setUpClass(cls):
+        add_database("replica")
+        cls.replica_name = connections["replica"].creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        cls.databases = {DEFAULT_DB_ALIAS, "replica"}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].creation.destroy_test_db(cls.replica_name, verbosity=0)
+        remove_database("replica")
+
+    def setUp(self):
+        replicas._down_until.clear()
+        self.staff = User.objects.create_user(
+            username="router", password="x", is_staff=True
+        )
+        self.product = Product.objects.create(
+            name="Desk lamp", price=20, category_id="Home", created_by=self.staff
+        )
+        User.objects.using("replica").create(
+            pk=self.staff.pk, username="router", is_staff=True
+        )
+        Product.objects.using("replica").create(
+            pk=self.product.pk,
+            name="Lamp not yet replicated",
+            price=20,
+            category_id="Home",
+            created_by_id=self.staff.pk,
+        )
+        self.detail = reverse("product-detail", kwargs={"id": self.product.pk})
+        # Forget the writes above, so that replica reads are cached again
+        cache.clear()
+
+    def read_name(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data["results"][0]["name"] if "results" in data else data["name"]
+
+    def test_safe_reads_use_the_replica(self):
+        for url in (
+            reverse("product-list-create"),
+            reverse("product-search") + "?q=lamp",
+            self.detail,
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.read_name(url), "Lamp not yet replicated")
+
+    def test_writers_read_their_writes_from_the_primary(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.patch(self.detail, {"name": "Brass lamp"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Product.objects.using("replica").get().name, "Lamp not yet replicated"
+        )
+
+        # Others read the replica, and while it may trail the write, what they
+        # read is not cached
+        self.client.force_authenticate(None)
+        for _ in range(2):
+            with CaptureQueriesContext(connections["replica"]) as queries:
+                self.assertEqual(self.read_name(self.detail), "Lamp not yet replicated")
+            self.assertGreater(len(queries), 0)
+
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.read_name(self.detail), "Brass lamp")
+
+    def test_lagging_replica_counts_and_validators_are_not_cached(self):
+        url = reverse("product-list-create")
+        etag = self.client.get(url)["ETag"]
+        self.client.force_authenticate(self.staff)
+        response = self.client.post(
+            reverse("product-list-create"),
+            {
+                "name": "Floor lamp",
+                "price": "40.00",
+                "category": "Home",
+                "description": "Tall.",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).json()["count"], 1)
+
+        # The replica catches up within the lag window (bulk_create: without
+        # the signal that would bump the catalog version a second time)
+        Product.objects.using("replica").bulk_create(
+            [
+                Product(
+                    pk=response.data["id"],
+                    name="Floor lamp",
+                    price=40,
+                    category_id="Home",
+                    created_by_id=self.staff.pk,
+                )
+            ]
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+
+        # Once the pin expires the writer reads the replica too
+        cache.clear()
+        self.assertEqual(self.read_name(self.detail), "Lamp not yet replicated")
+
+    def test_unavailable_replicas_fall_back(self):
+        # Added now, so that no test transaction is opened on it
+        if connection.vendor == "sqlite":
+            add_database(
+                "offline",
+                NAME="file:/nonexistent/offline.sqlite3?mode=ro",
+                OPTIONS={"uri": True},
+            )
+        else:
+            add_database("offline", HOST="127.0.0.1", PORT="1")
+        self.addCleanup(remove_database, "offline")
+        databases = type(self).databases
+        type(self).databases = databases | {"offline"}
+        self.addCleanup(setattr, type(self), "databases", databases)
+
+        with override_settings(DATABASE_REPLICAS=["offline"]):
+            with self.assertLogs("config.replicas", "WARNING") as logs:
+                self.assertEqual(self.read_name(self.detail), "Desk lamp")
+            self.assertIn("Replica offline is unavailable", logs.output[0])
+            # Not retried until REPLICA_RETRY_SECONDS have passed
+            cache.clear()
+            with self.assertNoLogs("config.replicas", "WARNING"):
+                self.assertEqual(self.read_name(self.detail), "Desk lamp")
+
+        with override_settings(DATABASE_REPLICAS=["offline", "replica"]):
+            cache.clear()
+            self.assertEqual(self.read_name(self.detail), "Lamp not yet replicated")
+
+    async def test_async_reads_use_the_replica(self):
+        async def detail(request):
+            kwargs = {"id": self.product.pk}
+            response = await aread_response(ProductDetailView, request, kwargs)
+            self.assertIsNotNone(response, "fell back to the sync view")
+            return response
+
+        request = AsyncRequestFactory().get(self.detail)
+        response = await ReplicaMiddleware(detail)(request)
+        name = json.loads(response.content)["name"]
+        self.assertEqual(name, "Lamp not yet replicated")
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite connection profile")
+@skipUnless(settings.SQLITE_TUNING, "SQLITE_TUNING is off")
+class SQLiteProfileTests(SimpleTestCase):
+    def test_new_connections_are_tuned(self):
+        path = os.path.join(tempfile.mkdtemp(), "profile.sqlite3")
+        default = connections[DEFAULT_DB_ALIAS]
+        wrapper = type(default)({**default.settings_dict, "NAME": path})
+        raw = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            values = {
+                pragma: raw.execute(f"PRAGMA {pragma}").fetchone()[0]
+                for pragma in ("journal_mode", "synchronous", "busy_timeout")
+            }
+        finally:
+            raw.close()
+        self.assertEqual(
+            values, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 20000}
+        )
+        self.assertEqual(wrapper.transaction_mode, "IMMEDIATE")
+        self.assertEqual(wrapper.settings_dict["CONN_MAX_AGE"], 600)
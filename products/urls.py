@@ -1,10 +1,56 @@
+from django.conf import settings
 from django.urls import path
-from .views import ProductListCreateView, ProductDetailView, ProductSearchView
+from .async_views import async_read_view
+from .views import (
+    CategoryListView,
+    ProductBulkView,
+    ProductChangesView,
+    ProductListCreateView,
+    ProductDetailView,
+    ProductExportView,
+    ProductFacetsView,
+    ProductSearchView,
+    StockReservationConfirmView,
+    StockReservationCreateView,
+    StockReservationDetailView,
+)
+
+
+def read_view(view_class):
+    """Product read views run natively on the event loop when served by ASGI."""
+    if getattr(settings, "PRODUCTS_ASYNC_READS", False):
+        return async_read_view(view_class)
+    return view_class.as_view()
+
 
 urlpatterns = [
     # CRUD/List Endpoints
-    path("products/", ProductListCreateView.as_view(), name="product-list-create"),
-    path("products/<int:id>/", ProductDetailView.as_view(), name="product-detail"),
+    path("products/", read_view(ProductListCreateView), name="product-list-create"),
+    path("products/<int:id>/", read_view(ProductDetailView), name="product-detail"),
+    # Batched create/update/delete for catalog imports (staff only)
+    path("products/bulk/", ProductBulkView.as_view(), name="product-bulk"),
+    # Streaming NDJSON/CSV dump of the (filtered) catalog
+    path("products/export/", ProductExportView.as_view(), name="product-export"),
+    # Creates, updates and deletes since a watermark, for catalog mirrors
+    path("products/changes/", ProductChangesView.as_view(), name="product-changes"),
+    # Category/price/stock counts for the storefront sidebar
+    path("products/facets/", ProductFacetsView.as_view(), name="product-facets"),
+    # Categories with their product counts
+    path("categories/", CategoryListView.as_view(), name="category-list"),
+    # Stock reservations for checkout
+    path(
+        "reservations/", StockReservationCreateView.as_view(), name="reservation-create"
+    ),
+    path(
+        "reservations/<uuid:pk>/",
+        StockReservationDetailView.as_view(),
+        name="reservation-detail",
+    ),
+    path(
+        "reservations/<uuid:pk>/confirm/",
+        StockReservationConfirmView.as_view(),
+        name="reservation-confirm",
+    ),
     # Search Endpoint (Week 4 Plan, implemented early)
-    path("products/search/", ProductSearchView.as_view(), name="product-search"),
+    path("products/search/", read_view(ProductSearchView), name="product-search"),
 ]
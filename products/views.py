@@ -1,15 +1,135 @@
-from rest_framework import generics, permissions, filters
-from django.db.models import Q  # For complex queries like OR/AND
-from .models import Product
-from .serializers import ProductSerializer
+import csv
+from itertools import chain
+
+from asgiref.sync import sync_to_async
+from rest_framework import generics, permissions, filters, serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.db.models import Count, Max, Value
+from django.db.models.functions import Lower
+from drf_spectacular.utils import extend_schema
+from config.replicas import ReplicaReadsMixin
+from . import bulk, changes, reservations
+from .cache import (
+    CachedResponseMixin,
+    catalog_version,
+    get_cache,
+    make_key,
+    replica_may_be_stale,
+)
+from .counting import ProductCounter
+from .facets import compute_facets
+from .models import Category, Product, StockReservation
+from .serializers import (
+    CategorySerializer,
+    ProductFacetsSerializer,
+    ProductReadSerializer,
+    ProductSerializer,
+    StockReservationSerializer,
+)
 from .permissions import IsStaffOrReadOnly
+from .pagination import ProductKeysetPagination, ProductPageNumberPagination
+from .renderers import (
+    CSVRenderer,
+    Echo,
+    FastJSONRenderer,
+    NDJSONRenderer,
+    ndjson_line,
+)
+from .search import get_search_backend
+
+
+class ProductQueryMixin:
+    """
+    Query planning for the product views: every queryset starts from here so
+    the relations read by the serializer are always joined (no N+1 queries).
+
+    Views that set ``read_serializer_class`` serve GETs with it (rows from
+    ``.values()``, see ProductReadSerializer) while PRODUCT_FAST_SERIALIZATION
+    is on; writes and schema generation always use ``serializer_class``.
+
+    Views that set ``sparse_fieldsets`` let GETs pick their fields with
+    ?fields=id,name,price or drop some with ?exclude=description. Only the
+    columns and joins those fields need are loaded.
+    """
+
+    read_serializer_class = None
+    sparse_fieldsets = False
+
+    def get_requested_fields(self):
+        """The field names this GET asked for, in output order, or None."""
+        request = self.request
+        if not self.sparse_fieldsets or request is None:
+            return None
+        if request.method not in ("GET", "HEAD"):
+            return None
+        params = request.query_params
+        include = split_names(params.get("fields", ""))
+        exclude = split_names(params.get("exclude", ""))
+        if not include and not exclude:
+            return None
+
+        available = self.serializer_class.Meta.fields
+        unknown = sorted((include | exclude) - set(available))
+        if unknown:
+            key = "fields" if unknown[0] in include else "exclude"
+            raise ValidationError({key: [f"Unknown fields: {', '.join(unknown)}."]})
+        fields = tuple(
+            name
+            for name in available
+            if (not include or name in include) and name not in exclude
+        )
+        if not fields:
+            raise ValidationError({"exclude": ["At least one field must remain."]})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        if self.sparse_fieldsets:
+            kwargs.setdefault("fields", self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_class(self):
+        if (
+            self.read_serializer_class is not None
+            and self.request is not None
+            and self.request.method in ("GET", "HEAD")
+            and getattr(settings, "PRODUCT_FAST_SERIALIZATION", True)
+            and not getattr(self, "swagger_fake_view", False)
+        ):
+            return self.read_serializer_class
+        return super().get_serializer_class()
+
+    def get_base_queryset(self):
+        serializer_class = self.get_serializer_class()
+        return serializer_class.setup_eager_loading(
+            Product.objects.all(), fields=self.get_requested_fields()
+        )
+
+
+def filter_by_category(queryset, name):
+    """
+    Products in the categories named ``name``, ignoring case. The names are
+    matched in the small category table (category_name_lower_idx), and the
+    products by exact name (product_category_name_idx).
+    """
+    names = Category.objects.filter(name__lower=Lower(Value(name))).values("name")
+    return queryset.filter(category__in=names)
+
 
+def split_names(value):
+    """``"a, b,,c"`` -> ``{"a", "b", "c"}``"""
+    return {name.strip() for name in value.split(",") if name.strip()}
 
-class ProductFilterMixin:
+
+class ProductFilterMixin(ProductQueryMixin):
     """Mixin to handle advanced filtering logic (Price Range, Stock)"""
 
     def get_queryset(self):
-        queryset = Product.objects.all()
+        queryset = self.get_base_queryset()
         params = self.request.query_params
 
         # --- 1. Price Range Filtering ---
@@ -33,20 +153,109 @@ class ProductFilterMixin:
         stock_status = params.get("stock_status")
         if stock_status:
             if stock_status.lower() == "in_stock":
-                queryset = queryset.filter(stock_quantity__gt=0)
+                queryset = queryset.filter(in_stock=True)
             elif stock_status.lower() == "out_of_stock":
-                queryset = queryset.filter(stock_quantity=0)
+                queryset = queryset.filter(in_stock=False)
+
+        # --- 3. Category (by name, case-insensitive) ---
+        category = params.get("category")
+        if category:
+            queryset = filter_by_category(queryset, category)
 
         return queryset
 
 
-class ProductListCreateView(ProductFilterMixin, generics.ListCreateAPIView):
+class ProductPaginationMixin:
+    """
+    Page-number pagination by default. Clients that walk the whole catalog opt
+    into keyset pagination with ?pagination=cursor (the `next` links it returns
+    carry a ?cursor= and keep the mode).
+    """
+
+    @property
+    def pagination_class(self):
+        request = getattr(self, "request", None)
+        if request is not None:
+            params = request.query_params
+            if params.get("pagination") == "cursor" or "cursor" in params:
+                return ProductKeysetPagination
+        return ProductPageNumberPagination
+
+
+class ProductListValidatorsMixin:
+    """
+    Conditional GET validators for product lists: one aggregate of the newest
+    updated_at and the row count over the filtered queryset. Adding, editing or
+    removing any matching product changes at least one of them. Results are
+    cached per filter set, so every page of a listing shares them.
+    """
+
+    def get_validators(self):
+        counter = ProductCounter(self.request)
+        key = make_key("validators", *counter.key_parts)
+        validators = get_cache().get(key)
+        if validators is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            if counter.estimate(queryset) is not None:
+                # Too large to count on every poll: any product write moves
+                # the catalog version instead.
+                last_modified = queryset.aggregate(value=Max("updated_at"))["value"]
+                validators = (last_modified, f"catalog-{catalog_version()}")
+            else:
+                stats = queryset.aggregate(
+                    last_modified=Max("updated_at"), count=Count("pk")
+                )
+                # The page about to be built needs this count too
+                counter.prime(stats["count"])
+                validators = (stats["last_modified"], stats["count"])
+            if not replica_may_be_stale():
+                timeout = getattr(settings, "PRODUCT_COUNT_CACHE_TIMEOUT", 300)
+                get_cache().set(key, validators, timeout)
+        return validators
+
+    async def aget_validators(self):
+        # The same code in a worker thread, where the async ORM would run
+        # these queries anyway
+        return await sync_to_async(self.get_validators)()
+
+
+class ProductAsyncListMixin:
+    """
+    ``list()`` for the async read path (products/async_views.py): the same
+    queryset, pagination and serializer, with the queries on the async ORM.
+    """
+
+    async def aget_queryset(self):
+        return self.get_queryset()
+
+    async def aread(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(await self.aget_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ProductListCreateView(
+    ReplicaReadsMixin,
+    ProductListValidatorsMixin,
+    CachedResponseMixin,
+    ProductAsyncListMixin,
+    ProductPaginationMixin,
+    ProductFilterMixin,
+    generics.ListCreateAPIView,
+):
     """
     GET /api/products/products/  -> List products with Pagination/Filtering (public)
+                                    (?min_price, ?max_price, ?stock_status, ?category)
+                                    (?pagination=cursor for keyset pagination,
+                                    ?fields=/?exclude= for a sparse fieldset)
     POST /api/products/products/ -> Create a new product (staff/admin only)
     """
 
     serializer_class = ProductSerializer
+    read_serializer_class = ProductReadSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    sparse_fieldsets = True
     permission_classes = [IsStaffOrReadOnly]
 
     # The queryset is now handled by ProductFilterMixin's get_queryset method
@@ -56,50 +265,438 @@ class ProductListCreateView(ProductFilterMixin, generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailView(
+    ReplicaReadsMixin,
+    CachedResponseMixin,
+    ProductQueryMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     """
     GET /api/products/products/<id>/    -> Retrieve single product (public)
     PUT/PATCH /api/products/products/<id>/ -> Update product (staff/admin only)
     DELETE /api/products/products/<id>/  -> Delete product (staff/admin only)
     """
 
-    queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    read_serializer_class = ProductReadSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    sparse_fieldsets = True
     permission_classes = [IsStaffOrReadOnly]
     lookup_field = "id"
 
+    def get_queryset(self):
+        return self.get_base_queryset()
+
+    def get_object(self):
+        # Fetched once per request: get_validators() and retrieve() share it
+        if not hasattr(self, "_object"):
+            self._object = super().get_object()
+        return self._object
 
-class ProductSearchView(generics.ListAPIView):
+    def get_validators(self):
+        return self.product_validators(self.get_object())
+
+    async def aget_object(self):
+        if not hasattr(self, "_object"):
+            queryset = self.filter_queryset(self.get_queryset())
+            lookup = {self.lookup_field: self.kwargs[self.lookup_field]}
+            try:
+                product = await queryset.aget(**lookup)
+            except queryset.model.DoesNotExist:
+                raise Http404
+            self.check_object_permissions(self.request, product)
+            self._object = product
+        return self._object
+
+    async def aget_validators(self):
+        return self.product_validators(await self.aget_object())
+
+    @staticmethod
+    def product_validators(product):
+        # A row from ProductReadSerializer's .values() query, or an instance
+        if isinstance(product, dict):
+            pk, updated_at = product["id"], product["updated_at"]
+        else:
+            pk, updated_at = product.pk, product.updated_at
+        return updated_at, f"{pk}:{updated_at.isoformat()}"
+
+    async def aread(self, request, *args, **kwargs):
+        product = await self.aget_object()
+        return Response(self.get_serializer(product).data)
+
+
+class ProductSearchView(
+    ReplicaReadsMixin,
+    ProductListValidatorsMixin,
+    CachedResponseMixin,
+    ProductAsyncListMixin,
+    ProductPaginationMixin,
+    ProductQueryMixin,
+    generics.ListAPIView,
+):
     """
-    GET /api/products/products/search/?name=...&category=...
-    Endpoint for searching products by name or category, now integrated with Pagination.
+    GET /api/products/products/search/?q=...&category=...
+    Full-text search over name, description and category, best match first,
+    with every term matched as a prefix (see products/search.py). `name` is
+    accepted as an alias of `q`. `category` narrows results to one category
+    (case-insensitive). Integrated with Pagination; in cursor mode matches are
+    returned in name order instead of by relevance.
     """
 
     serializer_class = ProductSerializer
+    read_serializer_class = ProductReadSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    sparse_fieldsets = True
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        queryset = Product.objects.all()
-        name = self.request.query_params.get("name", None)
-        category = self.request.query_params.get("category", None)
+        queryset = self.get_base_queryset()
+        params = self.request.query_params
+        query = params.get("q") or params.get("name")
+        category = params.get("category")
 
-        # If no search params, return nothing (or all? User didn't specify, but search usually requires query)
-        # Assuming return all if no query, or handle logic.
-        # But for 'search' endpoint, usually if no params, we might return all or none.
-        # Given lines 80-92, it was intending to return filtered list.
+        if category:
+            queryset = filter_by_category(queryset, category)
 
-        if not name and not category:
-            return queryset  # Return all if no params
+        if query:
+            queryset = get_search_backend().search(queryset, query)
 
-        search_filter = Q()
-        has_filter = False
+        return queryset  # The whole catalog if no params
 
-        if name:
-            search_filter |= Q(name__icontains=name)
-            has_filter = True
+    async def aget_queryset(self):
+        # Backends may read the database while planning (the in-memory index
+        # builds itself on first use)
+        return await sync_to_async(self.get_queryset)()
 
-        if category:
-            search_filter |= Q(category__iexact=category)
-            has_filter = True
 
-        return queryset.filter(search_filter).distinct()
+class ProductBulkView(APIView):
+    """
+    POST   /api/products/products/bulk/ -> Create products from a JSON array
+    PATCH  /api/products/products/bulk/ -> Update products; each item needs an "id"
+    DELETE /api/products/products/bulk/ -> Delete products from a JSON array of ids
+    (staff/admin only)
+
+    Every item is validated with ProductSerializer. Valid items are written in
+    chunked transactions with bulk_create/bulk_update, and invalid ones are
+    reported by their index in the request array.
+    """
+
+    permission_classes = [IsStaffOrReadOnly]
+    serializer_class = ProductSerializer
+
+    @staticmethod
+    def is_id(value):
+        # JSON true/false arrive as bool, which is an int subclass
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    def get_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            # Dict-shaped so custom_exception_handler can add its keys
+            raise ValidationError({"non_field_errors": ["Expected a JSON array."]})
+        max_items = getattr(settings, "PRODUCT_BULK_MAX_ITEMS", 10_000)
+        if len(items) > max_items:
+            raise ValidationError(
+                {"non_field_errors": [f"At most {max_items} items per request."]}
+            )
+        return items
+
+    def bulk_response(self, key, written, errors):
+        if errors and not written:
+            code = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_201_CREATED if key == "created" else status.HTTP_200_OK
+        return Response({key: written, "errors": errors}, status=code)
+
+    def post(self, request, *args, **kwargs):
+        child = self.serializer_class(many=True).child
+        products, errors = [], []
+        for index, item in enumerate(self.get_items(request)):
+            try:
+                data = child.run_validation(item)
+            except ValidationError as exc:
+                errors.append({"index": index, "errors": exc.detail})
+            else:
+                products.append(Product(created_by=request.user, **data))
+
+        created = bulk.create_products(products)
+        if created:
+            bulk.catalog_changed()
+        return self.bulk_response("created", [p.pk for p in created], errors)
+
+    def patch(self, request, *args, **kwargs):
+        items = self.get_items(request)
+        ids = [item.get("id") for item in items if isinstance(item, dict)]
+        existing = Product.objects.in_bulk([pk for pk in ids if self.is_id(pk)])
+
+        products, fields, errors = [], set(), []
+        for index, item in enumerate(items):
+            pk = item.get("id") if isinstance(item, dict) else None
+            product = existing.get(pk) if self.is_id(pk) else None
+            if product is None:
+                errors.append({"index": index, "errors": {"id": ["Not found."]}})
+                continue
+            serializer = self.serializer_class(product, data=item, partial=True)
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
+                continue
+            for attr, value in serializer.validated_data.items():
+                setattr(product, attr, value)
+            fields.update(serializer.validated_data)
+            products.append(product)
+
+        if products:
+            bulk.update_products(products, fields)
+            bulk.catalog_changed()
+        return self.bulk_response("updated", [p.pk for p in products], errors)
+
+    def delete(self, request, *args, **kwargs):
+        ids, errors = [], []
+        for index, pk in enumerate(self.get_items(request)):
+            if self.is_id(pk):
+                ids.append(pk)
+            else:
+                errors.append({"index": index, "errors": ["Expected a product id."]})
+        deleted = bulk.delete_products(ids) if ids else 0
+        return Response(
+            {"deleted": deleted, "errors": errors}, status=status.HTTP_200_OK
+        )
+
+
+class ProductChangesView(ProductQueryMixin, generics.GenericAPIView):
+    """
+    GET /api/products/products/changes/?since=<watermark>&limit=100 (public)
+    Products created, updated or deleted since the watermark, oldest first
+    (see products/changes.py). Start without `since`, then pass each
+    response's `next` back until `has_more` is false, and keep polling with
+    it. 410 Gone means the watermark is older than the deletions still
+    kept: sync again from the beginning. ?fields=/?exclude= trim the
+    product representations.
+    """
+
+    serializer_class = ProductSerializer
+    read_serializer_class = ProductReadSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    sparse_fieldsets = True
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+    def get_limit(self):
+        default = getattr(settings, "PRODUCT_CHANGES_PAGE_SIZE", 100)
+        maximum = getattr(settings, "PRODUCT_CHANGES_MAX_PAGE_SIZE", 1000)
+        try:
+            limit = int(self.request.query_params.get("limit", default))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= maximum:
+            raise ValidationError(
+                {"limit": [f"Expected a number from 1 to {maximum}."]}
+            )
+        return limit
+
+    def get(self, request, *args, **kwargs):
+        try:
+            feed, watermark, has_more = changes.changes_since(
+                self.get_base_queryset(),
+                request.query_params.get("since"),
+                self.get_limit(),
+            )
+        except changes.InvalidWatermark:
+            raise ValidationError({"since": ["Invalid watermark."]})
+        except changes.WatermarkExpired:
+            return Response(
+                {"detail": "Watermark expired; sync again from the beginning."},
+                status=status.HTTP_410_GONE,
+            )
+
+        upserts = iter(
+            self.get_serializer(
+                [row for kind, row in feed if kind == changes.UPSERT], many=True
+            ).data
+        )
+        timestamp = serializers.DateTimeField()
+        results = []
+        for kind, item in feed:
+            if kind == changes.UPSERT:
+                results.append({"op": "upsert", "product": next(upserts)})
+            else:
+                results.append(
+                    {
+                        "op": "delete",
+                        "id": item.product_id,
+                        "deleted_at": timestamp.to_representation(item.deleted_at),
+                    }
+                )
+        return Response({"changes": results, "next": watermark, "has_more": has_more})
+
+
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
+    """
+    GET /api/products/categories/ -> Categories with products, and their counts (public)
+
+    Counts are the counters the database maintains on each category, so the
+    listing reads one small table however large the catalog is.
+    """
+
+    queryset = Category.objects.filter(product_count__gt=0)
+    serializer_class = CategorySerializer
+    permission_classes = [permissions.AllowAny]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    pagination_class = None
+
+
+class ProductFacetsView(
+    CachedResponseMixin, ProductFilterMixin, generics.GenericAPIView
+):
+    """
+    GET /api/products/products/facets/ -> Sidebar facets for a filter set (public)
+
+    Category counts, price buckets (PRODUCT_FACET_PRICE_BUCKETS) and stock
+    counts over the products matching the ProductFilterMixin filters, all
+    from one GROUP BY query (see products/facets.py). Responses are cached
+    like the other public reads, so any product write invalidates them.
+    """
+
+    serializer_class = ProductFacetsSerializer
+    permission_classes = [permissions.AllowAny]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    pagination_class = None
+
+    def get_base_queryset(self):
+        # Aggregates only: no joins, no columns beyond the grouped ones
+        return Product.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        response = self.cached_response(request)
+        if response is None:
+            price = ProductSerializer().fields["price"].to_representation
+            response = Response(compute_facets(self.get_queryset(), price))
+        return response
+
+
+class ProductExportView(ProductFilterMixin, generics.GenericAPIView):
+    """
+    GET /api/products/products/export/?format=ndjson|csv -> Full catalog dump (public)
+
+    Streams every product matching the ProductFilterMixin filters, one row at
+    a time, in ProductSerializer's representation. Rows are read with a
+    chunked iterator, so memory stays flat however large the catalog is.
+    The format can also be chosen with the Accept header.
+    """
+
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.AllowAny]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        chunk_size = getattr(settings, "PRODUCT_EXPORT_CHUNK_SIZE", 2000)
+        products = self.get_queryset().iterator(chunk_size=chunk_size)
+        rows = map(self.get_serializer().to_representation, products)
+
+        if renderer.format == "csv":
+            writer = csv.writer(Echo())
+            header = [writer.writerow(self.serializer_class.Meta.fields)]
+            lines = chain(header, (writer.writerow(list(row.values())) for row in rows))
+        else:
+            lines = map(ndjson_line, rows)
+
+        response = StreamingHttpResponse(
+            lines, content_type=f"{renderer.media_type}; charset=utf-8"
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="products.{renderer.format}"'
+        )
+        return response
+
+
+class StockReservationCreateView(APIView):
+    """
+    POST /api/products/reservations/ -> Reserve stock (authenticated users)
+
+    Body: {"items": [{"product": <id>, "quantity": <n>}, ...]}. All items
+    are reserved or none is: 201 with the reservation and its expires_at,
+    or 409 with the ids of the products that are short. Confirm it before
+    it expires, or release it, with the URLs below. See
+    products/reservations.py.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = StockReservationSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reservation = reservations.reserve(
+                request.user, serializer.validated_data["items"]
+            )
+        except reservations.InsufficientStock as exc:
+            known = set(
+                Product.objects.filter(pk__in=exc.product_ids).values_list(
+                    "pk", flat=True
+                )
+            )
+            unknown = [pk for pk in exc.product_ids if pk not in known]
+            if unknown:
+                raise ValidationError(
+                    {"items": [f"Unknown products: {', '.join(map(str, unknown))}."]}
+                )
+            return Response(
+                {"detail": "Insufficient stock.", "products": exc.product_ids},
+                status=status.HTTP_409_CONFLICT,
+            )
+        data = self.serializer_class(reservation).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class StockReservationDetailView(generics.RetrieveDestroyAPIView):
+    """
+    GET    /api/products/reservations/<id>/ -> The reservation (its owner only)
+    DELETE /api/products/reservations/<id>/ -> Release it and restock
+                                               (409 once confirmed)
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = StockReservationSerializer
+
+    def get_queryset(self):
+        return StockReservation.objects.filter(user=self.request.user).prefetch_related(
+            "items"
+        )
+
+    def destroy(self, request, *args, **kwargs):
+        reservation = self.get_object()
+        if not reservations.release(reservation.pk, request.user):
+            # Confirmed, or released by someone else meanwhile
+            return Response(
+                {"detail": "Reservation is confirmed."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StockReservationConfirmView(APIView):
+    """
+    POST /api/products/reservations/<id>/confirm/ -> Keep the reserved stock
+
+    409 if the reservation has expired or was already confirmed.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    # No request body: the reservation is named by the URL
+    @extend_schema(request=None, responses=StockReservationSerializer)
+    def post(self, request, pk, *args, **kwargs):
+        if reservations.confirm(pk, request.user):
+            reservation = StockReservation.objects.prefetch_related("items").get(pk=pk)
+            return Response(StockReservationSerializer(reservation).data)
+        if not StockReservation.objects.filter(pk=pk, user=request.user).exists():
+            raise Http404
+        return Response(
+            {"detail": "Reservation has expired or is already confirmed."},
+            status=status.HTTP_409_CONFLICT,
+        )
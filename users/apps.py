@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = "users"
+
+    def ready(self):
+        # Evict cached tokens when tokens or their users change
+        from . import signals  # noqa: F401
@@ -0,0 +1,155 @@
+"""
+Token authentication without a database query on every request.
+
+``CachedTokenAuthentication`` keeps recently verified tokens in a bounded
+in-process LRU and, when ``AUTH_TOKEN_CACHE_ALIAS`` names a Django cache, in
+that shared tier too. Entries live for ``AUTH_TOKEN_CACHE_TIMEOUT`` seconds.
+Deleting or saving a token or its user evicts it (see users/signals.py); in
+other processes the short timeout bounds how long an evicted token is served.
+
+Both tiers are keyed by the SHA-256 digest of the token, which is also what
+``AuthToken`` stores, so a token can be evicted without knowing its key.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .models import AuthToken, token_digest
+
+
+class TokenLRU:
+    """Thread-safe LRU of ``digest -> (user, token, expires_at)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry[:2]
+
+    def set(self, digest, user, token, timeout, max_entries):
+        with self._lock:
+            self._entries[digest] = (user, token, time.monotonic() + timeout)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = TokenLRU()
+
+
+def _timeout():
+    return getattr(settings, "AUTH_TOKEN_CACHE_TIMEOUT", 30)
+
+
+def _shared_cache():
+    alias = getattr(settings, "AUTH_TOKEN_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def _shared_key(digest):
+    # Never put raw credentials in the cache backend's key space
+    return f"users:token:{digest}"
+
+
+def invalidate_digest(digest):
+    """Forget a cached token in this process and in the shared tier."""
+    local_tokens.delete(digest)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_shared_key(digest))
+
+
+def invalidate_token(key):
+    invalidate_digest(token_digest(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for ``TokenAuthentication`` that serves repeat
+    requests for the same token from memory.
+    """
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        entry = local_tokens.get(digest)
+        shared = _shared_cache()
+        if entry is None and shared is not None:
+            entry = shared.get(_shared_key(digest))
+            if entry is not None:
+                self._remember(digest, *entry)
+        if entry is not None and not self.is_current(*entry):
+            invalidate_digest(digest)
+            entry = None
+        if entry is None:
+            user, token = self.verify_credentials(key)
+            entry = (user, token)
+            self._remember(digest, user, token)
+            if shared is not None:
+                shared.set(_shared_key(digest), entry, _timeout())
+        user, token = entry
+        if not user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+        # Views may modify request.user; keep the cached instance pristine
+        return copy.copy(user), token
+
+    def verify_credentials(self, key):
+        """Look the token up in the database; the uncached path."""
+        return super().authenticate_credentials(key)
+
+    def is_current(self, user, token):
+        """Whether a cached entry may still be served."""
+        return True
+
+    def _remember(self, digest, user, token):
+        max_entries = getattr(settings, "AUTH_TOKEN_CACHE_MAX_ENTRIES", 10_000)
+        local_tokens.set(digest, user, token, _timeout(), max_entries)
+
+
+class ExpiringTokenAuthentication(CachedTokenAuthentication):
+    """
+    Authenticates ``AuthToken`` keys (``<prefix>.<secret>``), with the
+    same caching. Keys without a prefix are legacy ``authtoken`` tokens and
+    still verify through ``TokenAuthentication`` until they are retired.
+    """
+
+    def verify_credentials(self, key):
+        if "." not in key:
+            return super().verify_credentials(key)
+        token = AuthToken.objects.verify(key)
+        if token is None:
+            raise AuthenticationFailed("Invalid or expired token.")
+        token.touch()
+        return token.user, token
+
+    def is_current(self, user, token):
+        if not isinstance(token, AuthToken):
+            return True
+        if token.is_expired():
+            # Another process may have slid it forward; ask the database
+            return False
+        token.touch()
+        return True
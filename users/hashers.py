@@ -0,0 +1,44 @@
+"""
+Password hasher profile.
+
+``ProfiledScryptPasswordHasher`` is Django's scrypt hasher with its cost
+parameters taken from ``PASSWORD_SCRYPT_PARAMS``, so they can be tuned per
+deployment after measuring them (``python -m benchmarks.login_load``). It
+keeps the ``scrypt`` algorithm name: when the parameters change, Django sees
+``must_update()`` on the next successful login and rehashes the password
+with the new ones, as it does for hashes from any other listed hasher.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import ScryptPasswordHasher
+
+# OWASP's scrypt baseline (N=2**14, r=8, p=5), which is also Django's default
+DEFAULT_SCRYPT_PARAMS = {"work_factor": 2**14, "block_size": 8, "parallelism": 5}
+
+
+class ProfiledScryptPasswordHasher(ScryptPasswordHasher):
+    # Read on use rather than cached: get_hashers() keeps one instance alive
+    @property
+    def params(self):
+        return {
+            **DEFAULT_SCRYPT_PARAMS,
+            **getattr(settings, "PASSWORD_SCRYPT_PARAMS", {}),
+        }
+
+    @property
+    def work_factor(self):
+        return self.params["work_factor"]
+
+    @property
+    def block_size(self):
+        return self.params["block_size"]
+
+    @property
+    def parallelism(self):
+        return self.params["parallelism"]
+
+    @property
+    def maxmem(self):
+        # scrypt needs 128 * r * N bytes; OpenSSL refuses more than 32 MiB
+        # unless maxmem is raised
+        return 2 * 128 * self.block_size * self.work_factor
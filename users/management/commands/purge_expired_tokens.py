@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from config.batches import delete_in_batches
+from users.models import AuthToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete API tokens past their expiry. Expired tokens are already "
+        "refused, so this only reclaims space; --pause spaces out the batches "
+        "on a busy database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = AuthToken.objects.filter(expires_at__lte=now).order_by("expires_at")
+        deleted = delete_in_batches(
+            expired, options["batch_size"], pause=options["pause"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tokens."))
@@ -1,5 +1,12 @@
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -10,3 +17,79 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+def token_digest(key):
+    """SHA-256 of a token key; tokens are random, so no salt is needed."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def token_ttl():
+    return getattr(settings, "AUTH_TOKEN_TTL", 7 * 24 * 3600)
+
+
+class AuthTokenManager(models.Manager):
+    def issue(self, user):
+        """Create a token for ``user``; returns ``(token, key)``.
+
+        The key is ``<prefix>.<secret>`` and is only ever seen here: the
+        database keeps the prefix (for the lookup) and a digest of the key.
+        """
+        prefix = secrets.token_hex(8)
+        key = f"{prefix}.{secrets.token_urlsafe(32)}"
+        token = self.create(
+            user=user,
+            prefix=prefix,
+            digest=token_digest(key),
+            expires_at=timezone.now() + timedelta(seconds=token_ttl()),
+        )
+        return token, key
+
+    def verify(self, key):
+        """The live token for ``key``, with its user, or None."""
+        prefix, _, secret = key.partition(".")
+        if not secret:
+            return None
+        token = self.select_related("user").filter(prefix=prefix).first()
+        if token is None or not hmac.compare_digest(token.digest, token_digest(key)):
+            return None
+        if token.is_expired():
+            return None
+        return token
+
+
+class AuthToken(models.Model):
+    """An expiring API token, stored as a SHA-256 digest."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="auth_tokens"
+    )
+    # One unique-index probe finds the row; the digest is then compared
+    prefix = models.CharField(max_length=16, unique=True)
+    digest = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Slides forward while the token is in use (see touch())
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
+    def __str__(self):
+        return f"{self.prefix}… ({self.user})"
+
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def touch(self):
+        """
+        Push expires_at a full TTL ahead. Writes at most once per
+        AUTH_TOKEN_REFRESH_INTERVAL seconds, so busy tokens do not turn every
+        request into an UPDATE.
+        """
+        now = timezone.now()
+        interval = getattr(settings, "AUTH_TOKEN_REFRESH_INTERVAL", 3600)
+        expires_at = now + timedelta(seconds=token_ttl())
+        if expires_at - self.expires_at < timedelta(seconds=interval):
+            return False
+        type(self).objects.filter(pk=self.pk).update(expires_at=expires_at)
+        self.expires_at = expires_at
+        return True
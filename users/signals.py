@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_digest, invalidate_token
+from .models import AuthToken
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=AuthToken)
+@receiver(post_delete, sender=AuthToken)
+def forget_auth_token(sender, instance, **kwargs):
+    # touch() slides expiry with a queryset update, so busy tokens stay cached
+    invalidate_digest(instance.digest)
+
+
+def forget_tokens_of(user):
+    for key in Token.objects.filter(user=user).values_list("key", flat=True):
+        invalidate_token(key)
+    for digest in AuthToken.objects.filter(user=user).values_list("digest", flat=True):
+        invalidate_digest(digest)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    # is_active, is_staff and friends are read from the cached user. Logins
+    # only stamp last_login, which nothing reads from request.user.
+    update_fields = kwargs.get("update_fields")
+    if not created and update_fields != frozenset({"last_login"}):
+        forget_tokens_of(instance)
+
+
+@receiver(pre_delete, sender=User)
+def forget_deleted_user_tokens(sender, instance, **kwargs):
+    # AuthToken rows go with the user in one cascading DELETE, without signals
+    forget_tokens_of(instance)
@@ -1,7 +1,22 @@
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from .authentication import local_tokens
+from .models import AuthToken, token_digest
 
 User = get_user_model()
 
@@ -48,3 +63,229 @@ class UserProfileTests(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["username"], "profileuser")
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        local_tokens.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username="tokenuser", password="pw")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.url = reverse("user-detail")
+
+    def get_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, len(queries)
+
+    def test_repeat_requests_skip_the_token_query(self):
+        response, first = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(first, 1)
+        response, second = self.get_profile()
+        self.assertEqual(response.data["username"], "tokenuser")
+        self.assertEqual(second, 0)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="default")
+    def test_shared_tier_serves_other_processes(self):
+        self.get_profile()
+        local_tokens.clear()  # as if another worker handled the next request
+        response, queries = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, 0)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="default")
+    def test_deleting_the_user_revokes_the_cached_token(self):
+        self.get_profile()
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response, _ = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotated_token_is_rejected(self):
+        self.get_profile()
+        self.token.delete()
+        Token.objects.create(user=self.user)
+        response, _ = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.get_profile()
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ExpiringTokenTests(APITestCase):
+    def setUp(self):
+        local_tokens.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username="expiring", password="pw")
+        self.url = reverse("user-detail")
+
+    def login(self):
+        response = self.client.post(
+            reverse("user-login"), {"username": "expiring", "password": "pw"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        key = response.data["token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        return key
+
+    def test_login_issues_a_hashed_token(self):
+        key = self.login()
+        token = AuthToken.objects.get(user=self.user)
+        self.assertTrue(key.startswith(token.prefix + "."))
+        self.assertEqual(token.digest, token_digest(key))
+        self.assertNotIn(key, (token.prefix, token.digest))
+
+        local_tokens.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+    def test_wrong_secret_is_rejected(self):
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {key[:-2]}xx")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_is_rejected_even_when_cached(self):
+        self.login()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        AuthToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        # The cached copy still has the old expiry; it is re-read on expiry
+        local_tokens.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="default")
+    def test_deleted_token_is_evicted_from_the_cache(self):
+        self.login()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        AuthToken.objects.get(user=self.user).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_TTL=3600, AUTH_TOKEN_REFRESH_INTERVAL=60)
+    def test_expiry_slides_while_the_token_is_used(self):
+        self.login()
+        soon = timezone.now() + timedelta(minutes=5)
+        AuthToken.objects.update(expires_at=soon)
+        local_tokens.clear()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        refreshed = AuthToken.objects.get().expires_at
+        self.assertGreater(refreshed, soon + timedelta(minutes=50))
+
+        # Within the refresh interval there is nothing to write
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertEqual(len(queries), 0)
+
+    def test_purge_expired_tokens(self):
+        for _ in range(3):
+            AuthToken.objects.issue(self.user)
+        AuthToken.objects.filter(pk__in=AuthToken.objects.values("pk")[:2]).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+        call_command("purge_expired_tokens", batch_size=1, stdout=io.StringIO())
+        self.assertEqual(AuthToken.objects.count(), 1)
+
+
+@override_settings(
+    LOGIN_THROTTLE_RATES={"login_ip": "4/min", "login_username": "2/min"}
+)
+class LoginThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("user-login")
+        User.objects.create_user(username="victim", password="right")
+
+    def attempt(self, username, password="wrong", ip="10.0.0.1"):
+        return self.client.post(
+            self.url, {"username": username, "password": password}, REMOTE_ADDR=ip
+        )
+
+    def test_username_is_throttled_across_addresses(self):
+        for i in range(2):
+            response = self.attempt("Victim", ip=f"10.0.0.{i}")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.attempt("victim", password="right", ip="10.0.0.9")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+        # Rejected before authenticate(): no user lookup, so no hashing
+        self.assertEqual(len(queries), 0)
+
+    def test_address_is_throttled_across_usernames(self):
+        for i in range(4):
+            self.assertEqual(self.attempt(f"user{i}").status_code, 400)
+        self.assertEqual(self.attempt("victim", "right").status_code, 429)
+        self.assertEqual(
+            self.attempt("victim", "right", ip="10.0.0.2").status_code, 200
+        )
+
+    def test_forwarded_for_cannot_reset_the_address_limit(self):
+        for i in range(4):
+            response = self.client.post(
+                self.url,
+                {"username": f"user{i}", "password": "wrong"},
+                REMOTE_ADDR="10.0.0.1",
+                HTTP_X_FORWARDED_FOR=f"198.51.100.{i}",
+            )
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            self.url,
+            {"username": "victim", "password": "right"},
+            REMOTE_ADDR="10.0.0.1",
+            HTTP_X_FORWARDED_FOR="198.51.100.99",
+        )
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1})
+    def test_trusted_proxy_forwards_the_client_address(self):
+        for i in range(4):
+            response = self.client.post(
+                self.url,
+                {"username": f"user{i}", "password": "wrong"},
+                REMOTE_ADDR="10.0.0.1",
+                HTTP_X_FORWARDED_FOR=f"198.51.100.{i}",
+            )
+            self.assertEqual(response.status_code, 400)
+        # Each client behind the proxy has its own limit
+        response = self.client.post(
+            self.url,
+            {"username": "victim", "password": "right"},
+            REMOTE_ADDR="10.0.0.1",
+            HTTP_X_FORWARDED_FOR="198.51.100.99",
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class PasswordHasherProfileTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PASSWORD_SCRYPT_PARAMS={"work_factor": 2**10})
+    def test_login_rehashes_with_the_current_profile(self):
+        user = User.objects.create_user(username="legacy")
+        user.password = make_password("pw", hasher="pbkdf2_sha256")
+        user.save()
+
+        response = self.client.post(
+            reverse("user-login"), {"username": "legacy", "password": "pw"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("scrypt$1024$"))
+        self.assertTrue(user.check_password("pw"))
+
+        with self.settings(PASSWORD_SCRYPT_PARAMS={"work_factor": 2**11}):
+            self.client.post(
+                reverse("user-login"), {"username": "legacy", "password": "pw"}
+            )
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("scrypt$2048$"))
@@ -0,0 +1,64 @@
+"""
+Login throttles.
+
+DRF checks throttles in ``APIView.initial()``, before the view runs, so a
+throttled attempt never reaches ``authenticate()`` and its password hash.
+``SimpleRateThrottle`` keeps a sliding window of request times in the cache;
+rates come from ``LOGIN_THROTTLE_RATES``.
+
+The per-address limit keys on ``REMOTE_ADDR``. Behind a reverse proxy, set
+``NUM_PROXIES`` in ``REST_FRAMEWORK`` to the number of trusted proxies; only
+then is ``X-Forwarded-For`` read, and only the address the last of them saw.
+"""
+
+import hashlib
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+DEFAULT_LOGIN_THROTTLE_RATES = {"login_ip": "30/min", "login_username": "5/min"}
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    def get_rate(self):
+        rates = {
+            **DEFAULT_LOGIN_THROTTLE_RATES,
+            **getattr(settings, "LOGIN_THROTTLE_RATES", {}),
+        }
+        return rates.get(self.scope)
+
+
+class LoginIPRateThrottle(LoginRateThrottle):
+    """Attempts per client address, whatever the username."""
+
+    scope = "login_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+    def get_ident(self, request):
+        # Without NUM_PROXIES, DRF would key on X-Forwarded-For as sent by the
+        # client, and a new value per attempt would dodge the limit
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get("REMOTE_ADDR")
+        return super().get_ident(request)
+
+
+class LoginUsernameRateThrottle(LoginRateThrottle):
+    """Attempts per username, from any number of addresses."""
+
+    scope = "login_username"
+
+    def get_cache_key(self, request, view):
+        username = (
+            request.data.get("username") if hasattr(request.data, "get") else None
+        )
+        if not isinstance(username, str) or not username:
+            return None  # the serializer rejects it without hashing
+        # Hashed: cache keys must not contain arbitrary user input
+        ident = hashlib.sha256(username.casefold().encode("utf-8")).hexdigest()
+        return self.cache_format % {"scope": self.scope, "ident": ident}
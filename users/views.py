@@ -1,9 +1,10 @@
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from django.contrib.auth import get_user_model
 
+from .models import AuthToken
+from .throttling import LoginIPRateThrottle, LoginUsernameRateThrottle
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
 
 User = get_user_model()
@@ -27,6 +28,8 @@ class UserLoginView(APIView):
     """
 
     permission_classes = (permissions.AllowAny,)
+    # Checked before post() runs, so throttled attempts are never hashed
+    throttle_classes = (LoginIPRateThrottle, LoginUsernameRateThrottle)
     serializer_class = UserLoginSerializer
 
     def post(self, request, *args, **kwargs):
@@ -36,11 +39,16 @@ class UserLoginView(APIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data["user"]
 
-        # Get or create the auth token for the user
-        token, created = Token.objects.get_or_create(user=user)
+        # A fresh expiring token per login; only its digest is stored
+        token, key = AuthToken.objects.issue(user)
 
         return Response(
-            {"token": token.key, "username": user.username, "email": user.email},
+            {
+                "token": key,
+                "expires_at": token.expires_at,
+                "username": user.username,
+                "email": user.email,
+            },
             status=status.HTTP_200_OK,
         )
 